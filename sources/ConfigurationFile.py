@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Чтение файла конфигурации (без зависимостей от интерфейса)
+
+import codecs
+
+# Приводит строковое значение из файла конфигурации к bool, int или float
+# (иначе оставляет строкой), чтобы параметры из файла и из диалогов имели одинаковый тип
+def parseConfigurationValue(value):
+    if value in ('True', 'true'):
+        return True
+    if value in ('False', 'false'):
+        return False
+    for value_type in (int, float):
+        try:
+            return value_type(value)
+        except ValueError:
+            pass
+    return value
+
+def readConfigurationFile(filename):
+    with codecs.open(filename, 'r', "utf-8") as text_file:
+        data = text_file.read()
+        lines = data.split("\n")
+        result = dict()
+        for line in lines:
+            line = line.strip()
+            if(line.startswith("#") == False):
+                keyvalue = line.split("=")
+                if(len(keyvalue) == 2):
+                    result[keyvalue[0]]=parseConfigurationValue(keyvalue[1])
+        return result
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Общий кэш морфологического разбора слов.
+# Словарь корпуса намного меньше числа слов в нём, поэтому одна и та же
+# словоформа разбирается pymorphy2 многократно (удаление стоп-слов,
+# нормализация, приведение регистра, поиск ФИО). Кэш хранит результаты
+# morph.parse(word) по исходной форме слова и вытесняет давно неиспользуемые (LRU).
+
+import functools
+import threading
+
+import pymorphy2
+
+DEFAULT_MORPH_CACHE_SIZE = 100000
+
+
+class CachedMorphAnalyzer:
+
+    def __init__(self, morph, maxsize=DEFAULT_MORPH_CACHE_SIZE):
+        # Исходный анализатор pymorphy2.MorphAnalyzer
+        self.morph = morph
+        self.maxsize = maxsize
+        self._cached_parse = functools.lru_cache(maxsize=maxsize)(self._parse)
+
+    def _parse(self, word):
+        # Кортеж, чтобы общий результат нельзя было случайно изменить снаружи
+        return tuple(self.morph.parse(word))
+
+    def parse(self, word):
+        return self._cached_parse(word)
+
+    def hits(self):
+        return self._cached_parse.cache_info().hits
+
+    def misses(self):
+        return self._cached_parse.cache_info().misses
+
+    def size(self):
+        return self._cached_parse.cache_info().currsize
+
+    def clear(self):
+        self._cached_parse.cache_clear()
+
+    def cacheInfoString(self):
+        info = self._cached_parse.cache_info()
+        total = info.hits + info.misses
+        hit_rate = 0.0
+        if total > 0:
+            hit_rate = 100.0 * info.hits / total
+        return 'Кэш морфологии: попаданий {0}, промахов {1} ({2:.1f}%), слов в кэше {3}/{4}'.format(
+            info.hits, info.misses, hit_rate, info.currsize, info.maxsize)
+
+    # Остальные методы (normal_forms, tag и т.д.) передаются исходному анализатору
+    def __getattr__(self, name):
+        return getattr(self.morph, name)
+
+
+_shared_morph = None
+_shared_morph_lock = threading.Lock()
+
+
+# Возвращает единственный на процесс анализатор с кэшем (10-20мб словарей загружаются один раз)
+def getSharedMorphAnalyzer(maxsize=DEFAULT_MORPH_CACHE_SIZE):
+    global _shared_morph
+    with _shared_morph_lock:
+        if _shared_morph is None:
+            _shared_morph = CachedMorphAnalyzer(pymorphy2.MorphAnalyzer(), maxsize)
+    return _shared_morph
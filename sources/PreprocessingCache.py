@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Постоянный (на диске) кэш результатов препроцессинга текстов.
+# Ключ записи - хэш содержимого текста и параметров, влияющих на результат
+# препроцессинга. При изменении текста или параметров ключ меняется,
+# поэтому устаревшие записи никогда не используются.
+# Размер кэша ограничен числом записей: при чтении запись помечается как
+# использованная (время изменения файла), при превышении предела удаляются
+# записи, которые дольше всего не использовались.
+
+import hashlib
+import json
+import os
+import pickle
+
+# Увеличивается при любом изменении алгоритмов препроцессинга или структуры TextData
+PREPROCESSING_CACHE_VERSION = 1
+
+# Параметры удаления стоп-слов
+PREPROCESSING_CONFIGURATION_KEYS = {"minimal_word_size": 3, "cut_ADJ": False}
+
+# Параметры токенизации
+TOKENIZE_CONFIGURATION_KEYS = {"minimal_words_in_sentence": 1, "need_agresive_filtration": False}
+
+# Поля TextData, которые относятся к конкретному файлу, а не к его содержимому
+TEXT_IDENTITY_ATTRIBUTES = ('filename', 'full_filename', 'short_filename', 'category')
+
+# Наибольшее число записей в кэше по умолчанию
+DEFAULT_PREPROCESSING_CACHE_MAX_ENTRIES = 10000
+
+
+class PreprocessingCache:
+
+    # max_entries - наибольшее число записей (0 - без ограничения)
+    def __init__(self, cache_dir, configurations, tokenize_configurations=None,
+                 max_entries=DEFAULT_PREPROCESSING_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        parameters = {'version': PREPROCESSING_CACHE_VERSION}
+        for key, default in PREPROCESSING_CONFIGURATION_KEYS.items():
+            parameters[key] = configurations.get(key, default)
+        for key, default in TOKENIZE_CONFIGURATION_KEYS.items():
+            if tokenize_configurations != None:
+                parameters[key] = tokenize_configurations.get(key, default)
+            else:
+                parameters[key] = default
+        self.parameters_string = json.dumps(parameters, sort_keys=True)
+
+    # Ключ считается по исходным предложениям текста (до токенизации)
+    def textKey(self, text):
+        text_hash = hashlib.sha256()
+        text_hash.update(self.parameters_string.encode('utf-8'))
+        for sentence in text.original_sentences:
+            text_hash.update(b'\0')
+            text_hash.update(sentence.encode('utf-8'))
+        return text_hash.hexdigest()
+
+    def cacheFilename(self, key):
+        return os.path.join(self.cache_dir, key + '.pickle')
+
+    # Возвращает обработанную копию текста из кэша или None
+    def load(self, text, key):
+        filename = self.cacheFilename(key)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, 'rb') as cache_file:
+                cached_text = pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+
+        for attribute in TEXT_IDENTITY_ATTRIBUTES:
+            setattr(cached_text, attribute, getattr(text, attribute))
+        return cached_text
+
+    def store(self, text, key):
+        filename = self.cacheFilename(key)
+        temp_filename = filename + '.' + str(os.getpid()) + '.tmp'
+        try:
+            with open(temp_filename, 'wb') as cache_file:
+                pickle.dump(text, cache_file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_filename, filename)
+        except OSError as err:
+            print('Не удалось записать кэш препроцессинга:', filename, err)
+
+    # Удаляет давно не использованные записи сверх max_entries
+    def prune(self):
+        if self.max_entries <= 0:
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pickle'):
+                continue
+            filename = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(filename), filename))
+            except OSError:
+                pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for mtime, filename in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+
+# Возвращает кэш препроцессинга или None, если кэширование отключено
+def getPreprocessingCache(configurations, tokenize_configurations=None):
+    if not configurations.get("preprocessing_cache", False):
+        return None
+    default_cache_dir = configurations.get("output_files_directory", "output_files") + "/cache/preprocessing/"
+    cache_dir = configurations.get("preprocessing_cache_directory", default_cache_dir)
+    max_entries = configurations.get("preprocessing_cache_max_entries", DEFAULT_PREPROCESSING_CACHE_MAX_ENTRIES)
+    return PreprocessingCache(cache_dir, configurations, tokenize_configurations, max_entries)
@@ -92,6 +92,7 @@ class DialogConfigClasterization(QDialog):
         self.radioButton_DBSCAN.toggled.connect(self.onChangeMethod)
         self.radioButton_C3M.toggled.connect(self.onChangeMethod)
         self.radioButton_SOM.toggled.connect(self.onChangeMethod)
+        self.radioButton_Compare.toggled.connect(self.onChangeMethod)
         self.drawSOMDiagram.clicked.connect(self.onDrawSOMDiagram)
 
     def onChangeMethod(self):
@@ -108,6 +109,11 @@ class DialogConfigClasterization(QDialog):
         if (self.radioButton_SOM.isChecked()):
             self.parameters_SOM.setVisible(True)
 
+        if (self.radioButton_Compare.isChecked()):
+            self.parameters.setVisible(True)
+            self.parameters_DBSCAN.setVisible(True)
+            self.parameters_SOM.setVisible(True)
+
 
 
 
@@ -123,6 +129,8 @@ class DialogConfigClasterization(QDialog):
             self.calculator.setMethod('5')
         if (self.radioButton_SOM.isChecked()):
             self.calculator.setMethod('6')
+        if (self.radioButton_Compare.isChecked()):
+            self.calculator.setMethod('7')
 
     def onTextLogAdd(self, QString):
         self.textEdit.append(QString + '\n')
@@ -156,6 +164,7 @@ class DialogConfigClasterization(QDialog):
         else:
             self.calculator.setEps(self.lineEdit.text())
         self.calculator.setM(self.lineEdit_2.text())
+        self.calculator.setDBSCANEps(self.lineEdit_4.text())
         self.calculator.setMinPts(self.lineEdit_3.text())
         self.calculator.som_length = self.spinBox_SOM_length.value()
         self.profiler.start()
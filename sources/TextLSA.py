@@ -167,24 +167,10 @@ class LsaCalculator(QThread):
                         text.readSentencesFromInputText()
                         self.texts.append(text)
 
-                self.signals.PrintInfo.emit('Токенизация...')
-                self.texts = tokenizeTextData(self.texts, self.configurations)
-
-                self.signals.UpdateProgressBar.emit(10)
-
-                self.signals.PrintInfo.emit('Удаление стоп-слов...')
-                self.texts, log_string = removeStopWordsInTexts(self.texts, self.morph, self.configurations)
-                writeStringToFile(log_string.replace('\n ', '\n'), output_dir + 'output_stage_1.txt')
-                self.signals.UpdateProgressBar.emit(15)
-
-                self.signals.PrintInfo.emit('Приведение к нормальной форме...')
-                self.texts, log_string = normalizeTexts(self.texts, self.morph)
-                writeStringToFile(log_string.replace('\n ', '\n'), output_dir + 'output_stage_2.txt')
-                self.signals.UpdateProgressBar.emit(25)
-
-                self.signals.PrintInfo.emit('Приведение регистра...')
-                self.texts, log_string = fixRegisterInTexts(self.texts, self.morph)
-                writeStringToFile(log_string.replace('\n ', '\n'), output_dir + 'output_stage_3.txt')
+                if not os.path.exists(output_dir):
+                    os.makedirs(output_dir)
+                self.texts = preprocessLoadedTexts(self.texts, self.morph, self.configurations, output_dir,
+                                                   self.signals.PrintInfo.emit, self.configurations)
                 self.signals.UpdateProgressBar.emit(30)
 
                 if self.configurations.get("need_apriori", False):
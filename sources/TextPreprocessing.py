@@ -4,9 +4,12 @@
 import os
 import codecs
 import math
+import multiprocessing
 import pymorphy2
 from pymorphy2 import tokenizers 
 
+from sources.MorphAnalyzerCache import CachedMorphAnalyzer, DEFAULT_MORPH_CACHE_SIZE
+from sources.PreprocessingCache import getPreprocessingCache
 from sources.TextData import TextData, readSentencesListFromInputText
 
 
@@ -142,6 +145,60 @@ def writeStringToFile(data_str, filename, strict_utf8_encoding=False):
         exit(-1)
 
 
+# Записывает файл по частям сразу в открытый файл, не собирая весь текст в одну строку.
+# Используется как контекстный менеджер:
+#   with OutputFileWriter(filename) as writer:
+#       writer.writeRow(['Слово', 'Частота'])
+# decimal_comma - заменять точки на запятые (дробные числа для CSV)
+class OutputFileWriter:
+
+    def __init__(self, filename, strict_utf8_encoding=False, decimal_comma=False):
+        self.filename = filename
+        self.encoding = None
+        if strict_utf8_encoding:
+            self.encoding = 'utf-8'
+        self.decimal_comma = decimal_comma
+        self.out_text_file = None
+
+    def __enter__(self):
+        try:
+            self.out_text_file = open(self.filename, 'w', encoding=self.encoding)
+        except PermissionError:
+            print("ERROR!", "NO ACCESS TO FILE:", self.filename, ' - CLOSE OTHER APPLICATIONS')
+            exit(-1)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.out_text_file.close()
+        return False
+
+    def write(self, data_str):
+        if self.decimal_comma:
+            data_str = data_str.replace('.', ',')
+        self.out_text_file.write(data_str)
+
+    def writeLines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    # Записывает строку таблицы: ячейки через separator и перевод строки
+    def writeRow(self, cells, separator=';'):
+        self.write(separator.join([str(cell) for cell in cells]) + '\n')
+
+
+# Записывает строки lines в файл filename по мере их получения
+def writeLinesToFile(lines, filename, strict_utf8_encoding=False):
+    with OutputFileWriter(filename, strict_utf8_encoding) as writer:
+        writer.writeLines(lines)
+
+# Возвращает журнал этапа (строкой) или записывает его в log_filename (и возвращает None)
+def compileOrWriteLog(lines, log_filename=None):
+    if log_filename != None:
+        writeLinesToFile(lines, log_filename)
+        return None
+    return ''.join(lines)
+
+
 # Определяет является ли слово частью ФИО (с вероятностью score)
 def wordPersonDetector(word, morph):
     results = morph.parse(word)
@@ -161,35 +218,31 @@ def wordSurnameDetector(word, results):
                 return True
     return False
 
+# Проверяет является ли слово СТОП-СЛОВом (Предлог, союз и тд.) или слишком коротким словом
+def isStopWord(word, morph, minimal_word_size, cut_ADJ):
+    if len(word) < minimal_word_size or word.isalpha() == False:
+        return True
+
+    results = morph.parse(word)
+    for result in results:
+        if((cut_ADJ and (result.tag.POS == 'ADJF'
+            or result.tag.POS == 'ADJS'))
+            or result.tag.POS == 'PREP'
+            or result.tag.POS == 'ADVB'
+            or result.tag.POS == 'COMP'
+            or result.tag.POS == 'CONJ'
+            or result.tag.POS == 'PRCL'):
+            if(result.score >= 0.25):
+                return True
+    return False
+
 # Удаляет СТОП-СЛОВа (Предлоги, союзы и тд.)
 def removeStopWordsFromSentences(sentences, morph, configurations):
 
     minimal_word_size = configurations.get("minimal_word_size", 3)
     cut_ADJ = configurations.get("cut_ADJ", False)
     for sentence in sentences:
-        i = 0
-
-        while i < len(sentence):
-            current_word = sentence[i]
-
-            if len(current_word) < minimal_word_size or current_word.isalpha() == False:
-                 sentence.pop(i)
-                 i = i - 1
-            else:
-                results = morph.parse(current_word)
-                for result in results:
-                    if((cut_ADJ and (result.tag.POS == 'ADJF'
-                        or result.tag.POS == 'ADJS'))
-                        or result.tag.POS == 'PREP'
-                        or result.tag.POS == 'ADVB'
-                        or result.tag.POS == 'COMP'
-                        or result.tag.POS == 'CONJ'
-                        or result.tag.POS == 'PRCL'):
-                        if(result.score >= 0.25):
-                            sentence.pop(i)
-                            i = i - 1
-                            break
-            i = i + 1
+        sentence[:] = [word for word in sentence if not isStopWord(word, morph, minimal_word_size, cut_ADJ)]
 
     result_sentences = []
     for sentence in sentences:
@@ -198,46 +251,51 @@ def removeStopWordsFromSentences(sentences, morph, configurations):
 
     return result_sentences
 
-def removeStopWordsInTexts(texts, morph, configurations):
+# Строки журнала этапа препроцессинга: предложения из поля sentences_attribute каждого текста
+def sentencesLogLines(header, texts, sentences_attribute):
+    yield header
     for text in texts:
-        text.no_stop_words_sentences = removeStopWordsFromSentences(text.tokenized_sentences, morph, configurations)
+        yield '\nText:' + text.filename + '\n'
+        for sentence in getattr(text, sentences_attribute):
+            yield ' '.join(sentence) + '\n'
 
-    log_string = "Удаление стоп-слов:\n"
+# Строки журнала частотной таблицы слов
+def wordsFrequencyLogLines(texts):
+    yield 'Расчет частотной таблицы слов.\n'
+    for text in texts:
+        yield '\nText:' + text.filename + '\n'
+        yield "Слово;Кол-во упоминаний\n"
+        for key, value in text.sorted_word_frequency:
+            yield key + ';' + str(value) + '\n'
 
+def removeStopWordsInTexts(texts, morph, configurations, log_filename=None):
     for text in texts:
-        log_string = log_string + '\nText:' + text.filename + '\n'
-        for sentence in text.no_stop_words_sentences:
-            for word in sentence:
-                log_string = log_string + ' ' + word
-            log_string = log_string + '\n'
-    return texts, log_string
+        text.no_stop_words_sentences = removeStopWordsFromSentences(text.tokenized_sentences, morph, configurations)
+
+    log_lines = sentencesLogLines("Удаление стоп-слов:\n", texts, 'no_stop_words_sentences')
+    return texts, compileOrWriteLog(log_lines, log_filename)
+
+# Приводит слово к нормальной форме (имена и отчества остаются без изменений)
+def normalizeWord(word, morph):
+    isPerson, results = wordPersonDetector(word, morph)
+    if(isPerson == False or (isPerson and wordSurnameDetector(word, results))):
+        return results[0].normal_form # По умолчанию берем наиболее достоверный разбора слова
+    return word
 
-def normalizeTexts(texts, morph):
-    log_string = "Нормализация:\n"
+def normalizeTexts(texts, morph, log_filename=None):
     for text in texts:
-        log_string = log_string + '\nText:' + text.filename + '\n'
         for sentence in text.no_stop_words_sentences:
             current_sentence = []
             for word in sentence:
-                isPerson, results = wordPersonDetector(word, morph)
-                if(isPerson == False or (isPerson and wordSurnameDetector(word, results))):
-                    result = results[0] # По умолчанию берем наиболее достоверный разбора слова
-                    #current_sentence.append(word)
-                    current_sentence.append(result.normal_form)
-                    log_string = log_string + ' ' + result.normal_form
-                else:
-
-                    current_sentence.append(word)
-                    log_string = log_string + ' ' + word
-            log_string = log_string + '\n'
+                current_sentence.append(normalizeWord(word, morph))
             text.normalized_sentences.append(current_sentence)
-    return texts, log_string
 
+    log_lines = sentencesLogLines("Нормализация:\n", texts, 'normalized_sentences')
+    return texts, compileOrWriteLog(log_lines, log_filename)
 
-def fixRegisterInTexts(texts, morph):
-    log_string = "Приведение регистра:\n"
+
+def fixRegisterInTexts(texts, morph, log_filename=None):
     for text in texts:
-        log_string = log_string + '\nText:' + text.filename + '\n'
         for sentence in text.normalized_sentences:
             current_sentence = []
             for word in sentence:
@@ -245,12 +303,12 @@ def fixRegisterInTexts(texts, morph):
                     current_sentence.append(word.capitalize())
                 else:
                     current_sentence.append(word.lower())
-                log_string = log_string + ' ' + current_sentence[-1]
             text.register_pass_centences.append(current_sentence)
-            log_string = log_string + '\n'
-    return texts, log_string
 
-def calculateWordsFrequencyInTexts(texts):
+    log_lines = sentencesLogLines("Приведение регистра:\n", texts, 'register_pass_centences')
+    return texts, compileOrWriteLog(log_lines, log_filename)
+
+def calculateWordsFrequencyInTexts(texts, log_filename=None):
 
     for text in texts:
         for sentense in text.register_pass_centences:
@@ -260,15 +318,56 @@ def calculateWordsFrequencyInTexts(texts):
         # Сортируем слова по частоте
         text.sorted_word_frequency = sorted(text.word_frequency.items(), key=lambda x: x[1], reverse=True)
 
-    log_string = 'Расчет частотной таблицы слов.\n'
+    return texts, compileOrWriteLog(wordsFrequencyLogLines(texts), log_filename)
+
+
+# Препроцессинг одного текста за один проход по словам: удаление стоп-слов,
+# нормализация, приведение регистра и подсчет частоты слов.
+# Результат в TextData совпадает с последовательным вызовом
+# removeStopWordsInTexts, normalizeTexts, fixRegisterInTexts и calculateWordsFrequencyInTexts
+def preprocessSingleTextFused(text, morph, configurations):
+    minimal_word_size = configurations.get("minimal_word_size", 3)
+    cut_ADJ = configurations.get("cut_ADJ", False)
+
+    text.no_stop_words_sentences = []
+    for sentence in text.tokenized_sentences:
+        no_stop_words_sentence = []
+        normalized_sentence = []
+        register_pass_sentence = []
+        for word in sentence:
+            if isStopWord(word, morph, minimal_word_size, cut_ADJ):
+                continue
+            no_stop_words_sentence.append(word)
+            normalized_sentence.append(normalizeWord(word, morph))
+            # fixRegisterInTexts всегда переводит нормализованное слово в нижний регистр
+            register_pass_sentence.append(normalized_sentence[-1].lower())
+            text.word_frequency[register_pass_sentence[-1]] = text.word_frequency.get(register_pass_sentence[-1], 0) + 1
+
+        # Как и removeStopWordsFromSentences, оставляем в tokenized_sentences только не стоп-слова
+        sentence[:] = no_stop_words_sentence
+        if(len(sentence) != 0):
+            text.no_stop_words_sentences.append(sentence)
+            text.normalized_sentences.append(normalized_sentence)
+            text.register_pass_centences.append(register_pass_sentence)
 
+    # Сортируем слова по частоте
+    text.sorted_word_frequency = sorted(text.word_frequency.items(), key=lambda x: x[1], reverse=True)
+    return text
+
+def preprocessTextsFused(texts, morph, configurations):
     for text in texts:
-        log_string = log_string + '\nText:' + text.filename + '\n'
-        log_string = log_string + "Слово;Кол-во упоминаний\n"
-        for key, value in text.sorted_word_frequency:
-            log_string = log_string + key + ';' + str(value) + '\n'
+        preprocessSingleTextFused(text, morph, configurations)
+    return texts
 
-    return texts, log_string
+# Записывает журналы этапов препроцессинга (output_stage_1..4) по уже обработанным текстам
+def writePreprocessingLogs(texts, output_dir):
+    writeLinesToFile(sentencesLogLines("Удаление стоп-слов:\n", texts, 'no_stop_words_sentences'),
+                     output_dir + 'output_stage_1.txt')
+    writeLinesToFile(sentencesLogLines("Нормализация:\n", texts, 'normalized_sentences'),
+                     output_dir + 'output_stage_2.txt')
+    writeLinesToFile(sentencesLogLines("Приведение регистра:\n", texts, 'register_pass_centences'),
+                     output_dir + 'output_stage_3.txt')
+    writeLinesToFile(wordsFrequencyLogLines(texts), output_dir + 'output_stage_4.csv')
 
 
 # Проверяет является ли слово местоимением-существительным (Он, Она и тд.)
@@ -346,22 +445,62 @@ def count_of_words_in_sentences(sentences):
             counter = counter + 1
     return counter
 
+# Индекс документной частоты слов (DF): в скольких документах встречается каждое слово.
+# Документы можно добавлять и удалять, IDF пересчитывается без повторного просмотра корпуса
+class DocumentFrequencyIndex:
+
+    def __init__(self):
+        self.documents_count = 0
+        self.document_frequency = dict()
+
+    # words - набор слов документа (повторы не учитываются)
+    def addDocument(self, words):
+        self.documents_count += 1
+        for word in set(words):
+            self.document_frequency[word] = self.document_frequency.get(word, 0) + 1
+
+    def removeDocument(self, words):
+        self.documents_count -= 1
+        for word in set(words):
+            frequency = self.document_frequency[word] - 1
+            if frequency > 0:
+                self.document_frequency[word] = frequency
+            else:
+                self.document_frequency.pop(word)
+
+    def addText(self, text):
+        self.addDocument(textWordsSet(text))
+
+    def removeText(self, text):
+        self.removeDocument(textWordsSet(text))
+
+    def idf(self, word):
+        return math.log10((0.0 + self.documents_count)/self.document_frequency[word])
+
+    # Возвращает словарик СЛОВО:IDF для слов words (по умолчанию для всех слов корпуса)
+    def idfDict(self, words=None):
+        if words == None:
+            words = self.document_frequency.keys()
+        return dict((word, self.idf(word)) for word in words)
+
+# Множество слов текста после препроцессинга
+def textWordsSet(text):
+    words = set()
+    for sentence in text.register_pass_centences:
+        words.update(sentence)
+    return words
+
 # Вычисляет IDF для каждого слова каждого текста и возвращает словарик СЛОВО:IDF
 def calculateWordsIDF(texts):
-    all_documents_count = len(texts);
-    idf_data = dict()
+    df_index = DocumentFrequencyIndex()
     for text in texts:
-        for word, frequency in text.word_frequency.items():
-            word_doc_freq = 0.0;
+        df_index.addText(text)
 
-            for doc in texts:
-                if(isSentencesContainsWord(doc.register_pass_centences, word)):
-                    word_doc_freq = word_doc_freq + 1.0
-                    continue
-
-            pre_idx = (0.0 + all_documents_count)/word_doc_freq
-            inverse_document_frequency = math.log10(pre_idx)
-            idf_data[word] = inverse_document_frequency
+    idf_data = dict()
+    for text in texts:
+        for word in text.word_frequency.keys():
+            if word not in idf_data:
+                idf_data[word] = df_index.idf(word)
     return idf_data
 
 # Вычисляет TF*IDF для каждого слова каждого текста и записывает в text.words_tf_idf[word]
@@ -372,16 +511,21 @@ def calculateTFIDF(texts, idf_word_data):
             tf = frequency/text.word_count
             text.words_tf_idf[word] = idf_word_data[word] * tf;
 
-def writeWordTFIDFToString(texts, idf_word_data):
-    log_string = "Файлы\n"
+def wordTFIDFLines(texts, idf_word_data):
+    yield "Файлы\n"
     for text in texts:
-        log_string = log_string + "\n" + text.filename + ";;;;"+'\n'
-        log_string = log_string + 'Word; IDF; TF; IDF*TF;\n'
+        yield "\n" + text.filename + ";;;;"+'\n'
+        yield 'Word; IDF; TF; IDF*TF;\n'
 
         for word, frequency in text.word_frequency.items():
             tf = frequency/text.word_count
-            log_string = log_string + word + ";" + str(idf_word_data[word]) + ';' + str(tf) + ';' + str(text.words_tf_idf[word])  + ';\n'
-    return log_string
+            yield word + ";" + str(idf_word_data[word]) + ';' + str(tf) + ';' + str(text.words_tf_idf[word])  + ';\n'
+
+def writeWordTFIDFToString(texts, idf_word_data):
+    return ''.join(wordTFIDFLines(texts, idf_word_data))
+
+def writeWordTFIDFToFile(texts, idf_word_data, filename):
+    writeLinesToFile(wordTFIDFLines(texts, idf_word_data), filename)
 
 
 def removeTFIDFWordsWithMiniamlMultiplier(texts , min_mult):
@@ -408,33 +552,117 @@ def makePreprocessing(filenames, morph, configurations, additional_output=None):
     output_dir = configurations.get("output_files_directory", "output_files") + "/preprocessing/"
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+
+    return preprocessLoadedTexts(texts, morph, configurations, output_dir,
+                                 lambda message: checkAdditionalOutput(additional_output, message + '\n'))
+
+# Препроцессинг загруженных текстов: токенизация, удаление стоп-слов, нормализация,
+# приведение регистра и расчет частот. Журналы этапов пишутся в log_dir,
+# сообщения о ходе работы передаются в report.
+# Если включен кэш препроцессинга, обрабатываются только тексты, которых в нем нет
+def preprocessLoadedTexts(texts, morph, configurations, log_dir, report=print, tokenize_configurations=None):
+    report('Этап препроцессинга:')
+
+    cache = getPreprocessingCache(configurations, tokenize_configurations)
+    if cache == None:
+        return processTexts(texts, morph, configurations, log_dir, report, tokenize_configurations)
+
+    keys = [cache.textKey(text) for text in texts]
+    result_texts = [cache.load(text, key) for text, key in zip(texts, keys)]
+    missing_indexes = [index for index, text in enumerate(result_texts) if text == None]
+    report('Кэш препроцессинга: найдено ' + str(len(texts) - len(missing_indexes)) + ' из ' + str(len(texts)) + ' текстов.')
+
+    if len(missing_indexes) > 0:
+        processed_texts = processTexts([texts[index] for index in missing_indexes], morph, configurations,
+                                       None, report, tokenize_configurations)
+        for index, text in zip(missing_indexes, processed_texts):
+            cache.store(text, keys[index])
+            result_texts[index] = text
+        cache.prune()
+
+    if configurations.get("preprocessing_logs", True):
+        writePreprocessingLogs(result_texts, log_dir)
+    return result_texts
+
+# Выбирает способ препроцессинга (в пуле процессов, за один проход или поэтапно).
+# Если log_dir равен None, журналы этапов не пишутся
+def processTexts(texts, morph, configurations, log_dir, report=print, tokenize_configurations=None):
+    workers = getPreprocessingWorkersCount(configurations)
+    if workers > 1 and len(texts) > 1:
+        report('Токенизация, удаление стоп-слов и нормализация в ' + str(workers) + ' процессах.')
+        texts = preprocessTextsInPool(texts, configurations, workers, tokenize_configurations)
+        if log_dir != None and configurations.get("preprocessing_logs", True):
+            writePreprocessingLogs(texts, log_dir)
+        return texts
+
     # Разделяем предложения на слова
-    texts = tokenizeTextData(texts)
-    checkAdditionalOutput(additional_output,'Этап препроцессинга:\n')
+    texts = tokenizeTextData(texts, tokenize_configurations)
+
+    if configurations.get("preprocessing_fused", False):
+        report('Удаление стоп-слов, нормализация, приведение регистра и расчет частот за один проход.')
+        texts = preprocessTextsFused(texts, morph, configurations)
+        if log_dir != None and configurations.get("preprocessing_logs", True):
+            writePreprocessingLogs(texts, log_dir)
+    else:
+        staged_log_dir = log_dir if configurations.get("preprocessing_logs", True) else None
+        texts = makeStagedPreprocessing(texts, morph, configurations, staged_log_dir, report)
+
+    if hasattr(morph, 'cacheInfoString'):
+        report(morph.cacheInfoString())
+    return texts
 
-    # Удаление стоп-слов из предложения (частицы, прилагательные и тд)
-    checkAdditionalOutput(additional_output,'1) Удаление стоп-слов.\n')
+def makeStagedPreprocessing(texts, morph, configurations, log_dir, report=print):
+    def logFilename(filename):
+        if log_dir == None:
+            return None
+        return log_dir + filename
 
-    texts, log_string = removeStopWordsInTexts(texts, morph, configurations)
-    writeStringToFile(log_string.replace('\n ', '\n'), output_dir + 'output_stage_1.txt')
+    # Удаление стоп-слов из предложения (частицы, прилагательные и тд)
+    report('1) Удаление стоп-слов.')
+    texts, log_string = removeStopWordsInTexts(texts, morph, configurations, logFilename('output_stage_1.txt'))
 
     # Переводим обычное предложение в нормализованное (каждое слово)
-    checkAdditionalOutput(additional_output,'2) Нормализация.\n')
-    texts, log_string = normalizeTexts(texts, morph)
-    writeStringToFile(log_string.replace('\n ', '\n'), output_dir + 'output_stage_2.txt')
+    report('2) Нормализация.')
+    texts, log_string = normalizeTexts(texts, morph, logFilename('output_stage_2.txt'))
 
     # Приведение регистра (все слова с маленькой буквы за исключением ФИО)
-    checkAdditionalOutput(additional_output,'3) Приведение регистра.\n')
-    texts, log_string = fixRegisterInTexts(texts, morph)
-    writeStringToFile(log_string.replace('\n ', '\n'), output_dir + 'output_stage_3.txt')
+    report('3) Приведение регистра.')
+    texts, log_string = fixRegisterInTexts(texts, morph, logFilename('output_stage_3.txt'))
 
     # Подсчет частоты слов в тексте
-    checkAdditionalOutput(additional_output,'4) Расчет частотной таблицы слов.\n')
-    texts, log_string = calculateWordsFrequencyInTexts(texts)
-    writeStringToFile(log_string.replace('\n ', '\n'), output_dir + 'output_stage_4.csv')
+    report('4) Расчет частотной таблицы слов.')
+    texts, log_string = calculateWordsFrequencyInTexts(texts, logFilename('output_stage_4.csv'))
 
     return texts
 
+# Число процессов для препроцессинга (0 - по числу ядер процессора)
+def getPreprocessingWorkersCount(configurations):
+    workers = configurations.get("preprocessing_workers", 1)
+    if workers <= 0:
+        workers = multiprocessing.cpu_count()
+    return workers
+
+# Анализатор pymorphy2 процесса-обработчика (у каждого процесса свой)
+_worker_morph = None
+
+def _initPreprocessingWorker(morph_cache_size):
+    global _worker_morph
+    _worker_morph = CachedMorphAnalyzer(pymorphy2.MorphAnalyzer(), morph_cache_size)
+
+def _preprocessTextInWorker(worker_arguments):
+    text, configurations, tokenize_configurations = worker_arguments
+    text.tokenized_sentences = tokenizeSingleText(text, tokenize_configurations)
+    return preprocessSingleTextFused(text, _worker_morph, configurations)
+
+# Параллельный препроцессинг файлов в пуле процессов.
+# Тексты обрабатываются независимо, результаты возвращаются в исходном порядке
+def preprocessTextsInPool(texts, configurations, workers, tokenize_configurations=None):
+    morph_cache_size = configurations.get("morph_cache_size", DEFAULT_MORPH_CACHE_SIZE)
+    chunksize = max(1, len(texts) // (workers * 4))
+    worker_arguments = [(text, configurations, tokenize_configurations) for text in texts]
+    with multiprocessing.Pool(workers, initializer=_initPreprocessingWorker, initargs=(morph_cache_size,)) as pool:
+        return pool.map(_preprocessTextInWorker, worker_arguments, chunksize)
+
 def checkAdditionalOutput(additional_output, text):
     if additional_output:
         additional_output.append(text)
@@ -452,22 +680,20 @@ def makeFakePreprocessing(filenames):
     return texts
 
 
-def printMatrixToString(matrix, horizontal_header=None, vertical_header=None):
-    result_string = ''
+def matrixLines(matrix, horizontal_header=None, vertical_header=None):
     rows, cols = matrix.shape
 
     if (horizontal_header != None):
-        for i in range(len(horizontal_header)):
-            result_string = result_string + str(horizontal_header[i]) + ',\t'
-        result_string += '\n'
+        yield ''.join([str(header) + ',\t' for header in horizontal_header]) + '\n'
 
     for row in range(rows):
+        row_prefix = ''
         if (vertical_header != None):
-            result_string = result_string + str(vertical_header[row]) + '\t'
-
-        for col in range(cols):
-            result_string = result_string + str(matrix[row, col]) + ',\t'
+            row_prefix = str(vertical_header[row]) + '\t'
+        yield row_prefix + ''.join([str(matrix[row, col]) + ',\t' for col in range(cols)]) + '\n'
 
-        result_string += '\n'
+def printMatrixToString(matrix, horizontal_header=None, vertical_header=None):
+    return ''.join(matrixLines(matrix, horizontal_header, vertical_header))
 
-    return result_string
\ No newline at end of file
+def printMatrixToFile(matrix, filename, horizontal_header=None, vertical_header=None):
+    writeLinesToFile(matrixLines(matrix, horizontal_header, vertical_header), filename)
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import contextlib
 import csv
+import hashlib
+import itertools
 import math
 import copy
 import numpy as np
@@ -11,10 +14,12 @@ from PyQt5.QtCore import QObject
 from PyQt5.QtCore import QThread
 from PyQt5.QtCore import pyqtSignal
 
-from sources.TextPreprocessing import writeStringToFile
+from sources.TextPreprocessing import writeStringToFile, OutputFileWriter
 from sources.classification.ID3 import Classification_Text_ID3
-from sources.classification.KNN import getResponse
+from sources.classification.KNN import getWeightedResponse, nearestNeighbors
+from sources.classification.LLSF import classMembership, llsfScores, llsfWeights
 from sources.classification.NaiveBayes import *
+from sources.classification.Rocchio import RocchioClassifier
 from sources.classification.clsf_util import *
 from sources.utils import makePreprocessingForAllFilesInFolder, clear_dir
 
@@ -107,6 +112,18 @@ class ClassificationCalculator(QThread):
         self.signals.PrintInfo.emit('Рассчеты закончены!')
         self.signals.Finished.emit()
 
+    # Файл сохранённой модели наивного Байеса для входной директории или None,
+    # если сохранение модели отключено
+    def naiveBayesModelFilename(self, input_dir):
+        if not self.configurations.get("classification_naive_bayes_model", False):
+            return None
+        default_model_dir = self.configurations.get("output_files_directory", "output_files") + "/cache/naive_bayes/"
+        model_dir = self.configurations.get("classification_naive_bayes_model_directory", default_model_dir)
+        if not os.path.exists(model_dir):
+            os.makedirs(model_dir)
+        key = hashlib.sha256(os.path.abspath(input_dir).encode('utf-8')).hexdigest()
+        return os.path.join(model_dir, key + '.npz')
+
     # Алгоритм наивного Байеса
     def classification_naive_bayes(self, needPreprocessing):
 
@@ -115,48 +132,50 @@ class ClassificationCalculator(QThread):
 
         self.signals.PrintInfo.emit("Алгоритм наивного Байеса")
         # Классификация
-        fdata, fclass, split = makeFileList(input_dir)
+        fnames, fclass, split = makeFileList(input_dir, fread=False)
+        train_names = [os.path.abspath(fname) for fname in fnames[:split]]
+        train_signatures = [file_signature(fname) for fname in fnames[:split]]
+        test_fnames = getBasePath(fnames[split:])
         self.signals.UpdateProgressBar.emit(15)
 
-        trainingSet = fdata[:split]
-        trainingClass = fclass[:split]
-        testSet = fdata[split:]
-        test_fnames = getBasePath(makeFileList(input_dir, fread=False)[0][split:])
+        # Сохранённая модель дообучается только новыми документами; если обученный
+        # документ изменился или удалён, модель обучается заново
+        model_filename = self.naiveBayesModelFilename(input_dir)
+        model = None
+        if model_filename != None:
+            model = NaiveBayesModel.load(model_filename)
+        current = dict(zip(train_names, train_signatures))
+        if model != None and any(current.get(name) != signature for name, signature in model.documents.items()):
+            model = None
+        if model == None:
+            model = NaiveBayesModel()
+        new_docs = [i for i in range(split) if train_names[i] not in model.documents]
         self.signals.UpdateProgressBar.emit(20)
-        vocab = {}
-        word_counts = defaultdict(dict)
-        priors = dict.fromkeys(set(trainingClass), 0.)
-        for cl in priors.keys():
-            priors[cl] = trainingClass.count(cl)
-        docs = []
-
-        self.signals.UpdateProgressBar.emit(30)
 
-        for i in range(len(trainingSet)):
-            counts = count_words(trainingSet[i])
-            cl = trainingClass[i]
-            for word, count in counts.items():
-                if word not in vocab:
-                    vocab[word] = 0.0
-                if word not in word_counts[cl]:
-                    word_counts[cl][word] = 0.0
-                vocab[word] += count
-                word_counts[cl][word] += count
+        if len(new_docs) > 0:
+            self.signals.PrintInfo.emit("Обучение на документах: " + str(len(new_docs)))
+            model.partial_fit(createTokenPool([fnames[i] for i in new_docs], True),
+                              [fclass[i] for i in new_docs],
+                              [train_names[i] for i in new_docs],
+                              [train_signatures[i] for i in new_docs])
+            if model_filename != None:
+                model.save(model_filename)
+        elif model_filename != None:
+            self.signals.PrintInfo.emit("Модель загружена: " + model_filename)
         self.signals.UpdateProgressBar.emit(40)
+
+        testSet = createTokenPool(fnames[split:], True)
         scores = {}
-        V = len(vocab)
-        for i in range(len(testSet)):
-            scores[test_fnames[i]] = []
-            counts = count_words(testSet[i])
-            for cl in priors.keys():
-                Lc = sum(word_counts[cl].values())
-                prior_cl = math.log10(priors[cl] / sum(priors.values()))
-                log_prob = 0.0
-                for w, cnt in counts.items():
-                    Wic = word_counts[cl].get(w, 0.0)
-                    log_prob += math.log10((Wic + 1)/(V + Lc)) * cnt
-                scores[test_fnames[i]].append([cl, round((log_prob + prior_cl), 3)])
+        for fname, row in zip(test_fnames, model.scores(testSet).tolist()):
+            scores[fname] = [[cl, round(score, 3)] for cl, score in zip(model.classes, row)]
         self.signals.UpdateProgressBar.emit(60)
+
+        words = model.words()
+        vocab = dict(zip(words, model.word_counts.sum(axis=0).tolist()))
+        word_counts = {}
+        for cl, counts in zip(model.classes, model.word_counts.tolist()):
+            word_counts[cl] = {word: count for word, count in zip(words, counts) if count > 0}
+
         self.signals.PrintInfo.emit("Выходные файлы:")
         out_dir = self.output_dir + 'nb_out/'
         if not os.path.exists(out_dir):
@@ -171,9 +190,6 @@ class ClassificationCalculator(QThread):
     # Алгоритм Рочио
     def classification_rocchio(self, needPreprocessing):
 
-        def findCentroid(nparray):
-            return (np.sum(nparray, axis=0) / len(nparray))
-
         ##############PARAMS###################
         output_dir = self.output_dir + 'roc_out/'
         input_dir = self.method_input_dir
@@ -182,49 +198,43 @@ class ClassificationCalculator(QThread):
         ###############ALGO##################
 
         fdata, fclass, split = makeFileList(input_dir)
-        tfidf, uniq_words = makeTFIDF(fdata[:split], fdata[split:])
-        class_titles = set(fclass)
+        tfidf, vocabulary = makeSparseTFIDF(fdata[:split], fdata[split:])
+        uniq_words = vocabularyWords(vocabulary)
+        class_titles = sorted(set(fclass))
+        train_classes = fclass[:split]
 
-        combiSet = addClassToTFIDF(copy.deepcopy(tfidf), fclass)
-        trainSet = combiSet[:split]
-        testSet = combiSet[split:]
+        trainSet = tfidf[:split]
+        testSet = tfidf[split:]
         split_names = getBasePath(makeFileList(input_dir, fread=False)[0])
 
         self.signals.UpdateProgressBar.emit(20)
-        centroids = []
-        for cl in class_titles:
-            cl_array = []
-            for i in range(len(trainSet)):
-                if fclass[i] == cl:
-                    cl_array.append(trainSet[i][:-1])
-            centroids.append(findCentroid(np.array(cl_array)).round(3).tolist())
-
-        centroids = addClassToTFIDF(centroids, list(class_titles))
+        # Центроид класса - среднее векторов его обучающих документов
+        metric = self.configurations.get("classification_rocchio_metric", "euclidean")
+        rocchio = RocchioClassifier(metric).fit(trainSet, train_classes, class_titles)
+
         log_centr = "центроиды" + eol + sep.join(uniq_words) + eol
-        for row in centroids:
-            log_centr += sep.join(map(str, row)).replace('.',',') + eol
+        for row, cl in zip(rocchio.centroids.toarray().round(3).tolist(), class_titles):
+            log_centr += sep.join(map(str, row + [cl])).replace('.',',') + eol
         self.signals.UpdateProgressBar.emit(40)
         self.signals.PrintInfo.emit("Алгоритм Роккио")
         log_main = "Расстояние до центроидов" + eol
         predictions = []
 
         test_fnames = split_names[split:]
-        for i in range(len(testSet)):
-            neighbors, dist = getNeighbors(centroids, testSet[i], len(centroids))
-            log_main += test_fnames[i] + sep + "Принадлежит классу:" + str(dist[0][0][-1]) + sep + eol 
-            log_main += sep.join([x[0][-1] for x in dist]) + eol + sep.join(
-                map(str, [x[1] for x in dist])).replace('.',',') + eol
-            self.signals.PrintInfo.emit('> результат =' + repr(dist[0][0][-1]) + ', на самом деле=' + repr(testSet[i][-1]))
-            predictions.append(dist[0][0][-1])
-        accuracy = getAccuracy(testSet, predictions)
+        test_classes = fclass[split:]
+        distances = rocchio.distances(testSet)
+        for i in range(testSet.shape[0]):
+            order = np.argsort(distances[i], kind='stable')
+            predicted = class_titles[order[0]]
+            log_main += test_fnames[i] + sep + "Принадлежит классу:" + str(predicted) + sep + eol
+            log_main += sep.join([class_titles[j] for j in order]) + eol + sep.join(
+                map(str, distances[i][order].tolist())).replace('.',',') + eol
+            self.signals.PrintInfo.emit('> результат =' + repr(predicted) + ', на самом деле=' + repr(test_classes[i]))
+            predictions.append(predicted)
+        accuracy = getLabelsAccuracy(test_classes, predictions)
         self.signals.PrintInfo.emit('Точность: ' + repr(accuracy) + '%')
         self.signals.UpdateProgressBar.emit(60)
         ###############LOGS##################
-        log_tfidf = sep.join(uniq_words) + eol
-        for i in range(len(combiSet)):
-            row = combiSet[i]
-            log_tfidf += sep.join(map(str, row)).replace('.',',') + sep + split_names[i] + eol
-
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
@@ -236,7 +246,8 @@ class ClassificationCalculator(QThread):
         self.signals.PrintInfo.emit(output_dir + 'Rocchio_centroids.csv')
         writeStringToFile2(log_centr, output_dir + 'Rocchio_centroids.csv')
         self.signals.PrintInfo.emit(output_dir + 'tfidf_matrix.csv')
-        writeStringToFile2(log_tfidf, output_dir + 'tfidf_matrix.csv')
+        writeTFIDFMatrix(tfidf, uniq_words, [[fclass[i], split_names[i]] for i in range(len(fclass))],
+                         output_dir + 'tfidf_matrix.csv')
 
     # Алгоритм KNN
     def classification_knn(self, needPreprocessing):
@@ -250,52 +261,61 @@ class ClassificationCalculator(QThread):
         ###############ALGO##################
 
         fdata, fclass, split = makeFileList(input_dir)
-        tfidf, uniq_words = makeTFIDF(fdata[:split], fdata[split:])
+        tfidf, vocabulary = makeSparseTFIDF(fdata[:split], fdata[split:])
+        uniq_words = vocabularyWords(vocabulary)
         self.signals.UpdateProgressBar.emit(20)
-        trainingSet = addClassToTFIDF(tfidf[:split], fclass[:split])
-        testSet = addClassToTFIDF(tfidf[split:], fclass[split:])
+        trainingSet = tfidf[:split]
+        testSet = tfidf[split:]
+        trainingClass = fclass[:split]
+        testClass = fclass[split:]
         self.signals.UpdateProgressBar.emit(30)
         split_names = getBasePath(makeFileList(input_dir, fread=False)[0])
 
         self.signals.PrintInfo.emit("Алгоритм KNN")
+        metric = self.configurations.get('classification_knn_metric', 'euclidean')
+        weighting = self.configurations.get('classification_knn_weighting', 'uniform')
+        chunk_size = self.configurations.get('classification_knn_chunk_size', 1024)
+        log_neighbors_enabled = self.configurations.get('classification_knn_log_neighbors', True)
         predictions = []
-        log_neighbors = "Соседи и расстояния до них:" + eol
-        log_votes = "Голоса соседей:" + eol
         test_fnames = split_names[split:]
-        for x in range(len(testSet)):
-            neighbors, dist = getNeighbors(trainingSet, testSet[x], k)
-            result = getResponse(neighbors)
-            log_neighbors += "Документ:;" + str(test_fnames[x]) + eol + "Сосед" + sep + "Расстояние" + eol
-            for j in range(len(dist)):
-                log_neighbors += split_names[j] + sep + str(dist[j][1]).replace('.',',') + eol
-            log_votes += "Документ:;" + str(test_fnames[x]) + eol + "Принадлежит классу" + sep + result[0][0] + eol
-            log_votes += sep.join([str(x[0]) + sep + str(x[1]) for x in result]) + eol
-            predictions.append(result[0][0])
-            self.signals.PrintInfo.emit('> результат =' + repr(result[0][0]) + ', на самом деле=' + repr(testSet[x][-1]))
-        accuracy = getAccuracy(testSet, predictions)
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        # Журналы пишутся по мере обработки блоков тестовых документов
+        with contextlib.ExitStack() as stack:
+            votes_writer = stack.enter_context(OutputFileWriter(output_dir + 'Голоса.csv'))
+            votes_writer.write("Голоса соседей:" + eol)
+            neighbors_writer = None
+            if log_neighbors_enabled:
+                neighbors_writer = stack.enter_context(OutputFileWriter(output_dir + 'Соседи.csv'))
+                neighbors_writer.write("Соседи и расстояния до них:" + eol)
+            for start, nearest, distances in nearestNeighbors(testSet, trainingSet, k, metric, chunk_size):
+                for offset in range(len(nearest)):
+                    x = start + offset
+                    result = getWeightedResponse([trainingClass[j] for j in nearest[offset]], distances[offset], weighting)
+                    if neighbors_writer is not None:
+                        neighbors_writer.write("Документ:;" + str(test_fnames[x]) + eol + "Сосед" + sep + "Расстояние" + eol)
+                        for j, distance in zip(nearest[offset].tolist(), distances[offset].tolist()):
+                            neighbors_writer.write(split_names[j] + sep + str(distance).replace('.',',') + eol)
+                    votes_writer.write("Документ:;" + str(test_fnames[x]) + eol + "Принадлежит классу" + sep + result[0][0] + eol)
+                    votes_writer.write(sep.join([str(vote[0]) + sep + str(vote[1]).replace('.',',') for vote in result]) + eol)
+                    predictions.append(result[0][0])
+                    self.signals.PrintInfo.emit('> результат =' + repr(result[0][0]) + ', на самом деле=' + repr(testClass[x]))
+        accuracy = getLabelsAccuracy(testClass, predictions)
         self.signals.PrintInfo.emit('Точность: ' + repr(accuracy) + '%')
         self.signals.UpdateProgressBar.emit(50)
         ###############LOGS##################
-        log_tfidf = sep.join(uniq_words) + eol
-        combiSet = trainingSet + testSet
-
-        for i in range(len(combiSet)):
-            row = combiSet[i]
-            log_tfidf += sep.join(map(str, row)).replace('.',',') + sep + split_names[i] + eol
         self.signals.UpdateProgressBar.emit(70)
         self.signals.PrintInfo.emit("Выходные файлы:")
 
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
         self.signals.PrintInfo.emit(output_dir + 'tfidf_matrix.csv')
-        writeStringToFile(log_tfidf, output_dir + 'tfidf_matrix.csv')
+        writeTFIDFMatrix(tfidf, uniq_words, [[fclass[i], split_names[i]] for i in range(len(fclass))],
+                         output_dir + 'tfidf_matrix.csv')
 
-        self.signals.PrintInfo.emit(output_dir + 'Соседи.csv')
-        writeStringToFile(log_neighbors, output_dir + 'Соседи.csv')
+        if log_neighbors_enabled:
+            self.signals.PrintInfo.emit(output_dir + 'Соседи.csv')
 
         self.signals.PrintInfo.emit(output_dir + 'Голоса.csv')
-        writeStringToFile(log_votes, output_dir + 'Голоса.csv')
 
 
     def classification_llsf(self, needPreprocessing):
@@ -316,23 +336,22 @@ class ClassificationCalculator(QThread):
         eol = "\n"
         ###############ALGO##################
         fdata, fclass, split = makeFileList(input_dir)
-        tfidf, uniq_words = makeTFIDF(fdata[:split], fdata[split:])
-        class_titles = list(set(fclass))
+        tfidf, vocabulary = makeSparseTFIDF(fdata[:split], fdata[split:])
+        uniq_words = vocabularyWords(vocabulary)
+        class_titles = sorted(set(fclass))
         self.signals.UpdateProgressBar.emit(20)
-        A = np.array(tfidf[:split])
-        B = []
-        for cl in fclass[:len(A)]:
-            row = [0] * len(class_titles)
-            row[class_titles.index(cl)] = 1
-            B.append(row)
-        B = np.array(B)
+        A = tfidf[:split]
+        B = classMembership(fclass[:split], class_titles)
 
-        Fls = np.dot(np.transpose(B), np.transpose(np.linalg.pinv(A)))
+        solver = self.configurations.get("classification_llsf_solver", "svd")
+        Fls = llsfWeights(A, B, solver,
+                          self.configurations.get("classification_llsf_components", 200),
+                          self.configurations.get("classification_llsf_alpha", 0.0))
 
         self.signals.UpdateProgressBar.emit(40)
         class_table = [class_titles + ["Принадлежит классу"]]
-        for d in tfidf[split:]:
-            d_class = np.round(np.dot(Fls, np.transpose(np.array(d))), 2).tolist()
+        scores = llsfScores(tfidf[split:], Fls)
+        for d_class in np.round(scores, 2).tolist():
             class_table.append(d_class + [class_table[0][d_class.index(max(d_class))]])
         
         self.signals.UpdateProgressBar.emit(60)
@@ -342,34 +361,28 @@ class ClassificationCalculator(QThread):
         ###############LOGS##################
         split_names = getBasePath(makeFileList(input_dir, fread=False)[0])
 
-        A = A.tolist()
-        B = B.tolist()
+        B = B.astype(int).tolist()
         B.insert(0, class_titles)
-        Fls = addClassToTFIDF(Fls.tolist(), class_titles)
-        Fls.insert(0, uniq_words)
 
         test_files= split_names[split:]
         test_files.insert(0, "Файл")
         class_table = addClassToTFIDF(class_table, test_files)
 
-        log_tfidf = sep.join(uniq_words) + eol
-        for i in range(len(tfidf)):
-            row = tfidf[i]
-            log_tfidf += sep.join(map(str, row)).replace('.',',') + sep + split_names[i] + eol
-
         self.signals.PrintInfo.emit('Выходные файлы:')
 
         self.signals.UpdateProgressBar.emit(80)
         self.signals.PrintInfo.emit(output_dir + 'A.csv')
-        listToCsv(A, output_dir + 'A.csv')
+        listToCsv((A[i].toarray().ravel().round(2).tolist() for i in range(A.shape[0])), output_dir + 'A.csv')
         self.signals.PrintInfo.emit(output_dir + 'B.csv')
         listToCsv(B, output_dir + 'B.csv')
         self.signals.PrintInfo.emit(output_dir + 'Fls.csv')
-        listToCsv(Fls, output_dir + 'Fls.csv')
+        listToCsv(itertools.chain([uniq_words], (Fls[i].tolist() + [class_titles[i]] for i in range(Fls.shape[0]))),
+                  output_dir + 'Fls.csv')
         self.signals.PrintInfo.emit(output_dir + 'output_class.csv')
         listToCsv(class_table, output_dir + 'output_class.csv')
         self.signals.PrintInfo.emit(output_dir + 'tfidf_matrix.csv')
-        writeStringToFile2(log_tfidf, output_dir + 'tfidf_matrix.csv')
+        writeTFIDFMatrix(tfidf, uniq_words, [[split_names[i]] for i in range(tfidf.shape[0])],
+                         output_dir + 'tfidf_matrix.csv')
 
     def classification_id3(self, needPreprocessing):
         output_dir = self.output_dir + 'id3_out/'
@@ -377,12 +390,27 @@ class ClassificationCalculator(QThread):
             os.makedirs(output_dir)
 
         input_dir = self.method_input_dir
+        self.signals.PrintInfo.emit("Алгоритм ID3")
         fdata, fclass, split = makeFileList(input_dir)
         trainingSet = fdata[:split]
         trainingClass = fclass[:split]
         testSet = fdata[split:]
+        test_names = getBasePath(makeFileList(input_dir, fread=False)[0][split:])
+        self.signals.UpdateProgressBar.emit(40)
 
-        Classification_Text_ID3(input_dir, output_dir, trainingSet, trainingClass, testSet)
+        predictions = Classification_Text_ID3(input_dir, output_dir, trainingSet, trainingClass, testSet, test_names,
+                                              self.configurations.get("classification_id3_max_depth", 0),
+                                              self.configurations.get("classification_id3_min_samples", 2),
+                                              self.configurations.get("classification_id3_workers", 1))
+        test_classes = fclass[split:]
+        for predicted, actual in zip(predictions, test_classes):
+            self.signals.PrintInfo.emit('> результат =' + repr(predicted) + ', на самом деле=' + repr(actual))
+        self.signals.PrintInfo.emit('Точность: ' + repr(getLabelsAccuracy(test_classes, predictions)) + '%')
+        self.signals.UpdateProgressBar.emit(80)
+
+        self.signals.PrintInfo.emit('Выходные файлы:')
+        self.signals.PrintInfo.emit(output_dir + 'tree.txt')
+        self.signals.PrintInfo.emit(output_dir + 'result.txt')
 
 
 
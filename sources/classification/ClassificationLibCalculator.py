@@ -2,21 +2,25 @@
 # -*- coding: utf-8 -*-
 
 import csv
+import hashlib
 import math
 import copy
 import numpy as np
+import scipy.sparse
 import shutil
 import os
+import tracemalloc
 
 from PyQt5.QtCore import QObject
 from PyQt5.QtCore import QThread
 from PyQt5.QtCore import pyqtSignal
 from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
-from sklearn.naive_bayes import GaussianNB
+from sklearn.naive_bayes import ComplementNB, MultinomialNB
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.svm import SVC
 
 from sources.TextPreprocessing import writeStringToFile
+from sources.classification.LibNaiveBayes import SelectedFeaturesGaussianNB
 from sources.classification.clsf_util import makeFileListLib
 from sources.utils import makePreprocessingForAllFilesInFolder, clear_dir
 
@@ -48,6 +52,13 @@ class ClassificationLibCalculator(QThread):
         self.signals = ClassificationLibCalculatorSignals()
         self.need_preprocessing = False
 
+        # Векторизатор не хранит состояния, поэтому векторы документов можно переиспользовать:
+        # входная директория -> {хэш текста: строка матрицы}
+        self.vectorizer = HashingVectorizer()
+        self.vector_cache = {}
+        # Обученные модели: (метод, хэш обучающей выборки, параметры) -> классификатор
+        self.model_cache = {}
+
         if len(self.input_dir) > 0 and self.input_dir[-1] == '/':
             self.input_dir = self.input_dir[:-1]
         last_slash_index = self.input_dir.rfind('/')
@@ -97,6 +108,9 @@ class ClassificationLibCalculator(QThread):
         self.testSet = self.fdata[self.split:]
         self.test_filenames = self.filenames[self.split:]
 
+        self.training_hash = corpusHash(self.trainingSet, self.trainingClass)
+        self.vectorizeCorpus()
+
         self.signals.UpdateProgressBar.emit(40)
 
         if self.method_index == 0:
@@ -142,89 +156,113 @@ class ClassificationLibCalculator(QThread):
         writeStringToFile(result_s, output_filename)
 
 
-    def classification_knn(self):
-        self.signals.PrintInfo.emit("Алгоритм KNN")
-        output_dir = self.output_dir + 'knn_out/'
+    # Матрица документов (обучающие, затем тестовые): векторизуются только документы,
+    # которых ещё нет в кэше входной директории
+    def vectorizeCorpus(self):
+        vectors = self.vector_cache.setdefault(self.method_input_dir, {})
+        keys = [textHash(text) for text in self.fdata]
+        missing = {}
+        for key, text in zip(keys, self.fdata):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        if len(missing) > 0:
+            rows = self.vectorizer.transform(list(missing.values()))
+            for index, key in enumerate(missing.keys()):
+                vectors[key] = rows[index]
+        self.signals.PrintInfo.emit("Векторизовано документов: " + str(len(missing)) +
+                                    ", из кэша: " + str(len(keys) - len(missing)))
+        fdata = scipy.sparse.vstack([vectors[key] for key in keys], format='csr')
+        self.trainingMatrix = fdata[:self.split]
+        self.testMatrix = fdata[self.split:]
+
+    # Обученный классификатор из кэша; обучается, только если обучающая выборка
+    # или параметры изменились. prepare - преобразование матрицы перед классификатором
+    def fittedClassifier(self, method_name, parameters, make_classifier, prepare=None):
+        key = (method_name, self.training_hash, parameters)
+        classificator = self.model_cache.get(key)
+        if classificator is None:
+            self.signals.PrintInfo.emit("Обучение модели")
+            classificator = make_classifier()
+            trainingSet = prepare(self.trainingMatrix) if prepare != None else self.trainingMatrix
+            classificator.fit(trainingSet, self.trainingClass)
+            self.model_cache[key] = classificator
+        else:
+            self.signals.PrintInfo.emit("Используется обученная модель")
+        return classificator
+
+    # Классификация тестовых документов и запись результатов в output_dir/results.csv
+    def classifyTestSet(self, output_dir, method_name, parameters, make_classifier, prepare=None):
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # Переводим документы в векторы
-        # Особенно стоит обратить внимание на тип векторизатора, ведь существуют и другие.
-        vectorizer = HashingVectorizer()
-        fdata = vectorizer.fit_transform(self.fdata)
-        trainingSet = fdata[:self.split]
-        testSet = fdata[self.split:]
-
-        # Создаем и тренируем классификатор а затем классифицируем
-        classificator = KNeighborsClassifier(n_neighbors=self.knn_n_neighbors)
-        classificator.fit(trainingSet, self.trainingClass)
-        results = classificator.predict(testSet)
-        proba = classificator.predict_proba(testSet)
+        # Пиковая память обучения и классификации (для оценки размера задач)
+        trace_memory = self.configurations.get("classification_lib_trace_memory", False)
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            classificator = self.fittedClassifier(method_name, parameters, make_classifier, prepare)
+            testSet = prepare(self.testMatrix) if prepare != None else self.testMatrix
+            results = classificator.predict(testSet)
+            proba = classificator.predict_proba(testSet)
+            if trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+        if trace_memory:
+            self.signals.PrintInfo.emit("Пиковая память: " + str(round(peak / (1024 * 1024), 2)) + " МБ")
 
         self.write_results_to_file(output_dir + 'results.csv', results, proba, classificator.classes_, self.test_filenames)
         out_text = self.compile_result_string(results, proba, classificator.classes_, self.test_filenames)
         self.signals.PrintInfo.emit(out_text)
 
-
+    def classification_knn(self):
+        self.signals.PrintInfo.emit("Алгоритм KNN")
+        # Документы переводятся в векторы HashingVectorizer (vectorizeCorpus).
+        # Особенно стоит обратить внимание на тип векторизатора, ведь существуют и другие.
+        self.classifyTestSet(self.output_dir + 'knn_out/', 'knn', (self.knn_n_neighbors,),
+                             lambda: KNeighborsClassifier(n_neighbors=self.knn_n_neighbors))
 
     def classification_linear_svm(self):
         self.signals.PrintInfo.emit("Алгоритм Linear SVM")
-        output_dir = self.output_dir + 'linear_svm_out/'
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        vectorizer = HashingVectorizer()
-        fdata = vectorizer.fit_transform(self.fdata)
-        trainingSet = fdata[:self.split]
-        testSet = fdata[self.split:]
-
-        classificator = SVC(kernel="linear", probability=True, C=self.linear_svm_c)
-        classificator.fit(trainingSet, self.trainingClass)
-        results = classificator.predict(testSet)
-        proba = classificator.predict_proba(testSet)
-
-        self.write_results_to_file(output_dir + 'results.csv', results, proba, classificator.classes_, self.test_filenames)
-        out_text = self.compile_result_string(results, proba, classificator.classes_, self.test_filenames)
-        self.signals.PrintInfo.emit(out_text)
-
+        self.classifyTestSet(self.output_dir + 'linear_svm_out/', 'linear_svm', (self.linear_svm_c,),
+                             lambda: SVC(kernel="linear", probability=True, C=self.linear_svm_c))
 
     def classification_rbf_svm(self):
         self.signals.PrintInfo.emit("RBF SVM")
-        output_dir = self.output_dir + 'rbf_svm_out/'
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        vectorizer = HashingVectorizer()
-        fdata = vectorizer.fit_transform(self.fdata)
-        trainingSet = fdata[:self.split]
-        testSet = fdata[self.split:]
-
-        classificator = SVC(gamma=2, probability=True, C=self.rbf_svm_c)
-        classificator.fit(trainingSet, self.trainingClass)
-        results = classificator.predict(testSet)
-        proba = classificator.predict_proba(testSet)
-
-        self.write_results_to_file(output_dir + 'results.csv', results, proba, classificator.classes_,self.test_filenames)
-        out_text = self.compile_result_string(results, proba, classificator.classes_, self.test_filenames)
-        self.signals.PrintInfo.emit(out_text)
-
+        self.classifyTestSet(self.output_dir + 'rbf_svm_out/', 'rbf_svm', (self.rbf_svm_c,),
+                             lambda: SVC(gamma=2, probability=True, C=self.rbf_svm_c))
 
+    # Наивный Байес: gaussian - GaussianNB на плотной матрице только тех столбцов,
+    # которые встречаются в обучающей выборке (не больше n_features самых частых);
+    # multinomial и complement - MultinomialNB и ComplementNB прямо на разреженной матрице
     def classification_gaussian_nb(self):
+        model = self.configurations.get("classification_lib_nb_model", "gaussian")
+        if model == "multinomial" or model == "complement":
+            self.signals.PrintInfo.emit("Multinomial NB" if model == "multinomial" else "Complement NB")
+            # HashingVectorizer даёт отрицательные значения при коллизиях знака,
+            # а эти модели работают с неотрицательными частотами
+            self.classifyTestSet(self.output_dir + 'gaussian_nb_out/', model + '_nb', (),
+                                 lambda: MultinomialNB() if model == "multinomial" else ComplementNB(),
+                                 prepare=abs)
+            return
+
+        n_features = self.configurations.get("classification_lib_nb_features", 0)
         self.signals.PrintInfo.emit("Gaussian NB")
-        output_dir = self.output_dir + 'gaussian_nb_out/'
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        vectorizer = HashingVectorizer()
-        fdata = vectorizer.fit_transform(self.fdata)
-        trainingSet = fdata[:self.split]
-        testSet = fdata[self.split:]
-
-        classificator = GaussianNB()
-        classificator.fit(trainingSet.toarray(), self.trainingClass)
-        results = classificator.predict(testSet.toarray())
-        proba = classificator.predict_proba(testSet.toarray())
-
-        self.write_results_to_file(output_dir + 'results.csv', results, proba, classificator.classes_,self.test_filenames)
-        out_text = self.compile_result_string(results, proba, classificator.classes_, self.test_filenames)
-        self.signals.PrintInfo.emit(out_text)
\ No newline at end of file
+        self.classifyTestSet(self.output_dir + 'gaussian_nb_out/', 'gaussian_nb', (n_features,),
+                             lambda: SelectedFeaturesGaussianNB(n_features))
+
+
+# Хэш текста документа
+def textHash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+# Хэш обучающей выборки: тексты и классы документов по порядку
+def corpusHash(texts, classes):
+    corpus_hash = hashlib.sha256()
+    for text, cl in zip(texts, classes):
+        corpus_hash.update(str(cl).encode('utf-8'))
+        corpus_hash.update(b'\0')
+        corpus_hash.update(text.encode('utf-8'))
+        corpus_hash.update(b'\0')
+    return corpus_hash.hexdigest()
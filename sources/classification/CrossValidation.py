@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Оценка методов классификации без интерфейса: k-кратная перекрёстная проверка
+# и перебор сетки параметров методов.
+# Документы из train/ и test/ входной директории объединяются в один корпус,
+# который читается, токенизируется и векторизуется один раз; в каждом блоке
+# проверки tf-idf взвешивается по своей обучающей части. Блоки проверки
+# выполняются в пуле процессов, корпус передаётся каждому процессу один раз.
+#
+# Запуск из корня проекта:
+#   python -m sources.classification.CrossValidation input_files/classification/HDD_SSD \
+#       --methods knn,lib_linear_svm --grid knn:k=1,3,5 --grid lib_linear_svm:C=0.1,1,10
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import ComplementNB, MultinomialNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import SVC
+
+from sources.ConfigurationFile import parseConfigurationValue, readConfigurationFile
+from sources.classification.ID3 import ID3Classifier
+from sources.classification.KNN import getWeightedResponse, nearestNeighbors
+from sources.classification.LibNaiveBayes import SelectedFeaturesGaussianNB
+from sources.classification.LLSF import classMembership, llsfScores, llsfWeights
+from sources.classification.NaiveBayes import NaiveBayesModel
+from sources.classification.Rocchio import RocchioClassifier
+from sources.classification.clsf_util import createTokenPool, makeCountMatrix, \
+    makeFileList, makeVocabulary, weightTFIDF
+
+# Параметры методов: имя -> (ключ файла конфигурации, значение по умолчанию)
+METHOD_PARAMETERS = {
+    'naive_bayes': {},
+    'rocchio': {'metric': ('classification_rocchio_metric', 'euclidean')},
+    'knn': {'k': ('classification_knn_k', 3),
+            'metric': ('classification_knn_metric', 'euclidean'),
+            'weighting': ('classification_knn_weighting', 'uniform')},
+    'llsf': {'solver': ('classification_llsf_solver', 'svd'),
+             'components': ('classification_llsf_components', 200),
+             'alpha': ('classification_llsf_alpha', 0.0)},
+    'id3': {'max_depth': ('classification_id3_max_depth', 0),
+            'min_samples': ('classification_id3_min_samples', 2)},
+    'lib_knn': {'n_neighbors': ('knn_n_neighbors', 5)},
+    'lib_linear_svm': {'C': ('linear_svm_c', 1.0)},
+    'lib_rbf_svm': {'C': ('rbf_svm_c', 1.0)},
+    'lib_nb': {'model': ('classification_lib_nb_model', 'gaussian'),
+               'features': ('classification_lib_nb_features', 0)},
+}
+
+# Методы, которым нужна матрица HashingVectorizer по исходным текстам
+LIB_METHODS = ('lib_knn', 'lib_linear_svm', 'lib_rbf_svm', 'lib_nb')
+
+
+# Исходные тексты документов в нижнем регистре (как в ClassificationLibCalculator).
+# В отличие от createTokenPoolLib, нечитаемый файл - ошибка, а не пропуск:
+# иначе строки матрицы разойдутся с классами документов
+def readLowercaseTexts(filenames):
+    texts = []
+    for filename in filenames:
+        with open(filename, 'r', encoding='utf-8') as f:
+            texts.append(f.read().lower())
+    return texts
+
+
+# Корпус, общий для всех блоков проверки и всех наборов параметров
+class EvaluationCorpus:
+
+    def __init__(self, input_dir, need_hashing=False, fprocess=True):
+        self.filenames, self.classes, _ = makeFileList(input_dir, fread=False)
+        self.labels = np.array(self.classes)
+        self.tokens = createTokenPool(self.filenames, fprocess)
+        self.counts = makeCountMatrix(self.tokens, makeVocabulary(self.tokens))
+        self.hashed = None
+        if need_hashing:
+            self.hashed = HashingVectorizer().transform(readLowercaseTexts(self.filenames))
+
+    def documentsCount(self):
+        return len(self.labels)
+
+
+# Номера блоков проверки документов: документы каждого класса перемешиваются
+# и раздаются по блокам по очереди, поэтому доли классов в блоках почти одинаковы
+def stratifiedFolds(labels, folds, seed=None):
+    rng = np.random.default_rng(seed if seed is not None and seed >= 0 else None)
+    fold_of = np.empty(len(labels), dtype=np.int64)
+    offset = 0
+    for cl in sorted(set(labels)):
+        members = rng.permutation(np.flatnonzero(np.asarray(labels) == cl))
+        fold_of[members] = (np.arange(len(members)) + offset) % folds
+        offset += len(members)
+    return fold_of
+
+
+# Доля верных ответов и макро-F1 (среднее F1 по классам из ответов и верных меток)
+def accuracyAndF1(true_labels, predictions):
+    true_labels = np.asarray(true_labels)
+    predictions = np.asarray(predictions)
+    accuracy = float(np.mean(true_labels == predictions)) if len(true_labels) else 0.0
+    scores = []
+    for cl in sorted(set(true_labels.tolist()) | set(predictions.tolist())):
+        true_positive = np.count_nonzero((predictions == cl) & (true_labels == cl))
+        predicted = np.count_nonzero(predictions == cl)
+        actual = np.count_nonzero(true_labels == cl)
+        if true_positive == 0:
+            scores.append(0.0)
+        else:
+            precision = true_positive / predicted
+            recall = true_positive / actual
+            scores.append(2 * precision * recall / (precision + recall))
+    return accuracy, float(np.mean(scores)) if scores else 0.0
+
+
+# Все наборы параметров метода: значения из grid (имя -> список значений),
+# остальные - из файла конфигурации
+def parameterGrid(method, configurations, grid=None):
+    defaults = {name: configurations.get(key, default) for name, (key, default) in METHOD_PARAMETERS[method].items()}
+    grid = grid or {}
+    names = sorted(defaults)
+    values = [grid.get(name, [defaults[name]]) for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def parametersString(parameters):
+    return ', '.join(name + '=' + str(parameters[name]) for name in sorted(parameters))
+
+
+# Обучение на train и предсказание классов test; возвращает (предсказания, время обучения, время классификации)
+def fitAndPredict(corpus, method, parameters, train, test):
+    start = time.perf_counter()
+    train_labels = corpus.labels[train]
+
+    if method in ('knn', 'rocchio', 'llsf'):
+        tfidf = weightTFIDF(corpus.counts, train)
+        trainSet, testSet = tfidf[train], tfidf[test]
+    if method in LIB_METHODS:
+        trainSet, testSet = corpus.hashed[train], corpus.hashed[test]
+        if method == 'lib_nb' and parameters['model'] != 'gaussian':
+            trainSet, testSet = abs(trainSet), abs(testSet)
+
+    if method == 'naive_bayes':
+        model = NaiveBayesModel().fit([corpus.tokens[i] for i in train], train_labels.tolist())
+        fitted = time.perf_counter()
+        predictions = model.predict([corpus.tokens[i] for i in test])
+    elif method == 'id3':
+        model = ID3Classifier(parameters['max_depth'], parameters['min_samples'])
+        model.fit([corpus.tokens[i] for i in train], train_labels.tolist())
+        fitted = time.perf_counter()
+        predictions = model.predict([corpus.tokens[i] for i in test])
+    elif method == 'rocchio':
+        model = RocchioClassifier(parameters['metric']).fit(trainSet, train_labels.tolist())
+        fitted = time.perf_counter()
+        predictions = model.predict(testSet)
+    elif method == 'knn':
+        fitted = time.perf_counter()
+        predictions = []
+        for _, nearest, distances in nearestNeighbors(testSet, trainSet, parameters['k'], parameters['metric']):
+            for row, row_distances in zip(nearest, distances):
+                votes = getWeightedResponse(train_labels[row].tolist(), row_distances, parameters['weighting'])
+                predictions.append(votes[0][0])
+    elif method == 'llsf':
+        classes = sorted(set(train_labels.tolist()))
+        Fls = llsfWeights(trainSet, classMembership(train_labels.tolist(), classes),
+                          parameters['solver'], parameters['components'], parameters['alpha'])
+        fitted = time.perf_counter()
+        predictions = [classes[i] for i in np.argmax(llsfScores(testSet, Fls), axis=1)]
+    else:
+        if method == 'lib_knn':
+            model = KNeighborsClassifier(n_neighbors=min(parameters['n_neighbors'], len(train)))
+        elif method == 'lib_linear_svm':
+            model = SVC(kernel="linear", C=parameters['C'])
+        elif method == 'lib_rbf_svm':
+            model = SVC(gamma=2, C=parameters['C'])
+        elif parameters['model'] == 'gaussian':
+            model = SelectedFeaturesGaussianNB(parameters['features'])
+        else:
+            model = MultinomialNB() if parameters['model'] == 'multinomial' else ComplementNB()
+        model.fit(trainSet, train_labels)
+        fitted = time.perf_counter()
+        predictions = model.predict(testSet)
+
+    return list(predictions), fitted - start, time.perf_counter() - fitted
+
+
+_worker_corpus = None
+
+def _initEvaluationWorker(corpus):
+    global _worker_corpus
+    _worker_corpus = corpus
+
+# Задача пула: (номер конфигурации, метод, параметры, номер блока, обучающие и тестовые документы)
+def _evaluateInWorker(task):
+    index, method, parameters, fold, train, test = task
+    predictions, fit_time, predict_time = fitAndPredict(_worker_corpus, method, parameters, train, test)
+    accuracy, f1 = accuracyAndF1(_worker_corpus.labels[test], predictions)
+    return index, fold, accuracy, f1, fit_time, predict_time
+
+
+# Перекрёстная проверка всех конфигураций (метод, параметры);
+# возвращает список (номер конфигурации, блок, точность, F1, время обучения, время классификации)
+def crossValidate(corpus, configurations_list, folds=5, seed=None, workers=1):
+    folds = max(2, min(folds, corpus.documentsCount()))
+    fold_of = stratifiedFolds(corpus.labels, folds, seed)
+    tasks = []
+    for index, (method, parameters) in enumerate(configurations_list):
+        for fold in range(folds):
+            tasks.append((index, method, parameters, fold,
+                          np.flatnonzero(fold_of != fold), np.flatnonzero(fold_of == fold)))
+
+    if workers <= 1:
+        _initEvaluationWorker(corpus)
+        return [_evaluateInWorker(task) for task in tasks]
+    with multiprocessing.Pool(workers, initializer=_initEvaluationWorker, initargs=(corpus,)) as pool:
+        return pool.map(_evaluateInWorker, tasks)
+
+
+def number(value):
+    return str(round(value, 6)).replace('.', ',')
+
+# Запись таблиц: folds.csv - результаты по блокам, summary.csv - средние по конфигурациям;
+# возвращает строки итоговой таблицы
+def writeEvaluationTables(output_dir, configurations_list, results):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    with open(output_dir + 'folds.csv', 'w', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file, delimiter=';', lineterminator='\n')
+        writer.writerow(['Метод', 'Параметры', 'Блок', 'Точность', 'F1', 'Обучение, с', 'Классификация, с'])
+        for index, fold, accuracy, f1, fit_time, predict_time in sorted(results):
+            method, parameters = configurations_list[index]
+            writer.writerow([method, parametersString(parameters), fold,
+                             number(accuracy), number(f1), number(fit_time), number(predict_time)])
+
+    summary = []
+    for index, (method, parameters) in enumerate(configurations_list):
+        rows = np.array([result[2:] for result in results if result[0] == index])
+        summary.append([method, parametersString(parameters),
+                        rows[:, 0].mean(), rows[:, 0].std(), rows[:, 1].mean(), rows[:, 1].std(),
+                        rows[:, 2].mean(), rows[:, 3].mean()])
+    with open(output_dir + 'summary.csv', 'w', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file, delimiter=';', lineterminator='\n')
+        writer.writerow(['Метод', 'Параметры', 'Точность', 'Точность (СКО)', 'F1', 'F1 (СКО)',
+                         'Обучение, с', 'Классификация, с'])
+        for row in summary:
+            writer.writerow(row[:2] + [number(value) for value in row[2:]])
+    return summary
+
+
+# Сетка из строк вида "метод:параметр=значение1,значение2"
+def parseGrid(grid_strings):
+    grids = {}
+    for grid_string in grid_strings or []:
+        method, assignment = grid_string.split(':', 1)
+        name, values = assignment.split('=', 1)
+        grids.setdefault(method, {})[name] = [parseConfigurationValue(value) for value in values.split(',')]
+    return grids
+
+
+def main():
+    configurations = readConfigurationFile("configuration.cfg")
+    parser = argparse.ArgumentParser(description='Перекрёстная проверка и перебор параметров методов классификации')
+    parser.add_argument('input_dir', help='каталог с подкаталогами train/ и test/')
+    parser.add_argument('--methods', default=configurations.get("classification_cv_methods", 'knn,rocchio'),
+                        help='методы через запятую: ' + ','.join(METHOD_PARAMETERS))
+    parser.add_argument('--grid', action='append',
+                        help='значения параметра, например knn:k=1,3,5 (можно повторять)')
+    parser.add_argument('--folds', type=int, default=configurations.get("classification_cv_folds", 5))
+    parser.add_argument('--workers', type=int, default=configurations.get("classification_cv_workers", 1))
+    parser.add_argument('--seed', type=int, default=configurations.get("classification_cv_seed", 42))
+    parser.add_argument('--no-morph', action='store_true', help='не нормализовать слова (уже обработанный корпус)')
+    parser.add_argument('--output', default=configurations.get("output_files_directory", "output_files") +
+                        '/classification/cross_validation/')
+    args = parser.parse_args()
+
+    methods = [method.strip() for method in str(args.methods).split(',') if method.strip()]
+    for method in methods:
+        if method not in METHOD_PARAMETERS:
+            parser.error('неизвестный метод: ' + method)
+    grids = parseGrid(args.grid)
+    configurations_list = [(method, parameters) for method in methods
+                           for parameters in parameterGrid(method, configurations, grids.get(method))]
+
+    started = time.perf_counter()
+    corpus = EvaluationCorpus(args.input_dir, any(method in LIB_METHODS for method in methods), not args.no_morph)
+    print('Документов:', corpus.documentsCount(), 'чтение и векторизация:', round(time.perf_counter() - started, 2), 'с')
+
+    results = crossValidate(corpus, configurations_list, args.folds, args.seed, args.workers)
+    output_dir = args.output if args.output.endswith('/') else args.output + '/'
+    summary = writeEvaluationTables(output_dir, configurations_list, results)
+
+    print('%-16s %-48s %9s %9s %11s %11s' % ('Метод', 'Параметры', 'Точность', 'F1', 'Обучение,с', 'Классиф.,с'))
+    for method, parameters, accuracy, _, f1, _, fit_time, predict_time in summary:
+        print('%-16s %-48s %9.4f %9.4f %11.4f %11.4f' % (method, parameters, accuracy, f1, fit_time, predict_time))
+    print('Таблицы:', output_dir + 'summary.csv', output_dir + 'folds.csv')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,254 +1,173 @@
 # -*- coding: utf-8 -*-
-import csv
-import re, os
+import os
 import numpy as np
-import pymorphy2
-
-##########################################
-# directoryTest = 'china/test'
-# category = list(os.listdir('china/train'))
-#
-# directoryTrue = 'china/train/' + category[0]
-# directoryFalse = 'china/train/' + category[1]
-#
-# trueFiles = os.listdir(directoryTrue)
-# falseFiles = os.listdir(directoryFalse)
-# testFiles = os.listdir(directoryTest)
-############################################
-category = []
-trueFiles = []
-falseFiles=[]
-testFiles = []
-trueFilesName = []
-falseFilesName=[]
-testFilesName = []
-input_dir1 = ''
-
-def Classification_Text_ID3(input_dir,output_dir, trainingSet, trainingClass, testSet):
-
-    global category
-    global trueFiles
-    global falseFiles
-    global testFiles
-    global trueFilesName
-    global falseFilesName
-    global testFilesName
-    global input_dir1
-
-    tree_file = output_dir + 'tree.txt'
-    result_file = output_dir + 'result.txt'
-    category = sorted(list(set(trainingClass)))
-    input_dir1 = input_dir
-    testFiles = testSet
-
-    for i in range(len(trainingSet)):
-       if  trainingClass[i] == category[0]:
-           trueFiles.append(trainingSet[i])
-       else:
-           falseFiles.append(trainingSet[i])
-
-    Words = words()
-    list_words_in_file = Analysis_of_words(Words)
-    applyID3(tree_file,Words,list_words_in_file)
-    testTrue = []
-    testFalse = []
-    lastWord = ' '
-    i = 0
-    for f in testFiles:
-        arr = list(set(f))
-        with open(tree_file) as tree:
-            for line in tree:
-                s1 = line.strip()
-                s1 = s1.split('=')
-                if s1[0]==lastWord:
-                    lastWord = ' '
+from concurrent.futures import ThreadPoolExecutor
+
+from sources.classification.clsf_util import makeCountMatrix
+
+# Обучающие документы хранятся булевой матрицей (документы x слова): есть ли слово
+# в документе. Прирост информации для всех слов узла считается сразу по числам
+# документов каждого класса со словом и без него; на широких словарях столбцы
+# делятся на блоки, которые считаются параллельно в пуле потоков. Дерево хранится
+# в памяти (ID3Node), файл tree.txt - только выгрузка дерева.
+
+# Наименьшее число слов в блоке одного потока при расчёте прироста информации
+ID3_PARALLEL_MIN_COLUMNS = 4096
+
+#узел дерева: лист с классом label или проверка слова word (ветви present и absent)
+class ID3Node:
+
+    def __init__(self, label=None, word=None):
+        self.label = label
+        self.word = word
+        self.present = None
+        self.absent = None
+
+    def isLeaf(self):
+        return self.word is None
+
+
+#булева матрица наличия слов словаря в документах
+def booleanMatrix(docs, vocabulary):
+    return makeCountMatrix(docs, vocabulary).toarray() > 0
+
+#энтропия распределений по классам (последняя ось counts - числа документов классов)
+def classEntropy(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    totals = counts.sum(axis=-1, keepdims=True)
+    p = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+    logs = np.log2(p, out=np.zeros_like(p), where=p > 0)
+    return -(p * logs).sum(axis=-1)
+
+#прирост информации для всех слов по документам X (булева матрица) с номерами
+#классов labels (0..classes_count-1)
+def informationGains(X, labels, classes_count):
+    present = np.stack([np.count_nonzero(X[labels == c], axis=0) for c in range(classes_count)], axis=1)
+    class_totals = np.bincount(labels, minlength=classes_count)
+    absent = class_totals - present
+    present_total = present.sum(axis=1)
+    conditional = (present_total * classEntropy(present) +
+                   (X.shape[0] - present_total) * classEntropy(absent)) / X.shape[0]
+    gains = classEntropy(class_totals) - conditional
+    # Округление: равные по смыслу приросты не различаются из-за погрешности
+    return np.round(gains, 12)
+
+
+#дерево решений ID3 для любого числа классов; состояние хранится в объекте,
+#поэтому несколько деревьев могут обучаться в одном процессе
+class ID3Classifier:
+
+    #max_depth - наибольшая глубина дерева (0 - без ограничения);
+    #min_samples - узел с меньшим числом документов становится листом;
+    #workers - число потоков для расчёта прироста информации
+    def __init__(self, max_depth=0, min_samples=2, workers=1):
+        self.max_depth = max_depth
+        self.min_samples = min_samples
+        self.workers = max(1, workers)
+        self.classes = []
+        self.words = []
+        self.root = None
+
+    #столбцы X блоками для потоков (None - считать без пула)
+    def __columnBlocks(self, X):
+        blocks_count = min(self.workers, X.shape[1] // ID3_PARALLEL_MIN_COLUMNS)
+        if blocks_count < 2:
+            return None
+        return [np.ascontiguousarray(X[:, block[0]:block[-1] + 1])
+                for block in np.array_split(np.arange(X.shape[1]), blocks_count)]
+
+    #прирост информации для документов rows; каждый поток сам выбирает строки своего блока
+    def __gains(self, X, blocks, rows, labels, pool):
+        if blocks is None:
+            return informationGains(X[rows], labels, len(self.classes))
+        parts = pool.map(lambda block: informationGains(block[rows], labels, len(self.classes)), blocks)
+        return np.concatenate(list(parts))
+
+    #построение дерева без рекурсии (глубина дерева может быть порядка числа документов)
+    def fit(self, docs, classes):
+        self.classes = sorted(set(classes))
+        self.words = sorted(set(word for doc in docs for word in doc))
+        X = booleanMatrix(docs, dict(zip(self.words, range(len(self.words)))))
+        class_index = dict(zip(self.classes, range(len(self.classes))))
+        y = np.array([class_index[cl] for cl in classes], dtype=np.int64)
+
+        blocks = self.__columnBlocks(X)
+        pool = ThreadPoolExecutor(len(blocks)) if blocks is not None else None
+        try:
+            self.root = ID3Node()
+            stack = [(self.root, np.arange(X.shape[0]), 0)]
+            while stack:
+                node, rows, depth = stack.pop()
+                labels = y[rows]
+                # Класс большинства; при равенстве - первый по алфавиту
+                node.label = self.classes[int(np.argmax(np.bincount(labels, minlength=len(self.classes))))]
+                if len(rows) < max(self.min_samples, 2) or 0 < self.max_depth <= depth or X.shape[1] == 0:
                     continue
-                if s1[0] in arr or lastWord != ' ' :
+                gains = self.__gains(X, blocks, rows, labels, pool)
+                best = int(np.argmax(gains))
+                if gains[best] <= 0:
                     continue
+                node.word = self.words[best]
+                node.present = ID3Node()
+                node.absent = ID3Node()
+                has_word = X[rows, best]
+                stack.append((node.absent, rows[~has_word], depth + 1))
+                stack.append((node.present, rows[has_word], depth + 1))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self
+
+    #класс документа (списка слов)
+    def predictOne(self, doc):
+        doc_words = set(doc)
+        node = self.root
+        while not node.isLeaf():
+            node = node.present if node.word in doc_words else node.absent
+        return node.label
+
+    def predict(self, docs):
+        return [self.predictOne(doc) for doc in docs]
+
+    #выгрузка дерева: для узла строки "слово=1" (ветвь со словом) и "слово=0" (без слова),
+    #под каждой строкой - поддерево с отступом, листья - классы
+    def exportTree(self, filename):
+        with open(filename, 'w') as f:
+            stack = [(self.root, 0)]
+            while stack:
+                item, tabnum = stack.pop()
+                if isinstance(item, str):
+                    f.write('\t' * tabnum + item + '\n')
+                elif item.isLeaf():
+                    f.write('\t' * tabnum + str(item.label) + '\n')
                 else:
-                    if s1[0] == '0':
-                        testFalse.append(testFilesName[i])
-                        i+=1
-                        break
-                    if s1[0] == '1':
-                        testTrue.append(testFilesName[i])
-                        i+=1
-                        break
-                    else:
-                        a = s1[0]
-                        lastWord = a
-                        continue
-    res = open(result_file,'w')
-
-    for i in range(len(testTrue)):
-        if i == 0 :
-            res.write('\n' + category[0] + ":")
-            print('\n' + category[0] + ":")
-        res.write(str('\n\t' + testTrue[i]))
-        print(str('\t' + testTrue[i]))
-    for i in range(len(testFalse)):
-        if i == 0:
-            res.write('\n' + category[1] + ":")
-            print('\n' + category[1] + ":")
-        res.write(str('\n\t' + testFalse[i]))
-        print(str('\t' + testFalse[i]))
-    res.close()
-    category = []
-    trueFiles = []
-    falseFiles = []
-    testFiles = []
-    trueFilesName = []
-    falseFilesName = []
-    testFilesName = []
-    input_dir1 = ''
-
-def words():
-    Words = {}
-    global category
-    global trueFiles
-    global falseFiles
-    global testFiles
-    global trueFilesName
-    global falseFilesName
-    global testFilesName
-    global input_dir1
-
-    for f in trueFiles:
-        arr = list(set(f))
-        for s in arr:
-            if s not in Words:  Words[s] = [0,1,0.0]
-            else: Words[s][1]+=1
+                    stack.append((item.absent, tabnum + 1))
+                    stack.append((item.word + '=0', tabnum))
+                    stack.append((item.present, tabnum + 1))
+                    stack.append((item.word + '=1', tabnum))
 
-    for f in falseFiles:
-        arr = f
-        arr = list(set(arr))
-        for s in arr:
-            if s not in Words:  Words[s] = [1,0,0.0]
-            else: Words[s][0]+=1
-    return Words
 
-def Analysis_of_words(Words):
-    global category
-    global trueFiles
-    global falseFiles
-    global testFiles
-    global trueFilesName
-    global falseFilesName
-    global testFilesName
-    global input_dir1
+#обучение, классификация тестовых документов и запись tree.txt и result.txt;
+#возвращает предсказанные классы тестовых документов
+def Classification_Text_ID3(input_dir, output_dir, trainingSet, trainingClass, testSet, test_names=None,
+                            max_depth=0, min_samples=2, workers=1):
 
-    list_words = sorted(Words.keys())
-    list_words_in_files = {}
-    cells = []
+    if test_names is None:
+        test_names = [str(i) for i in range(len(testSet))]
 
-    trueFilesName = os.listdir(input_dir1 + '/train/' + category[0])
-    falseFilesName = os.listdir(input_dir1 + '/train/' + category[1])
-    testFilesName = sorted(os.listdir(input_dir1 + '/test/' + category[0]) +  os.listdir(input_dir1 + '/test/' + category[1]))
+    classifier = ID3Classifier(max_depth, min_samples, workers).fit(trainingSet, trainingClass)
+    classifier.exportTree(output_dir + 'tree.txt')
 
-    for i in range(len(trueFiles)):
-        for j in range(len(list_words) + 1): cells.append(0)
+    predictions = classifier.predict(testSet)
+    with open(output_dir + 'result.txt', 'w') as res:
+        for cl in classifier.classes:
+            names = [name for name, predicted in zip(test_names, predictions) if predicted == cl]
+            if len(names) > 0:
+                res.write('\n' + cl + ":")
+            for name in names:
+                res.write('\n\t' + name)
 
-        arr = trueFiles[i]
-        arr = list(set(arr))
-        for s in list_words:
-            if s in arr: cells[list_words.index(s)] = 1
-        cells[len(cells)-1] = 1
-        list_words_in_files[trueFilesName[i]] = cells
-        cells = []
-
-    for i in range(len(falseFiles)):
-        for j in range(len(list_words) + 1): cells.append(0)
-        arr = falseFiles[i]
-        arr = list(set(arr))
-        for s in list_words:
-            if s in arr: cells[list_words.index(s)] = 1
-        list_words_in_files[falseFilesName[i]] = cells
-        cells = []
-
-    return list_words_in_files
-
-def ParseAttributes2(Words,list_words_in_file):
-    global category
-    global trueFiles
-    global falseFiles
-    global testFiles
-    global trueFilesName
-    global falseFilesName
-    global testFilesName
-    global input_dir1
-    attr, attrnames, tests = {}, [], []
-    justList = list_words_in_file
-    attrnum = len(Words.keys()) + 1
-    for s in Words.keys():
-        i = 0
-        fWords = [s, 1, 0]
-        attrnames.append(fWords[0])
-        attr[fWords[0]] = [i, fWords[1], fWords[2]]
-        attr[fWords[1]] = 1
-        attr[fWords[2]] = 0
-        i+=1
-    num = attrnum -1 # позиция вывода
-    #testnum = len(trueFiles) + len(falseFiles)
-    for s in justList.keys():
-        tests.append(justList[s])
-    return [attrnum, sorted(attrnames), attr, tests, num]
-
-def entropy(tests,num):
-    import math
-    def log2(x): return math.log(x)/math.log(2)
-    neg = float(len(list(filter(lambda x:(x[num]==0),tests))))
-    tot = float(len(tests))
-    if ((neg==tot) or (neg==0)): return 0
-    # e = -(neg/tot)*log2(neg/tot)-((tot-neg)/tot)*log2(((tot-neg)/tot))
-    return -(neg/tot)*log2(neg/tot)-((tot-neg)/tot)*log2(((tot-neg)/tot))
-
-def gain(tests,attrnum,num):
-    res = 0
-    for i in range(2):
-        arr = list(filter(lambda x:(x[attrnum]==i),tests))
-        res += entropy(arr,num)*len(arr)/float(len(tests))
-        # A = entropy(tests,num)-res
-    return entropy(tests,num)-res
-
-def ID3(tests,num,f,tabnum,usedattr,attrnames,attr):
-    mas = ['', '', '', '', ]
-    def findgains(x):
-        if usedattr[x]: return 0
-        return gain(tests,x,num)
-    if (len(tests)==0):
-        f.write('\t'*tabnum+'1')
-        return
-    if len(list(filter(lambda x:(x[num]==0),tests)))>len(list(filter(lambda x:(x[num]==1),tests))):
-        majority = '0'
-    else: majority = '1'
-    gains = list(map(findgains, range(len(tests[0]))))
-    maxgain = gains.index(max(gains))
-    if (gains [maxgain] == 0):
-        f.write('\t' * tabnum + majority + '\n')
-        return
-    arrpos = list(filter(lambda x: (x[maxgain] == 1), tests))
-    arrneg = list(filter(lambda x: (x[maxgain] == 0), tests))
-    newusedattr = usedattr
-    newusedattr[maxgain] = True
-    f.write('\t' * tabnum + str(attrnames[maxgain] + '=' + str(attr[attrnames[maxgain]][1]) + '\n'))
-
-    if (len(arrpos) == 0):
-        f.write('\t' * (tabnum + 1) + majority + '\n')
-    else:
-        ID3(arrpos, num, f, tabnum + 1, newusedattr, attrnames, attr)
-    f.write('\t' * tabnum + str(attrnames[maxgain]) + '=' + str(attr[attrnames[maxgain]][2]) + '\n')
-    if (len(arrneg) == 0):
-        f.write('\t' * (tabnum + 1) + majority + '\n')
-    else:
-        ID3(arrneg, num, f, tabnum + 1, newusedattr, attrnames, attr)
-
-def applyID3(outfname,Words,list_words_in_file):
-    bigarr = ParseAttributes2(Words,list_words_in_file)
-    attrnum, attrnames, attr, tests, num = bigarr[0], bigarr[1], bigarr[2], bigarr[3], bigarr[4]
-    f = open(outfname, 'w')
-    usedattr = []
-    for i in range(attrnum): usedattr.append(i == num)
-    ID3(tests, attrnum - 1, f, 0, usedattr, attrnames, attr)
+    return predictions
 
 ########TEST############
 
@@ -259,4 +178,3 @@ def applyID3(outfname,Words,list_words_in_file):
 # SET = [['китайский', 'пекин', 'китайский'], ['китайский', 'китайский', 'шанхай'], ['китайский', 'китайский', 'макао'], ['токио', 'япония', 'китайский']]
 
 # Classification_Text_ID3(inputF,outputF,SET,CLASS,TESTSET )
-
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
 import operator
+import numpy as np
+
 from sources.classification.clsf_util import *
+from sources.clasterization.DistanceKernels import cosineSimilarityMatrix, euclideanDistanceMatrix
 
 #подсчёт голосов соседей
 def getResponse(neighbors):
@@ -14,3 +17,53 @@ def getResponse(neighbors):
 			classVotes[response] = 1
 	sortedVotes = sorted(classVotes.items(), key=operator.itemgetter(1), reverse=True)
 	return sortedVotes
+
+#метрики для поиска соседей
+KNN_METRICS = ('euclidean', 'cosine')
+
+#расстояния от документов X до документов Y одним матричным произведением;
+#для cosine расстояние - 1 - косинусное сходство
+def distanceMatrix(X, Y, metric = 'euclidean'):
+	if metric == 'cosine':
+		return 1 - cosineSimilarityMatrix(X, Y)
+	if metric == 'euclidean':
+		return euclideanDistanceMatrix(X, Y)
+	raise ValueError('Неизвестная метрика KNN: ' + str(metric))
+
+#k ближайших соседей для строк тестовой выборки, блоками по chunk_size строк
+#(в памяти одновременно только chunk_size x len(train) расстояний);
+#выдаёт (первая строка блока, номера соседей, расстояния до них) по возрастанию расстояния
+def nearestNeighbors(testSet, trainingSet, k, metric = 'euclidean', chunk_size = 1024):
+	k = min(k, trainingSet.shape[0])
+	if chunk_size <= 0:
+		chunk_size = testSet.shape[0]
+	for start in range(0, testSet.shape[0], chunk_size):
+		distances = distanceMatrix(testSet[start:start + chunk_size], trainingSet, metric)
+		if k < distances.shape[1]:
+			nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+		else:
+			nearest = np.tile(np.arange(distances.shape[1]), (distances.shape[0], 1))
+		nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+		# Сортируем только k выбранных соседей (при равенстве - по номеру документа)
+		order = np.lexsort((nearest, nearest_distances), axis=1)
+		nearest = np.take_along_axis(nearest, order, axis=1)
+		yield start, nearest, np.take_along_axis(nearest_distances, order, axis=1)
+
+#голоса соседей: uniform - по одному голосу, distance - голос 1/расстояние
+#(если есть соседи на нулевом расстоянии, голосуют только они);
+#список (класс, голоса) по убыванию голосов, при равенстве - у кого сосед ближе
+def getWeightedResponse(labels, distances, weighting = 'uniform'):
+	if weighting == 'distance':
+		distances = np.asarray(distances, dtype=np.float64)
+		if np.any(distances == 0):
+			weights = (distances == 0).astype(np.float64)
+		else:
+			weights = 1 / distances
+	else:
+		weights = np.ones(len(labels))
+	classVotes = {}
+	for label, weight in zip(labels, weights.tolist()):
+		classVotes[label] = classVotes.get(label, 0) + weight
+	if weighting != 'distance':
+		classVotes = {label: int(votes) for label, votes in classVotes.items()}
+	return sorted(classVotes.items(), key=operator.itemgetter(1), reverse=True)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+# Линейная аппроксимация методом наименьших квадратов (LLSF):
+# матрица Fls (классы x слова) минимизирует ||A Fls^T - B||, где A - tf-idf
+# обучающих документов (документы x слова), B - принадлежность документов
+# классам (документы x классы). Оценки тестовых документов - X Fls^T.
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+# pinv - псевдообратная плотной матрицы A (точно, но память N x V и время N^2 V);
+# svd - усечённое сингулярное разложение разреженной A (components компонент);
+# ridge - гребневая регрессия (A^T A + alpha I) W = A^T B по меньшей стороне A;
+# lsqr - итерационный метод LSQR на разреженной A (alpha - коэффициент регуляризации)
+LLSF_SOLVERS = ('pinv', 'svd', 'ridge', 'lsqr')
+
+# Сингулярные числа меньше этой доли наибольшего отбрасываются (как в np.linalg.pinv)
+LLSF_RCOND = 1e-15
+
+
+#матрица принадлежности документов классам (документы x классы)
+def classMembership(labels, classes):
+    B = np.zeros((len(labels), len(classes)))
+    class_index = dict(zip(classes, range(len(classes))))
+    B[np.arange(len(labels)), [class_index[label] for label in labels]] = 1
+    return B
+
+
+#W = pinv(A) B по сингулярному разложению A = U diag(s) Vt
+def svdSolve(U, s, Vt, B):
+    keep = s > LLSF_RCOND * (s.max() if len(s) else 0)
+    return Vt[keep].T @ ((U[:, keep].T @ B) / s[keep][:, np.newaxis])
+
+
+#усечённое сингулярное разложение; если компонент не меньше ранга матрицы
+#(или components <= 0) - полное разложение
+def truncatedSVD(A, components):
+    if 0 < components < min(A.shape) - 1:
+        # Фиксированный начальный вектор - результат не зависит от запуска
+        v0 = np.full(min(A.shape), 1 / np.sqrt(min(A.shape)))
+        U, s, Vt = scipy.sparse.linalg.svds(scipy.sparse.csr_matrix(A), k=components, v0=v0)
+        return U, s, Vt
+    A = A.toarray() if scipy.sparse.issparse(A) else np.asarray(A)
+    return np.linalg.svd(A, full_matrices=False)
+
+
+#гребневая регрессия: при N <= V решается двойственная задача с матрицей N x N
+#(W = A^T (A A^T + alpha I)^-1 B), иначе прямая с матрицей V x V
+def ridgeSolve(A, B, alpha):
+    A = scipy.sparse.csr_matrix(A)
+    if A.shape[0] <= A.shape[1]:
+        gram = (A @ A.T).toarray() + alpha * np.eye(A.shape[0])
+        return np.asarray(A.T @ np.linalg.lstsq(gram, B, rcond=None)[0])
+    gram = (A.T @ A).toarray() + alpha * np.eye(A.shape[1])
+    return np.linalg.lstsq(gram, np.asarray(A.T @ B), rcond=None)[0]
+
+
+#LSQR для каждого класса; при alpha = 0 - решение минимальной нормы
+def lsqrSolve(A, B, alpha, iterations=None):
+    A = scipy.sparse.csr_matrix(A)
+    W = np.zeros((A.shape[1], B.shape[1]))
+    for j in range(B.shape[1]):
+        W[:, j] = scipy.sparse.linalg.lsqr(A, B[:, j], damp=np.sqrt(alpha), iter_lim=iterations)[0]
+    return W
+
+
+#матрица Fls (классы x слова)
+def llsfWeights(A, B, solver='svd', components=0, alpha=0.0):
+    if solver == 'pinv':
+        A = A.toarray() if scipy.sparse.issparse(A) else np.asarray(A)
+        return np.dot(np.transpose(B), np.transpose(np.linalg.pinv(A)))
+    if solver == 'svd':
+        return svdSolve(*truncatedSVD(A, components), B).T
+    if solver == 'ridge':
+        return ridgeSolve(A, B, alpha).T
+    if solver == 'lsqr':
+        return lsqrSolve(A, B, alpha).T
+    raise ValueError('Неизвестный метод решения LLSF: ' + str(solver))
+
+
+#оценки документов X по классам (документы x классы) одним произведением
+def llsfScores(X, Fls):
+    return np.asarray(X @ Fls.T)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Модели наивного Байеса поверх sklearn без зависимостей от интерфейса:
+# используются и в ClassificationLibCalculator, и в CrossValidation.
+
+import numpy as np
+import scipy.sparse
+from sklearn.naive_bayes import GaussianNB
+
+
+# GaussianNB на плотной матрице выбранных столбцов разреженной матрицы.
+# Столбцы, нулевые во всей обучающей выборке, одинаково влияют на все классы,
+# поэтому без ограничения n_features (0) результат совпадает с GaussianNB на всей
+# матрице; при n_features > 0 остаются столбцы с наибольшим числом документов.
+class SelectedFeaturesGaussianNB:
+
+    def __init__(self, n_features=0):
+        self.n_features = n_features
+        self.model = GaussianNB()
+
+    def fit(self, X, y):
+        X = scipy.sparse.csr_matrix(X)
+        X.sum_duplicates()
+        document_counts = np.bincount(X.indices, minlength=X.shape[1])
+        columns = np.flatnonzero(document_counts)
+        if 0 < self.n_features < len(columns):
+            order = np.argsort(-document_counts[columns], kind='stable')
+            columns = np.sort(columns[order[:self.n_features]])
+        self.columns = columns
+        self.model.fit(X[:, self.columns].toarray(), y)
+        self.classes_ = self.model.classes_
+        return self
+
+    def predict(self, X):
+        return self.model.predict(scipy.sparse.csr_matrix(X)[:, self.columns].toarray())
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(scipy.sparse.csr_matrix(X)[:, self.columns].toarray())
@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 import csv
 import re, os
+import hashlib
 import numpy as np
+import scipy.sparse
 #import csv
 #import operator
-import pymorphy2
+
+from sources.MorphAnalyzerCache import getSharedMorphAnalyzer
+from sources.classification.clsf_util import makeCountMatrix, vocabularyWords
 
 def localize_floats(row):
     return [
@@ -198,20 +202,15 @@ class Pool(object):
     def __init__(self):
         self.__document_classes = {}
         self.__vocabulary = BagOfWords()
-        self.__morph = pymorphy2.MorphAnalyzer() 
+        self.__morph = getSharedMorphAnalyzer()
         
     def BagOfWords_in_class(self, dclass):
         return self.__document_classes[dclass].WordsAndFreq()
 
-    #количество слов в классе
+    #количество слов в классе (все слова класса есть в общем словаре)
     def sum_words_in_class(self, dclass):
 
-        sum = 0
-        for word in self.__vocabulary.Words():
-            WaF = self.__document_classes[dclass].WordsAndFreq()
-            if word in WaF:
-                sum +=  WaF[word]
-        return sum
+        return sum(self.__document_classes[dclass].WordsAndFreq().values())
     
     #обучение
     def learn(self, directory, dclass_name):
@@ -228,38 +227,37 @@ class Pool(object):
     #тест - перебор всех комбинаций классов
     def Probability(self, doc, dclass = ""):
 
-        #если нет класса, вызываем Probability ещё раз и считаем его
+        #документ читается один раз для всех классов
+        d = Document(self.__vocabulary)
+        d.read_document(doc, self.__morph)
+        sums = {j: self.sum_words_in_class(j) for j in self.__document_classes}
         if dclass:
-            sum_dclass = self.sum_words_in_class(dclass)
-            prob = 0
-        
-            d = Document(self.__vocabulary)
-            d.read_document(doc, self.__morph)
-            
-            #вероятность встретить документ d среди всех документов класса j;
-            for j in self.__document_classes:
-                sum_j = self.sum_words_in_class(j)
-                prod = 1
-                #произведение условных вероятностей всех слов входящих в d
-                for i in d.Words():
-                    wf_dclass = 1 + self.__document_classes[dclass].WordFreq(i)
-                    wf = 1 + self.__document_classes[j].WordFreq(i)
-                    r = wf * sum_dclass / (wf_dclass * sum_j)
-                    prod *= r
-                #Формула наивного байеса
-                prob += prod * self.__document_classes[j].NumberOfDocuments() / self.__document_classes[dclass].NumberOfDocuments()
-            if prob != 0:
-                return round(1 / prob, 3)
-            else:
-                return -1
+            return self.__class_probability(d, dclass, sums)
+        prob_list = []
+        for dclass in self.__document_classes:
+            prob_list.append([dclass, self.__class_probability(d, dclass, sums)])
+        prob_list.sort(key = lambda x: x[1], reverse = True)
+        return prob_list
+
+    def __class_probability(self, d, dclass, sums):
+        sum_dclass = sums[dclass]
+        prob = 0
+        #вероятность встретить документ d среди всех документов класса j;
+        for j in self.__document_classes:
+            sum_j = sums[j]
+            prod = 1
+            #произведение условных вероятностей всех слов входящих в d
+            for i in d.Words():
+                wf_dclass = 1 + self.__document_classes[dclass].WordFreq(i)
+                wf = 1 + self.__document_classes[j].WordFreq(i)
+                r = wf * sum_dclass / (wf_dclass * sum_j)
+                prod *= r
+            #Формула наивного байеса
+            prob += prod * self.__document_classes[j].NumberOfDocuments() / self.__document_classes[dclass].NumberOfDocuments()
+        if prob != 0:
+            return round(1 / prob, 3)
         else:
-            prob_list = []
-            #для каждого класса вызываем Probability
-            for dclass in self.__document_classes:
-                prob = self.Probability(doc, dclass)
-                prob_list.append([dclass,prob])
-            prob_list.sort(key = lambda x: x[1], reverse = True)
-            return prob_list
+            return -1
 
     #процент похожих слов одного документа со всеми классами
     def DocumentIntersectionWithClasses(self, doc_name):
@@ -271,3 +269,122 @@ class Pool(object):
             intersection_ratio = len(o) / len(d.Words())
             res += (dc, intersection_ratio)
         return res
+
+
+#подпись файла обучающего документа - хэш содержимого: меняется только при изменении
+#текста (файлы препроцессинга перезаписываются при каждом запуске с тем же текстом)
+def file_signature(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+#мультиномиальный наивный Байес: частоты слов хранятся векторами по классам
+#(матрица классы x слова), модель дообучается новыми документами (partial_fit),
+#тестовые документы оцениваются произведением разреженной матрицы частот слов
+#на матрицу логарифмов вероятностей слов в классах
+class NaiveBayesModel(object):
+
+    def __init__(self):
+        self.classes = []
+        self.vocabulary = {}
+        self.class_docs = np.zeros(0)
+        self.word_counts = np.zeros((0, 0))
+        #обученные документы: имя -> подпись файла
+        self.documents = {}
+
+    def words(self):
+        return vocabularyWords(self.vocabulary)
+
+    #обучение на новых документах (списках слов) с классами classes
+    def partial_fit(self, docs, classes, names = None, signatures = None):
+
+        for doc in docs:
+            for word in doc:
+                if word not in self.vocabulary:
+                    self.vocabulary[word] = len(self.vocabulary)
+        for cl in classes:
+            if cl not in self.classes:
+                self.classes.append(cl)
+
+        grow_classes = len(self.classes) - self.word_counts.shape[0]
+        grow_words = len(self.vocabulary) - self.word_counts.shape[1]
+        self.word_counts = np.pad(self.word_counts, ((0, grow_classes), (0, grow_words)))
+        self.class_docs = np.pad(self.class_docs, (0, grow_classes))
+
+        class_index = {cl: i for i, cl in enumerate(self.classes)}
+        rows = np.array([class_index[cl] for cl in classes], dtype=np.int64)
+        membership = scipy.sparse.csr_matrix((np.ones(len(docs)), (rows, np.arange(len(docs)))),
+                                             shape=(len(self.classes), len(docs)))
+        self.word_counts += (membership @ makeCountMatrix(docs, self.vocabulary)).toarray()
+        self.class_docs += np.bincount(rows, minlength=len(self.classes))
+
+        if names is not None:
+            if signatures is None:
+                signatures = [''] * len(names)
+            self.documents.update(zip(names, signatures))
+        return self
+
+    def fit(self, docs, classes, names = None, signatures = None):
+        self.__init__()
+        return self.partial_fit(docs, classes, names, signatures)
+
+    #логарифмы (по основанию 10) вероятностей слов в классах со сглаживанием Лапласа
+    #и вероятности слова не из словаря для каждого класса
+    def feature_log_prob(self):
+        denominators = len(self.vocabulary) + self.word_counts.sum(axis=1)
+        return np.log10((self.word_counts + 1) / denominators[:, np.newaxis]), np.log10(1 / denominators)
+
+    def class_log_prior(self):
+        return np.log10(self.class_docs / self.class_docs.sum())
+
+    #оценки документов (документы x классы): логарифм априорной вероятности класса
+    #плюс сумма логарифмов вероятностей всех слов документа
+    def scores(self, docs):
+
+        counts = makeCountMatrix(docs, self.vocabulary)
+        unknown = np.array([len(doc) for doc in docs]) - np.asarray(counts.sum(axis=1)).ravel()
+        log_prob, unknown_log_prob = self.feature_log_prob()
+        return np.asarray(counts @ log_prob.T) + np.outer(unknown, unknown_log_prob) + self.class_log_prior()
+
+    def predict(self, docs):
+        return [self.classes[i] for i in np.argmax(self.scores(docs), axis=1)]
+
+    #сохранение частот (через временный файл, чтобы не оставить повреждённую модель)
+    def save(self, filename):
+        temp_filename = filename + '.' + str(os.getpid()) + '.tmp'
+        names = list(self.documents.keys())
+        try:
+            with open(temp_filename, 'wb') as model_file:
+                np.savez_compressed(model_file,
+                                    classes = np.array(self.classes, dtype=str),
+                                    words = np.array(self.words(), dtype=str),
+                                    class_docs = self.class_docs,
+                                    word_counts = self.word_counts,
+                                    document_names = np.array(names, dtype=str),
+                                    document_signatures = np.array([self.documents[name] for name in names], dtype=str))
+            os.replace(temp_filename, filename)
+        except OSError as err:
+            print('Не удалось записать модель наивного Байеса:', filename, err)
+
+    #загрузка сохранённой модели; None, если файла нет или он повреждён
+    @staticmethod
+    def load(filename):
+        if not os.path.exists(filename):
+            return None
+        try:
+            with np.load(filename, allow_pickle=False) as data:
+                model = NaiveBayesModel()
+                model.classes = data['classes'].tolist()
+                model.vocabulary = {word: i for i, word in enumerate(data['words'].tolist())}
+                model.class_docs = data['class_docs']
+                model.word_counts = data['word_counts']
+                model.documents = dict(zip(data['document_names'].tolist(), data['document_signatures'].tolist()))
+        except (OSError, ValueError, KeyError) as err:
+            print('Не удалось прочитать модель наивного Байеса:', filename, err)
+            return None
+        if model.word_counts.shape != (len(model.classes), len(model.vocabulary)):
+            return None
+        return model
@@ -3,41 +3,87 @@
 import numpy as np
 import os
 import re
-import pymorphy2
+import scipy.sparse
+
+from sources.MorphAnalyzerCache import getSharedMorphAnalyzer
+from sources.classification.clsf_util import makeCountMatrix
+from sources.clasterization.DistanceKernels import cosineSimilarityMatrix, euclideanDistanceMatrix
 
 idx_lbl = 'idx'
-morph = pymorphy2.MorphAnalyzer() 
 
+#метрики сравнения документов с центроидами
+ROCCHIO_METRICS = ('euclidean', 'cosine')
+
+#центроиды классов (классы x слова, разреженная матрица) - средние строк X по классам
+def classCentroids(X, labels, classes):
+    class_index = dict(zip(classes, range(len(classes))))
+    rows = np.array([class_index[label] for label in labels], dtype=np.int64)
+    sizes = np.bincount(rows, minlength=len(classes)).astype(np.float64)
+    # Строка класса в матрице принадлежности - 1/(число документов класса) у его документов
+    membership = scipy.sparse.csr_matrix((1 / sizes[rows], (rows, np.arange(len(rows)))),
+                                         shape=(len(classes), len(rows)))
+    return scipy.sparse.csr_matrix(membership @ scipy.sparse.csr_matrix(X))
+
+#алгоритм Роккио: документ относится к классу с ближайшим центроидом;
+#расстояния от всех документов до всех центроидов - одно матричное произведение
+class RocchioClassifier:
+
+    def __init__(self, metric = 'euclidean'):
+        if metric not in ROCCHIO_METRICS:
+            raise ValueError('Неизвестная метрика Роккио: ' + str(metric))
+        self.metric = metric
+        self.classes = []
+        self.centroids = None
+
+    #classes - порядок классов (по умолчанию - отсортированные метки)
+    def fit(self, X, labels, classes = None):
+        if classes is None:
+            classes = sorted(set(labels))
+        self.classes = list(classes)
+        self.centroids = classCentroids(X, labels, self.classes)
+        return self
+
+    #расстояния (документы x классы); для cosine - 1 - косинусное сходство
+    def distances(self, X):
+        if self.metric == 'cosine':
+            return 1 - cosineSimilarityMatrix(X, self.centroids)
+        return euclideanDistanceMatrix(X, self.centroids)
+
+    def predict(self, X):
+        return [self.classes[i] for i in np.argmin(self.distances(X), axis=1)]
+
+
+#вариант с весами слов по классам для словаря createDictionary
 class Rocchio:
     
     def __init__(self, class_labels, tdict):
         
         self.k = len(class_labels)
-        self.centroids = []
         self.lbl_dict = dict(zip(class_labels, range(self.k)))
         self.class_labels = class_labels
         self.tdict = tdict
-        self.ctermcnt = np.zeros((self.k, 1))
+        self.vocabulary = {term: data[idx_lbl] for term, data in tdict.items()}
+        # Частоты слов по классам (классы x слова)
+        self.class_term_counts = np.zeros((self.k, len(tdict)))
+        for term, data in tdict.items():
+            for cl in self.lbl_dict:
+                if cl in data:
+                    self.class_term_counts[self.lbl_dict[cl], data[idx_lbl]] = data[cl]
+        self.ctermcnt = self.class_term_counts.sum(axis=1)[:, np.newaxis]
+        self.engine = RocchioClassifier('euclidean')
 
     #находим центроиды классов
     def train(self, token_pool, tfidf_but_smoothing = True):
 
-        #количество слов в классе
-        for term, data in self.tdict.items():
-            for cl in self.lbl_dict:
-                if cl in data:
-                    self.ctermcnt[self.lbl_dict[cl], 0] += data[cl]
-
+        docs = []
+        labels = []
         for cl in self.class_labels:
-            self.centroids.append(np.zeros((len(self.tdict), 1)))
-            for doc in token_pool[cl]:
-                vec = self.__createNormalizedVectorRepresentation(doc, cl)
-                self.centroids[self.lbl_dict[cl]] += vec
-
-            self.centroids[self.lbl_dict[cl]] /= len(token_pool[cl])
+            docs += token_pool[cl]
+            labels += [cl] * len(token_pool[cl])
+        self.engine.fit(self.__createNormalizedVectorRepresentation(docs, labels), labels, self.class_labels)
 
     def centrouds(self):
-        return(self.centroids)
+        return(self.engine.centroids)
         
     def lbl_dict(self):
         return(self.lbl_dict)
@@ -46,13 +92,7 @@ class Rocchio:
     #результатом будет документ с минимальным расстоянием
     def predict(self, doc):
 
-        doc_vec = self.__createNormalizedVectorRepresentation(doc, None)
-
-        distances = []
-        for i in range(self.k):
-            distances.append(np.linalg.norm(doc_vec - self.centroids[i]))
-
-        return self.class_labels[distances.index(min(distances))]
+        return self.engine.predict(self.__createNormalizedVectorRepresentation([doc]))[0]
 
 
     #тест на всех документах
@@ -60,31 +100,27 @@ class Rocchio:
 
         lbl_pool = {}
         for cl in self.class_labels:
-            lbl_pool[cl] = []
-            for doc in doc_collection[cl]:
-                lbl_pool[cl].append(self.predict(doc))
+            vectors = self.__createNormalizedVectorRepresentation(doc_collection[cl])
+            lbl_pool[cl] = self.engine.predict(vectors) if vectors.shape[0] > 0 else []
 
         return lbl_pool
 
-    #функция рассчёта усреднённого  вектора
-    def __createNormalizedVectorRepresentation(self, tokens_list, cl = None, tfidf = True):
-
-        vec = np.zeros((len(self.tdict), 1))
-        for token in tokens_list:
-            if token in self.tdict:
-                vec[self.tdict[token][idx_lbl], 0] += 1
-
-        token_set = set(tokens_list)
-        if tfidf:
-            if cl != None:
-                for term in token_set:
-                    if cl in self.tdict[term]:
-                        vec[self.tdict[term][idx_lbl], 0] *= np.log(self.ctermcnt[self.lbl_dict[cl], 0] * 1.0 / self.tdict[term][cl])
+    #нормированные векторы документов (разреженная матрица документы x слова);
+    #у обучающих документов (labels) частоты слов умножаются на вес слова в классе
+    def __createNormalizedVectorRepresentation(self, docs, labels = None, tfidf = True):
 
+        vec = makeCountMatrix(docs, self.vocabulary)
+        if tfidf and labels != None:
+            weights = np.ones_like(self.class_term_counts)
+            present = self.class_term_counts > 0
+            weights[present] = np.log(np.broadcast_to(self.ctermcnt, weights.shape)[present] /
+                                      self.class_term_counts[present])
+            rows = np.array([self.lbl_dict[cl] for cl in labels], dtype=np.int64)
+            vec.sum_duplicates()
+            vec.data *= weights[np.repeat(rows, np.diff(vec.indptr)), vec.indices]
 
-        norm_vec = np.linalg.norm(vec)
-        vec = (vec / (norm_vec + 1e-14))
-        return vec
+        norms = np.sqrt(np.asarray(vec.multiply(vec).sum(axis=1)).ravel())
+        return scipy.sparse.csr_matrix(vec.multiply(1 / (norms[:, np.newaxis] + 1e-14)))
 
 
 #%%
@@ -117,6 +153,7 @@ def tokenizeDoc(doc_address, min_len = 0, remove_numerics=True):
         return tokens
 #нормализация документа
 def f_tokenizer(s):
+    morph = getSharedMorphAnalyzer()
     f = []
     for j in s:
         m = morph.parse(j.replace('.',''))
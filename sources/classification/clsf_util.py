@@ -2,13 +2,14 @@
 import os
 import re
 import math
-import pymorphy2
 import numpy as np
 import operator
 from collections import defaultdict
 import csv
+import scipy.sparse
 
-morph = pymorphy2.MorphAnalyzer() 
+from sources.MorphAnalyzerCache import getSharedMorphAnalyzer
+from sources.TextPreprocessing import OutputFileWriter
 
 #чтение путей файлов и классов
 def makeFileList(root_path = 'input_files/classification/', fread = True, fprocess = True):
@@ -139,6 +140,7 @@ def tokenizeDoc(doc_address, fprocess = True):
 
 #если нужно, проводим нормализацию
 def f_tokenizer(s):
+    morph = getSharedMorphAnalyzer()
     f = []
     for j in s:
         m = morph.parse(j.replace('.',''))
@@ -160,41 +162,64 @@ def normVec(nparray):
     return(np.sqrt(np.sum(np.power(nparray, 2))))
 
 
-#матрица tf-idf
-def makeTFIDF(data_train, data_test = None):
-    words_in_doc = []
-    for doc in data_train:
-        words_in_doc.append(list(set(doc)))
-    
-    all_words = sum(words_in_doc, [])
-    uniq_words = list(set(all_words))
-    
-    df_doc = []
-    for word in uniq_words:
-        df_doc.append(all_words.count(word))
-    df_doc = np.array(df_doc)
-    
-    
-    if data_test:
-        data_tf = data_train + data_test
-    tf = []
-    for doc in data_tf:
-        tfi = []
-        for word in uniq_words:
-            tfi.append(doc.count(word))
-        tf.append(tfi)
-    
-    
-    D = len(data_train)
-    
-    tfidf = []
-    for tfi in tf:
-        w = np.array(tfi) * np.log10(D / df_doc)
-        row = w / normVec(w)
-        tfidf.append(row.round(2).tolist())
-    
-    return(tfidf, uniq_words)
-    
+#словарь слов обучающей выборки: слово -> номер столбца (в порядке первого появления)
+def makeVocabulary(docs):
+    vocabulary = {}
+    for doc in docs:
+        for word in doc:
+            if word not in vocabulary:
+                vocabulary[word] = len(vocabulary)
+    return vocabulary
+
+#разреженная матрица частот слов словаря в документах (слова не из словаря пропускаются)
+def makeCountMatrix(docs, vocabulary):
+    rows = []
+    cols = []
+    for i, doc in enumerate(docs):
+        for word in doc:
+            index = vocabulary.get(word)
+            if index is not None:
+                rows.append(i)
+                cols.append(index)
+    # Повторы одной пары (документ, слово) суммируются при переводе в csr
+    return scipy.sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(docs), len(vocabulary)))
+
+#матрица tf-idf в формате csr (строки - документы обучающей, затем тестовой выборки)
+#и словарь слово -> столбец; df и idf считаются по обучающей выборке
+def makeSparseTFIDF(data_train, data_test = None):
+    vocabulary = makeVocabulary(data_train)
+    docs = data_train + (data_test or [])
+    tf = makeCountMatrix(docs, vocabulary)
+    return(weightTFIDF(tf, np.arange(len(data_train))), vocabulary)
+
+#нормированная матрица tf-idf из матрицы частот tf; df и idf считаются по строкам
+#train_rows, слова, которых нет в этих строках, получают нулевой вес
+#(так одну матрицу частот можно взвешивать для разных обучающих выборок)
+def weightTFIDF(tf, train_rows):
+    D = len(train_rows)
+    df_doc = np.asarray((tf[train_rows] > 0).sum(axis=0)).ravel()
+    idf = np.log10(D / np.maximum(df_doc, 1))
+    idf[df_doc == 0] = 0
+
+    tfidf = scipy.sparse.csr_matrix(tf.multiply(idf[np.newaxis, :]))
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    # Документ без слов словаря остаётся нулевым вектором
+    norms[norms == 0] = 1
+    tfidf = scipy.sparse.csr_matrix(tfidf.multiply(1 / norms[:, np.newaxis]))
+    return tfidf
+
+#слова словаря в порядке столбцов
+def vocabularyWords(vocabulary):
+    return sorted(vocabulary, key=vocabulary.get)
+
+#запись матрицы tf-idf: заголовок - слова, в конце строки - row_suffixes[i]
+def writeTFIDFMatrix(tfidf, words, row_suffixes, filename, sep = ';'):
+    with OutputFileWriter(filename) as writer:
+        writer.write(sep.join(words) + '\n')
+        for i in range(tfidf.shape[0]):
+            row = tfidf[i].toarray().ravel().round(2)
+            writer.write(sep.join([str(x).replace('.', ',') for x in row.tolist()] + row_suffixes[i]) + '\n')
+
 def addClassToTFIDF(matrix, vector):
     for i in range(len(matrix)):
         matrix[i].append(vector[i])
@@ -220,6 +245,11 @@ def getNeighbors(trainingSet, testInstance, k):
         neighbors.append(distances[x][0])
     return neighbors, distances
  
+#процент верных ответов по спискам классов
+def getLabelsAccuracy(true_labels, predictions):
+    correct = sum(1 for true_label, prediction in zip(true_labels, predictions) if true_label == prediction)
+    return (correct/float(len(true_labels))) * 100.0
+
  #процент ошибок
 def getAccuracy(testSet, predictions):
     correct = 0
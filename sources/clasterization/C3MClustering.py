@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Алгоритм C3M (Cover-Coefficient-based Clustering Methodology) на разреженных матрицах.
+# Матрица коэффициентов покрытия для бинарной матрицы документов B (документы x слова):
+#   C = diag(alpha) * B * diag(beta) * B^T,
+#   alpha[i] = 1 / (число слов документа i), beta[k] = 1 / (число документов со словом k).
+# Целиком матрица C не хранится: нужные строки и блоки считаются разреженным
+# произведением, поэтому память зависит от числа затравок, а не от N^2.
+
+import numpy as np
+import scipy.sparse
+
+from sources.clasterization.DistanceKernels import DEFAULT_BLOCK_SIZE
+
+
+def inverseSums(sums):
+    sums = np.asarray(sums, dtype=np.float64).ravel()
+    result = np.zeros_like(sums)
+    np.divide(1, sums, out=result, where=sums != 0)
+    return result
+
+
+class CoverCoefficients:
+    """Коэффициенты покрытия C[i,j] - доля покрытия документа i документом j."""
+
+    def __init__(self, B):
+        self.B = scipy.sparse.csr_matrix(B, dtype=np.float64)
+        self.alpha = inverseSums(self.B.sum(axis=1))
+        self.beta = inverseSums(self.B.sum(axis=0))
+        # B * diag(beta)
+        self.weighted = scipy.sparse.csr_matrix(self.B.multiply(self.beta[np.newaxis, :]))
+
+    def documentsCount(self):
+        return self.B.shape[0]
+
+    def block(self, rows, columns=None):
+        """Плотный блок C[rows, columns] (rows, columns - срезы или массивы номеров)."""
+        if columns is None:
+            columns = slice(None)
+        products = (self.weighted[rows] @ self.B[columns].T).toarray()
+        return self.alpha[rows][:, np.newaxis] * products
+
+    def rowBlocks(self, block_size=DEFAULT_BLOCK_SIZE):
+        """Строки C блоками по block_size строк: (первая строка, блок)."""
+        if block_size <= 0:
+            block_size = DEFAULT_BLOCK_SIZE
+        for start in range(0, self.documentsCount(), block_size):
+            stop = min(start + block_size, self.documentsCount())
+            yield start, self.block(slice(start, stop))
+
+    def diagonal(self):
+        """C[i,i] - доля, в которой документ покрывает сам себя (его уникальность)."""
+        return self.alpha * np.asarray(self.weighted.multiply(self.B).sum(axis=1)).ravel()
+
+    def pairCovers(self, document, others):
+        """(C[document, others], C[others, document]) одним произведением строк."""
+        products = (self.weighted[document] @ self.B[others].T).toarray().ravel()
+        return self.alpha[document] * products, self.alpha[others] * products
+
+
+def clustersCount(cover):
+    """Число кластеров C3M - сумма диагонали (не меньше 1)."""
+    return max(1, int(round(float(cover.diagonal().sum()))))
+
+
+def seedPowers(cover, diagonal=None):
+    """Затравочная сила P[i] = C[i,i] * (1 - C[i,i]) * (число слов документа i)."""
+    if diagonal is None:
+        diagonal = cover.diagonal()
+    return diagonal * (1 - diagonal) * np.asarray(cover.B.sum(axis=1)).ravel()
+
+
+def selectSeeds(cover, powers, count, min_difference=0.001, diagonal=None):
+    """Выбрать count документов с наибольшей затравочной силой (по убыванию силы).
+    Документ не становится затравкой, если он почти совпадает с уже выбранной:
+    близкая сила и близкие коэффициенты покрытия (разница не больше min_difference)."""
+    if diagonal is None:
+        diagonal = cover.diagonal()
+    order = np.argsort(-powers, kind='stable')
+    seeds = []
+    for candidate in order:
+        if seeds:
+            chosen = np.array(seeds)
+            to_seeds, from_seeds = cover.pairCovers(candidate, chosen)
+            similar = (np.abs(powers[candidate] - powers[chosen]) <= min_difference) & (
+                (np.abs(diagonal[candidate] - diagonal[chosen]) <= min_difference) |
+                (np.abs(to_seeds - from_seeds) <= min_difference) |
+                (np.abs(diagonal[candidate] - to_seeds) <= min_difference) |
+                (np.abs(diagonal[chosen] - from_seeds) <= min_difference))
+            if np.any(similar):
+                continue
+        seeds.append(int(candidate))
+        if len(seeds) >= count:
+            break
+    return np.array(seeds, dtype=np.int64)
+
+
+def assignToSeeds(cover, seeds, block_size=DEFAULT_BLOCK_SIZE):
+    """Номер кластера (затравки) каждого документа: затравка, которая больше всего
+    покрывает документ; при равенстве - затравка с большей силой (затравки
+    упорядочены по убыванию силы). Затравка всегда в своём кластере."""
+    if block_size <= 0:
+        block_size = DEFAULT_BLOCK_SIZE
+    labels = np.empty(cover.documentsCount(), dtype=np.int64)
+    for start in range(0, cover.documentsCount(), block_size):
+        stop = min(start + block_size, cover.documentsCount())
+        labels[start:stop] = np.argmax(cover.block(seeds, slice(start, stop)), axis=0)
+    labels[seeds] = np.arange(len(seeds))
+    return labels
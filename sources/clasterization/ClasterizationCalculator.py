@@ -7,48 +7,38 @@ import copy
 import numpy as np
 import shutil
 import os
-import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from PyQt5.QtCore import QObject
 from PyQt5.QtCore import QThread
 from PyQt5.QtCore import pyqtSignal
 
-from sources.TextPreprocessing import writeStringToFile, makePreprocessing, makeFakePreprocessing
+from sources.TextPreprocessing import makePreprocessing, makeFakePreprocessing, OutputFileWriter
 from sources.utils import makePreprocessingForAllFilesInFolder
+from sources.clasterization.TermDocumentMatrix import buildTermDocumentMatrix
+from sources.clasterization.HierarchicalClustering import agglomerativeClustering
+from sources.clasterization.KMeansClustering import kMeans, makeRandomGenerator
+from sources.clasterization.FuzzyCMeansClustering import fuzzyCMeans
+from sources.clasterization.DBSCANClustering import DBSCAN, makeNeighbourIndex
+from sources.clasterization.C3MClustering import CoverCoefficients, assignToSeeds, clustersCount, seedPowers, \
+    selectSeeds
+from sources.clasterization.SOMClustering import buildUMatrix, documentLocations, trainSOM
+from sources.clasterization.ClusteringComparison import adjustedRandIndex, partitionClustersCount, \
+    partitionNoiseCount, silhouetteScore
+from sources.clasterization.DistanceKernels import cosineSimilarityMatrix, iterateMatrixBlocks, pairwiseMatrix, \
+    parseDtype
 
 
 def sim(D, i, j):
-    summ = 0
-    summ_sqrt_i = 0
-    summ_sqrt_j = 0
-    for k in range(len(D[0])):
-        summ += D[i][k] * D[j][k]
+    """Косинусное сходство документов i и j (строк матрицы весов D)."""
+    D = np.asarray(D)
+    return cosineSimilarityMatrix(D[i:i + 1], D[j:j + 1])[0, 0]
 
-    for k in range(len(D[0])):
-        summ_sqrt_i += D[i][k] * D[i][k]
-    summ_sqrt_i = math.sqrt(summ_sqrt_i)
 
-    for k in range(len(D[0])):
-        summ_sqrt_j += D[j][k] * D[j][k]
-    summ_sqrt_j = math.sqrt(summ_sqrt_j)
-
-    sim = summ / (summ_sqrt_i * summ_sqrt_j)
-    return sim
-
-
-def GetS(D):
-    n = len(D)
-    m = len(D[0])
-    S = [[0] * m for i in range(n)]
-
-    for row in range(n):
-        for item in range(m):
-            if (item < row):
-                S[row][item] = sim(D, row, item)
-            else:
-                S[row][item] = 0
-
-    return S
+def GetS(D, dtype=np.float64, block_size=0):
+    """Нижний треугольник (без диагонали) матрицы косинусного сходства документов."""
+    return np.tril(pairwiseMatrix('cosine', np.asarray(D), dtype, block_size), -1)
 
 
 def indexes2DocNames(docIndexes,filenames):
@@ -58,120 +48,86 @@ def indexes2DocNames(docIndexes,filenames):
     return res
 
 
-def agglomerative_hierarchical_clustering(D):
-    S = GetS(D)
-    F = []
-    for k in range(len(D)):
-        F[k] = 1
-    A = []
-    for k in range(len(D)):
-        F[k] = 1
-
-    return 0
-
-
-def FindUnionDist(Dist, F):
-    min_i = 0
-    min_j = 0
-    min = 1000
-    n = len(Dist)
-    m = len(Dist[0])
-    for i in range(n):
-        for j in range(i):
-            if ((Dist[i][j] < min) & (F[i] == 1) & (j < i)):
-                min = Dist[i][j]
-                min_i = i
-                min_j = j
-
-    return [min_i, min_j], Dist[min_i][min_j]
-
-def FindUnionSim(Sim, F):
-    max_i = 0
-    max_j = 0
-    max = 0
-    n = len(Sim)
-    m = len(Sim[0])
-    for i in range(n):
-        for j in range(i):
-            if ((Sim[i][j] > max) & (F[i] == 1) & (j < i)):
-                max = Sim[i][j]
-                max_i = i
-                max_j = j
-
-    return [max_i, max_j], Sim[max_i][max_j]
+def joinLines(lines):
+    """Выдавать строки через перевод строки (как '\\n'.join, но без сборки
+    общей строки в памяти)."""
+    for index, line in enumerate(lines):
+        if index > 0:
+            yield '\n'
+        yield line
 
 def writeMatrixToFile(matrix, filename):
     """Записать матрицу чисел в файл."""
-    writeStringToFile('\n'.join([';'.join(str(x).replace('.',',') for x in row) for row in matrix]), filename)
-
-def avg(numList):
-    """Найти среднее значение для элементов списка"""
-    return sum(numList) / len(numList)
-
-def dist(vec1, vec2):
-    """Найти евклидово расстояние между двумя векторами"""
-    return math.sqrt(sum(map(lambda x: x * x, [i - j for i, j in zip(vec1, vec2)])))
-
-
-class Cluster:
-    ap = 1 / 2
-    aq = 1 / 2
-    b = 0
-    g = 0
-
-    def __init__(self, doc, dist):
-        self.docs = [{doc}]
-        self.Dist = dist
-
-    def AddDoc(self, doc, dist, n):
-        i = 0
-        self.docs.append(doc)
-        newDist = []
-        for k in range(len(dist)):
-            newDist[k] = Cluster.ap * (self.Dist[k]) + Cluster.aq * (dist[k]) + Cluster.b * (
-                self.Dist[n]) + Cluster.g * (math.fabs(self.Dist[k] - dist[k]))
+    with OutputFileWriter(filename, decimal_comma=True) as writer:
+        writer.writeLines(joinLines(';'.join(str(x) for x in row) for row in matrix))
 
+def writeDfToFile(t_all, filename):
+    """Записать таблицу df - число документов, в которых встречается слово."""
+    with OutputFileWriter(filename) as writer:
+        writer.write("Слово;Используется в документах\n")
+        for key, value in t_all.items():
+            writer.writeRow([key, value])
+
+def writeWeightsToFile(W, t_all, filenames, filename):
+    """Записать нормированные веса (строки - документы, столбцы - слова)."""
+    with OutputFileWriter(filename) as writer:
+        writer.write("Нормированные веса\n")
+        writer.writeRow([''] + list(t_all.keys()))
+        for i, row in enumerate(W):
+            writer.writeRow([os.path.basename(filenames[i])] + [str(round(item, 10)).replace('.',',') for item in row])
+
+def writeDocumentsTable(writer, table, filenames, columns_count, digits=None):
+    """Записать таблицу значений для пар документов (sim, dist) в открытый файл.
+    digits - число знаков после запятой (None - без округления)."""
+    writer.writeRow([''] + [os.path.basename(name) for name in filenames])
+    writeDocumentsTableRows(writer, table, filenames, columns_count, 0, digits)
+
+def writeDocumentsTableRows(writer, rows, filenames, columns_count, first_row=0, digits=None):
+    """Записать строки таблицы документов, начиная с документа first_row."""
+    for offset in range(len(rows)):
+        if digits is None:
+            values = [str(rows[offset][j]) for j in range(columns_count)]
+        else:
+            values = [str(round(rows[offset][j], digits)) for j in range(columns_count)]
+        writer.writeRow([os.path.basename(filenames[first_row + offset])] + [value.replace('.',',') for value in values])
 
-def printDist(dist, texts, filenames):
-    dist_string = ''
-
-    for name in filenames:
-        dist_string = dist_string + ';' + os.path.basename(name)
-    dist_string += '\n'
-    for i in range(len(texts)):
-        dist_string += os.path.basename(filenames[i])
-
+def writeDocumentsTableToFile(table, filenames, columns_count, filename, digits=None):
+    with OutputFileWriter(filename) as writer:
+        writeDocumentsTable(writer, table, filenames, columns_count, digits)
 
-def ClusterByDoc(x, clusters):
-    for key, value in clusters.items():
-        for i in range(len(clusters[key])):
-            if (clusters[key][i] == x):
-                return key
+def writeSimilarityTableToFile(W, filenames, filename, dtype=np.float64, block_size=0):
+    """Записать нижний треугольник матрицы косинусного сходства (sim.csv),
+    вычисляя его блоками по block_size строк (0 - вся матрица сразу)."""
+    with OutputFileWriter(filename) as writer:
+        writer.writeRow([''] + [os.path.basename(name) for name in filenames])
+        for start, stop, block in iterateMatrixBlocks('cosine', W, None, block_size, dtype):
+            block = np.tril(block, start - 1)
+            writeDocumentsTableRows(writer, block.tolist(), filenames, block.shape[1], start)
 
+def Cluster2String(members):
+    return '{' + ','.join(str(doc + 1) for doc in members) + '}'
 
-def UnionClusters(cluster1, cluster2, clusters):
-    for i in range(len(clusters[cluster2])):
-        clusters[cluster1].append(clusters[cluster2][i])
-    clusters.pop(cluster2)
 
+def Cluster2StringNames(members, filenames):
+    return ''.join(str(doc + 1) + ' = ' + os.path.basename(filenames[doc]) + '\n' for doc in members)
 
-def Cluster2String(clusters, cluster):
-    res = '{'
-    for i in range(len(clusters[cluster])):
-        res += str(clusters[cluster][i]+1)
-        if(i<len(clusters[cluster])-1):
-            res+=','
-    res += '}'
-    return res
 
+def writeAssignment(writer, labels, clusters_count, cluster_prefix, doc_prefix, line_end='\n'):
+    """Записать распределение документов по кластерам: строка на кластер,
+    номера документов с 1."""
+    for cluster in range(clusters_count):
+        docs = np.flatnonzero(labels == cluster)
+        writer.write(cluster_prefix + str(cluster + 1) + ''.join([doc_prefix + str(doc + 1) for doc in docs]) + line_end)
 
-def Cluster2StringNames(clusters, cluster, filenames):
-    res = ''
-    clusters[cluster].sort(key=int, reverse=False)
-    for i in range(len(clusters[cluster])):
-        res += str(clusters[cluster][i] + 1) + ' = ' + os.path.basename(filenames[clusters[cluster][i]]) + '\n'
 
-    return res
+def writeDendrogramStep(writer, step, first, second, value_name, value, filenames):
+    """Записать шаг иерархической кластеризации: объединяемые кластеры,
+    результат, расстояние (сходство) и названия документов кластера."""
+    merged = sorted(first + second)
+    writer.write('\n\nStep' + str(step) + '\nUnion --->;' + Cluster2String(first) + ';+;' \
+                 + Cluster2String(second) + ';=;')
+    writer.write(Cluster2String(merged) + ';' + value_name + ' = ;' + str(value).replace('.',',') + '\n')
+    writer.write(Cluster2StringNames(merged, filenames) + '\n')
 
 
 # Сигналы для потока вычисления
@@ -201,11 +157,21 @@ class ClasterizationCalculator(QThread):
         self.m = 2
         self.minPts = 0.3
         self.som_length = 1
+        self.dbscan_eps = 0.01
         self.somMap = []
         self.somDLocations = []
         self.need_preprocessing = False
         self.first_call = True
         self.texts = []
+        self.term_matrix = None
+        self.dendrogram = None
+        self.dendrogram_sim = None
+        self.kmeans_result = None
+        self.fuzzy_result = None
+        self.dbscan_result = None
+        self.c3m_labels = None
+        # При сравнении методов общие файлы (df.csv, W.csv, sim.csv) пишутся один раз
+        self.comparing_methods = False
 
     def setMethod(self, method_name):
         self.method = method_name
@@ -222,6 +188,9 @@ class ClasterizationCalculator(QThread):
     def setMinPts(self,value):
         self.minPts = value
 
+    def setDBSCANEps(self, value):
+        self.dbscan_eps = value
+
     def setClusterCount(self,value):
         self.clusterCount = value
 
@@ -235,6 +204,9 @@ class ClasterizationCalculator(QThread):
             else:
                 self.signals.PrintInfo.emit("Препроцессинг - пропускается")
                 self.texts = makeFakePreprocessing(self.filenames)
+            # Матрица весов строится заново только для новых результатов препроцессинга
+            self.term_matrix = None
+            self.fuzzy_result = None
         else:
             if self.need_preprocessing:
                 self.signals.PrintInfo.emit("Препроцессинг - использование предыдущих результатов.")
@@ -259,12 +231,152 @@ class ClasterizationCalculator(QThread):
         if (self.method == '6'):
             self.SOM(self.som_length)
 
+        if (self.method == '7'):
+            self.makeMethodsComparison()
+
         if self.first_call and self.need_preprocessing:
             self.first_call = False
 
         self.signals.PrintInfo.emit('Расчёты закончены!')
         self.signals.Finished.emit(self.somMap, self.somDLocations)
 
+    def methodCall(self, method):
+        """Название метода кластеризации по номеру и функция его запуска
+        с параметрами из диалога."""
+        methods = {
+            '1': ('Иерархический', lambda: self.makeHierarhyClasterization()),
+            '2': ('К-средних', lambda: self.makeClasterizationKMiddle(self.clusterCount)),
+            '3': ('Нечёткий с-средних', lambda: self.makeClasterizationSMiddle(self.clusterCount, self.eps, self.m)),
+            '4': ('DBSCAN', lambda: self.makeDBSCANClasterization(self.dbscan_eps, self.minPts)),
+            '5': ('C3M', lambda: self.C3M()),
+            '6': ('SOM', lambda: self.SOM(self.som_length)),
+        }
+        return methods[method]
+
+    def methodResult(self, method):
+        """Результат последнего запуска метода (объект, по которому видно, что метод отработал)."""
+        results = {
+            '1': self.dendrogram,
+            '2': self.kmeans_result,
+            '3': self.fuzzy_result,
+            '4': self.dbscan_result,
+            '5': self.c3m_labels,
+            '6': self.somDLocations,
+        }
+        return results[method]
+
+    def methodLabels(self, method):
+        """Номера кластеров документов по результату метода (-1 - шум)."""
+        if method == '1':
+            return self.dendrogram.cut(self.clusterCount)
+        if method == '2':
+            return self.kmeans_result.labels
+        if method == '3':
+            return self.fuzzy_result.labels()
+        if method == '4':
+            return self.dbscan_result.labels
+        if method == '5':
+            return self.c3m_labels
+        return np.array([x + y * self.som_length for x, y in self.somDLocations])
+
+    def makeMethodsComparison(self):
+        """Запустить несколько методов кластеризации над одной матрицей весов
+        и записать сравнение их разбиений (comparison.csv)."""
+        self.signals.PrintInfo.emit('Сравнение методов кластеризации' + '\n')
+        output_dir = self.configurations.get("output_files_directory", "output_files") + "/clasterization/"
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        methods = [method.strip() for method in
+                   str(self.configurations.get("clasterization_compare_methods", "1,2,3,4,5,6")).split(',')
+                   if method.strip()]
+        workers = self.configurations.get("clasterization_compare_workers", 1)
+
+        # Общая матрица весов строится и записывается до запуска методов
+        term_matrix = self.getTermDocumentMatrix()
+        self.writeTermMatrixFiles(term_matrix, output_dir, True)
+        previous = {method: self.methodResult(method) for method in methods}
+
+        def runMethod(method):
+            name, call = self.methodCall(method)
+            self.signals.PrintInfo.emit('Запуск метода: ' + name + '\n')
+            start = time.time()
+            call()
+            return time.time() - start
+
+        self.comparing_methods = True
+        try:
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    times = list(executor.map(runMethod, methods))
+            else:
+                times = [runMethod(method) for method in methods]
+        finally:
+            self.comparing_methods = False
+
+        # Методы, которые не дали результата (например, расходящийся с-средних), не сравниваются
+        labels = dict()
+        for method in methods:
+            result = self.methodResult(method)
+            if result is not None and result is not previous[method]:
+                labels[method] = np.asarray(self.methodLabels(method))
+
+        distances = pairwiseMatrix('euclidean', term_matrix.W, self.kernelDtype(), self.kernelBlockSize())
+        def number(value, digits):
+            return str(round(value, digits)).replace('.', ',')
+
+        with OutputFileWriter(output_dir + 'comparison.csv') as writer:
+            writer.write('Метод;Время, с;Кластеров;Шум;Силуэт\n')
+            for method, elapsed in zip(methods, times):
+                name = self.methodCall(method)[0]
+                if method not in labels:
+                    writer.writeRow([name, number(elapsed, 3), 'нет результата', '', ''])
+                    continue
+                silhouette = silhouetteScore(distances, labels[method])
+                writer.writeRow([name, number(elapsed, 3), partitionClustersCount(labels[method]),
+                                 partitionNoiseCount(labels[method]),
+                                 '' if silhouette is None else number(silhouette, 4)])
+
+            compared = [method for method in methods if method in labels]
+            writer.write('\nСкорректированный индекс Рэнда (ARI)\n')
+            writer.writeRow([''] + [self.methodCall(method)[0] for method in compared])
+            for first in compared:
+                writer.writeRow([self.methodCall(first)[0]] +
+                                [number(adjustedRandIndex(labels[first], labels[second]), 4) for second in compared])
+
+            writer.write('\nКластеры документов\n')
+            writer.writeRow([''] + [self.methodCall(method)[0] for method in compared])
+            for doc in range(len(self.filenames)):
+                writer.writeRow([os.path.basename(self.filenames[doc])] +
+                                [int(labels[method][doc]) + 1 if labels[method][doc] >= 0 else 'шум'
+                                 for method in compared])
+        self.signals.UpdateProgressBar.emit(100)
+
+    def kernelDtype(self):
+        """Тип чисел для матриц сходства и расстояний (float32 или float64)."""
+        return parseDtype(self.configurations.get("clasterization_dtype", "float64"))
+
+    def kernelBlockSize(self):
+        """Число строк в блоке при расчёте матриц сходства и расстояний (0 - вся матрица сразу)."""
+        return self.configurations.get("clasterization_block_size", 0)
+
+    def writeTermMatrixFiles(self, term_matrix, output_dir, similarity=False):
+        """Записать df.csv, W.csv и (если similarity) sim.csv. При сравнении методов
+        файлы уже записаны в общий каталог, и методы их не повторяют."""
+        if self.comparing_methods:
+            return
+        t_all = term_matrix.dfDict()
+        writeDfToFile(t_all, output_dir + 'df.csv')
+        writeWeightsToFile(term_matrix.denseW().tolist(), t_all, self.filenames, output_dir + 'W.csv')
+        if similarity:
+            writeSimilarityTableToFile(term_matrix.W, self.filenames, output_dir + 'sim.csv',
+                                       self.kernelDtype(), self.kernelBlockSize())
+
+    def getTermDocumentMatrix(self):
+        """Матрица весов TF-IDF текущих текстов (считается один раз на набор текстов)."""
+        if self.term_matrix is None:
+            self.term_matrix = buildTermDocumentMatrix(self.texts)
+        return self.term_matrix
+
     def makeHierarhyClasterization(self):
         self.signals.PrintInfo.emit('Иерархическая кластеризация' + '\n')
 
@@ -276,200 +388,62 @@ class ClasterizationCalculator(QThread):
             os.makedirs(output_dir)
 
         # Нахождение матрицы весов
-        t_all = dict()
-
-        for text in texts:
-            for key, value in text.sorted_word_frequency:
-                t_all[key] = t_all.get(key, 0) + 1
+        term_matrix = self.getTermDocumentMatrix()
+        t_all = term_matrix.dfDict()
 
         self.signals.UpdateProgressBar.emit(20)
 
-        # Найти df
-        df_string = ''
-        df_string = df_string + "Слово;Используется в документах\n"
-        for key, value in t_all.items():
-            df_string = df_string + key + ';' + str(value).replace('.',',') + '\n'
-        writeStringToFile(df_string.replace('\n ', '\n'), output_dir + 'df.csv')
-
-        self.signals.UpdateProgressBar.emit(25)
-
-        W = [[0 for x in range(len(t_all))] for y in range(len(texts))]
         print('len(texts)=' + str(len(texts)))
         print('len(t_all)=' + str(len(t_all)))
-        W_norm = [0 for x in range(len(texts))]
-        i = 0
-        j = 0
-        for row in range(len(texts)):
-            j = 0
-            for key, value in t_all.items():
-                text = texts[row]
-                if (key in text.word_frequency.keys()):
-                    frequency_in_this_doc = text.word_frequency[key]
-                else:
-                    frequency_in_this_doc = 0
-                W[i][j] = frequency_in_this_doc * math.log10(len(texts) / value)
-                W_norm[i] += math.pow(W[i][j], 2)
-
-                j += 1
-            W_norm[i] = math.sqrt(W_norm[i])
-            i += 1
         self.signals.UpdateProgressBar.emit(30)
-        for i in range(len(texts)):
-            for j in range(len(t_all)):
-                W[i][j] /= W_norm[i]
 
-        W_string = ''
-        W_string = W_string + "Нормированные веса\n"
-        for key, value in t_all.items():
-            W_string = W_string + ';' + key
-        W_string += '\n'
-        i = 0
-        for row in W:
-            W_string += os.path.basename(self.filenames[i])
-            for item in row:
-                W_string = W_string + ';' + str(round(item, 10)).replace('.',',')
-            W_string += '\n'
-            i += 1
-        writeStringToFile(W_string.replace('\n ', '\n'), output_dir + 'W.csv')
-        self.signals.UpdateProgressBar.emit(50)
-        S = GetS(W)
-        sim_string = ''
-        for name in self.filenames:
-            sim_string = sim_string + ';' + os.path.basename(name)
-        sim_string += '\n'
-        for i in range(len(texts)):
-            sim_string += os.path.basename(self.filenames[i])
-            for j in range(len(t_all)):
-                sim_string = sim_string + ';' + str(S[i][j]).replace('.',',')
-            sim_string += '\n'
-        writeStringToFile(sim_string.replace('\n ', '\n'), output_dir + 'sim.csv')
+        # Найти df, веса и таблицу Sim
+        self.writeTermMatrixFiles(term_matrix, output_dir, True)
         self.signals.UpdateProgressBar.emit(60)
-        n = len(texts)
-        m = len(texts)
-        S = [[0 for x in range(n)] for y in range(m)]
 
         #Находим таблицу Dist
-        for i in range(n):
-            for j in range(m):
-                summ = 0
-                for k in range(len(t_all)):
-                    summ += math.pow(W[i][k] - W[j][k], 2)
-                S[i][j] = math.sqrt(summ)
-
-        dist_string = ''
-
-        for name in self.filenames:
-            dist_string = dist_string + ';' + os.path.basename(name)
-        dist_string += '\n'
-        for i in range(len(texts)):
-            dist_string += os.path.basename(self.filenames[i])
-            for j in range(len(texts)):
-                dist_string = dist_string + ';' + str(round(S[i][j], 2)).replace('.',',')
-            dist_string += '\n'
-        writeStringToFile(dist_string.replace('\n ', '\n'), output_dir + 'dist.csv')
-        self.signals.UpdateProgressBar.emit(70)
-        doc2cluster = [0 for x in range(len(texts))]
-        for i in range(len(texts)):
-            doc2cluster[i] = i
+        distances = pairwiseMatrix('euclidean', term_matrix.W, self.kernelDtype(), self.kernelBlockSize())
 
-        clusters = dict()
-        for i in range(len(texts)):
-            clusters[i] = [i]
+        writeDocumentsTableToFile(distances.tolist(), self.filenames, len(texts), output_dir + 'dist.csv', 2)
+        self.signals.UpdateProgressBar.emit(70)
 
-        F = [1 for x in range(len(texts))]
+        # Метод связи кластеров (single, complete, average, weighted, ward)
+        linkage = self.configurations.get("clasterization_linkage", "weighted")
+        # Записывать таблицу расстояний на каждом шаге (N x N значений на шаг)
+        log_step_matrices = self.configurations.get("clasterization_log_step_matrices", False)
 
-        result = ''
-        clustersString = ''
         #Find unions with dist
-        for k in range(len(texts) - 1):
-            printDist(S, texts, self.filenames)
-            union, currDist = FindUnionDist(S, F)
-            firstCluster = ClusterByDoc(union[0], clusters)
-            secondCluster = ClusterByDoc(union[1], clusters)
-            print('found clusters = ' + str(firstCluster) + ' and ' + str(secondCluster))
-            # print(str(union[0] + 1) + ' + ' + str(union[1] + 1) + ' with dist= ' + str(dist[union[0]][union[1]]))
-            result += '\n\nStep' + str(k) + '\nUnion --->;' + Cluster2String(clusters, firstCluster) + ';+;' \
-                      + Cluster2String(clusters, secondCluster) + ';=;'
-            clustersString += '\n\nStep' + str(k) + '\nUnion --->;' + Cluster2String(clusters, firstCluster) + ';+;' \
-                      + Cluster2String(clusters, secondCluster) + ';=;'
-            UnionClusters(firstCluster, secondCluster, clusters)
-            clustersString += Cluster2String(clusters, ClusterByDoc(union[0], clusters)) + ';dist = ;' + str(currDist).replace('.',',') + '\n'
-            clustersString += Cluster2StringNames(clusters, ClusterByDoc(union[0], clusters), self.filenames) + '\n'
-            result += Cluster2String(clusters, ClusterByDoc(union[0], clusters)) + ';dist = ;' + str(currDist).replace('.',',') + '\n'
-            result += Cluster2StringNames(clusters, ClusterByDoc(union[0], clusters), self.filenames) + '\n'
-
-
-            # doc2cluster[union[1]] = '{' + doc2cluster[union[1]] + ',' + doc2cluster[union[0]] + '}'
-            # doc2cluster[union[0]] = ''
-
-            F[union[0]] = 0
-            # F[union[1]] = 0
-            new_sim = [[0 for x in range(len(texts))] for y in range(len(texts))]
-            for i in range(len(texts)):
-                for j in range(len(texts)):
-                    new_sim[i][j] = S[i][j]
-
-            #Запишем новую таблицу расстояний
-            result+="New Dist\n"
-            for name in self.filenames:
-                result += ';' + os.path.basename(name)
-            result += '\n'
-            for i in range(len(texts)):
-                result += '' + os.path.basename(self.filenames[i])
-                for j in range(len(texts)):
-                    result += ';' + str(round(new_sim[i][j], 2)).replace('.',',')
-                result += '\n'
-
-            for j in range(len(texts)):
-                for i in range(2):
-                    new_sim[j][union[i]] = 0.5 * (S[j][union[0]]) + 0.5 * (S[j][union[1]])
-
-            S = new_sim
+        with OutputFileWriter(output_dir + 'stepsDist.csv') as steps_writer, \
+                OutputFileWriter(output_dir + 'clusters.csv') as clusters_writer:
+            def writeStep(step, first, second, distance):
+                writeDendrogramStep(steps_writer, step, first, second, 'dist', distance, self.filenames)
+                writeDendrogramStep(clusters_writer, step, first, second, 'dist', distance, self.filenames)
+
+            def writeStepWithMatrix(step, state, x, y):
+                writeStep(step, state.members[x], state.members[y], state.distance(x, y))
+                #Запишем новую таблицу расстояний
+                steps_writer.write("New Dist\n")
+                writeDocumentsTable(steps_writer, state.documentDistances().tolist(), self.filenames, len(texts), 2)
+
+            if log_step_matrices:
+                self.dendrogram = agglomerativeClustering(distances, linkage, writeStepWithMatrix)
+            else:
+                self.dendrogram = agglomerativeClustering(distances, linkage)
+                for step, (first, second, distance) in enumerate(self.dendrogram.steps()):
+                    writeStep(step, first, second, distance)
         self.signals.UpdateProgressBar.emit(85)
-        writeStringToFile(result.replace('\n ', '\n'), output_dir + 'stepsDist.csv')
-        writeStringToFile(clustersString.replace('\n ', '\n'), output_dir + 'clusters.csv')
+
+        # Find unions with Sim: расстояние между документами 1 - косинусное сходство
+        similarity = pairwiseMatrix('cosine', term_matrix.W, self.kernelDtype(), self.kernelBlockSize())
+        similarity_distances = np.maximum(1 - similarity, 0)
+        np.fill_diagonal(similarity_distances, 0)
         self.signals.UpdateProgressBar.emit(90)
-        # Find unions with Sim
-        F = [1 for x in range(len(texts))]
-        result = ''
-        clusters = dict()
-        for i in range(len(texts)):
-            clusters[i] = [i]
-
-        for k in range(len(texts) - 1):
-            #printDist(dist, texts, self.filenames)
-            union, currSim = FindUnionSim(S, F)
-            firstCluster = ClusterByDoc(union[0], clusters)
-            secondCluster = ClusterByDoc(union[1], clusters)
-            print('found clusters = ' + str(firstCluster) + ' and ' + str(secondCluster))
-            # print(str(union[0] + 1) + ' + ' + str(union[1] + 1) + ' with dist= ' + str(sim[union[0]][union[1]]))
-            result += '\n\nStep' + str(k) + '\nUnion --->;' + Cluster2String(clusters, firstCluster) + ';+;' \
-                      + Cluster2String(clusters, secondCluster) + ';=;'
-            UnionClusters(firstCluster, secondCluster, clusters)
-            result += Cluster2String(clusters, ClusterByDoc(union[0], clusters)) + ';sim = ;' + str(currSim).replace('.',',') + '\n'
-            result += Cluster2StringNames(clusters, ClusterByDoc(union[0], clusters), self.filenames) + '\n'
-
-            # doc2cluster[union[1]] = '{' + doc2cluster[union[1]] + ',' + doc2cluster[union[0]] + '}'
-            # doc2cluster[union[0]] = ''
-
-            F[union[0]] = 0
-            # F[union[1]] = 0
-            new_sim = [[0 for x in range(len(texts))] for y in range(len(texts))]
-            for i in range(len(texts)):
-                for j in range(len(texts)):
-                    new_sim[i][j] = S[i][j]
-
-            for j in range(len(texts)):
-                for i in range(2):
-                    new_sim[j][union[i]] = 0.5 * (S[j][union[0]]) + 0.5 * (S[j][union[1]])
-
-            S = new_sim
-
-        writeStringToFile(result.replace('\n ', '\n'), output_dir + 'stepsSim.csv')
-
-        # for i in range(len(texts)):
-        #     self.signals.PrintInfo.emit(str(doc2cluster[i])+'\n')
-        #     print(doc2cluster[i])
+        self.dendrogram_sim = agglomerativeClustering(similarity_distances, linkage)
+
+        with OutputFileWriter(output_dir + 'stepsSim.csv') as steps_writer:
+            for step, (first, second, distance) in enumerate(self.dendrogram_sim.steps()):
+                writeDendrogramStep(steps_writer, step, first, second, 'sim', 1 - distance, self.filenames)
+
         self.signals.UpdateProgressBar.emit(100)
 
     def makeClasterizationKMiddle(self,ClusterCount):
@@ -483,270 +457,75 @@ class ClasterizationCalculator(QThread):
 
         self.signals.UpdateProgressBar.emit(20)
 
-        result = ''
-        clusters =''
-        #легенда в ответ
-        for doc in range(len(self.filenames)):
-            result += str(doc) + ' = ' + os.path.basename(self.filenames[doc]) + '\n'
-            clusters += str(doc+1) + ' = ' + os.path.basename(self.filenames[doc]) + '\n'
-        result += '\n'
-        clusters += '\n'
-
         # Нахождение матрицы весов
         self.signals.PrintInfo.emit('Нахождение матрицы весов' + '\n')
-        t_all = dict()
-
-        for text in texts:
-            for key, value in text.sorted_word_frequency:
-                t_all[key] = t_all.get(key, 0) + 1
+        term_matrix = self.getTermDocumentMatrix()
+        t_all = term_matrix.dfDict()
 
-        # Найти df
-        df_string = ''
-        df_string = df_string + "Слово;Используется в документах\n"
-        for key, value in t_all.items():
-            df_string = df_string + key + ';' + str(value) + '\n'
-        writeStringToFile(df_string.replace('\n ', '\n'), output_dir + 'df.csv')
         self.signals.UpdateProgressBar.emit(25)
 
-        W = [[0 for x in range(len(t_all))] for y in range(len(texts))]
         print('len(texts)=' + str(len(texts)))
         print('len(t_all)=' + str(len(t_all)))
-        W_norm = [0 for x in range(len(texts))]
-        i = 0
-        j = 0
-        for row in range(len(texts)):
-            j = 0
-            for key, value in t_all.items():
-                text = texts[row]
-                if (key in text.word_frequency):
-                    frequency_in_this_doc = text.word_frequency[key]
-                else:
-                    frequency_in_this_doc = 0
-                W[i][j] = frequency_in_this_doc * math.log10(len(texts) / value)
-                W_norm[i] += math.pow(W[i][j], 2)
-                # print('W[' + key + '][' + filenames[i] + '] = ' + str(frequency_in_this_doc) + '*Log(' + str(
-                #    len(texts)) + '/' + str(value) + ') = ' + str(W[i][j]))
-
-                j += 1
-            W_norm[i] = math.sqrt(W_norm[i])
-            print('wnorm = ' + str(W_norm[i]))
-            i += 1
-
-        for i in range(len(texts)):
-            for j in range(len(t_all)):
-                W[i][j] /= W_norm[i]
-
-        W_string = ''
-        W_string = W_string + "Нормированные веса\n"
-        for key, value in t_all.items():
-            W_string = W_string + ';' + key
-        W_string += '\n'
-        i = 0
-        for row in W:
-            W_string += os.path.basename(self.filenames[i])
-            for item in row:
-                W_string = W_string + ';' + str(round(item, 10)).replace('.',',')
-            W_string += '\n'
-            i += 1
-        writeStringToFile(W_string.replace('\n ', '\n'), output_dir + 'W.csv')
-
-        S = GetS(W)
-        sim_string = ''
-        for name in self.filenames:
-            sim_string = sim_string + ';' + os.path.basename(name)
-        sim_string += '\n'
-        for i in range(len(texts)):
-            sim_string += os.path.basename(self.filenames[i])
-            for j in range(len(t_all)):
-                sim_string = sim_string + ';' + str(S[i][j]).replace('.',',')
-            sim_string += '\n'
-        writeStringToFile(sim_string, output_dir + 'sim.csv')
-
-        n = len(texts)
-        m = len(texts)
-        S = [[0 for x in range(n)] for y in range(m)]
+
+        # Найти df, веса и таблицу Sim
+        self.writeTermMatrixFiles(term_matrix, output_dir, True)
 
         self.signals.UpdateProgressBar.emit(50)
 
-        for i in range(n):
-            for j in range(m):
-                summ = 0
-                for k in range(len(t_all)):
-                    summ += math.pow(W[i][k] - W[j][k], 2)
-                S[i][j] = math.sqrt(summ)
-
-        dist_string = ''
-
-        for name in self.filenames:
-            dist_string = dist_string + ';' + os.path.basename(name)
-        dist_string += '\n'
-        for i in range(len(texts)):
-            dist_string += '' + os.path.basename(name)
-            for j in range(len(texts)):
-                dist_string = dist_string + ';' + str(round(S[i][j], 2)).replace('.',',')
-            dist_string += '\n'
-        writeStringToFile(dist_string.replace('\n ', '\n'), output_dir + 'dist.csv')
+        S = pairwiseMatrix('euclidean', term_matrix.W, self.kernelDtype(), self.kernelBlockSize()).tolist()
+
+        writeDocumentsTableToFile(S, self.filenames, len(texts), output_dir + 'dist.csv', 2)
         self.signals.UpdateProgressBar.emit(75)
-        # Проверим для каждого уровня
         centroidCount = ClusterCount
-        # for centroidCount in range(len(texts), 0, -1):
-        calc_string = ''
-
-        if(centroidCount>0):
-            result += 'Кол-во кластеров - ' + str(centroidCount) + '\n'
-            calc_string += 'k=' + str(centroidCount) + '\n'
-            clusterCenteroids = dict()
-            # Шаг 1. Инициализация центров кластеров $, j = 1,k, например, случайными числами.
-            #случайные числа
-            clusterCenteroids = [[random.randrange(0, 100, 1)/10000 for x in range(len(t_all))] for y in range(centroidCount)]
-            #китайцы - китайский пекин шанхай макао япония токио
-            # index=0
-            # for key, value in t_all.items():
-            #     if(key == 'китайский'):
-            #         clusterCenteroids[0][index] = 0.96
-            #         clusterCenteroids[1][index] = 0.49
-            #     if (key == 'пекин'):
-            #         clusterCenteroids[0][index] = 0.8
-            #         clusterCenteroids[1][index] = 0.14
-            #     if (key == 'шанхай'):
-            #         clusterCenteroids[0][index] = 0.42
-            #         clusterCenteroids[1][index] = 0.91
-            #     if (key == 'макао'):
-            #         clusterCenteroids[0][index] = 0.79
-            #         clusterCenteroids[1][index] = 0.96
-            #     if (key == 'япония'):
-            #         clusterCenteroids[0][index] = 0.66
-            #         clusterCenteroids[1][index] = 0.04
-            #     if (key == 'токио'):
-            #         clusterCenteroids[0][index] = 0.85
-            #         clusterCenteroids[1][index] = 0.93
-            #     index = index + 1
-
-            #запишем исходные кластеры
-            calc_string += 'Изначальные кластеры\n;'
-            for key, value in t_all.items():
-                calc_string += key + ';'
-            calc_string += '\n'
-            for i in range(centroidCount):
-                calc_string += 'C' + str(i+1)+';'
-                for j in range(len(t_all)):
-                    calc_string+= str(clusterCenteroids[i][j]).replace('.',',')+';'
-                calc_string+='\n'
-
-            #Шаг 2. Cj={} , j=1,k.
-            doc2cluster = [0 for x in range(len(texts))]
-            for i in range(len(texts)):
-                doc2cluster[i] = -1
-
-            # for i in range(len(texts)):
-            clusterDist = [[0 for x in range(len(texts))] for y in range(centroidCount)]
-
-            # Находим таблицу Dist для центроидов
-            calc_string += '\n\nРасстояния между кластерами(row) и документами(col)\n'
-
-            #Евклидово
-            for i in range(centroidCount):
-                for j in range(len(texts)):
-                    summ = 0
-                    for k in range(len(t_all)):
-                        summ += math.pow(W[j][k] - clusterCenteroids[i][k], 2)
-                    clusterDist[i][j] = math.sqrt(summ)
-                    calc_string += str(clusterDist[i][j]).replace('.',',')+';'
-                calc_string+='\n'
-
-            #Манхеттен
-            # for i in range(centroidCount):
-            #     for j in range(len(texts)):
-            #         summ = 0
-            #         for k in range(len(t_all)):
-            #             summ += math.fabs(W[j][k] - clusterCenteroids[i][k])
-            #         clusterDist[i][j] = summ
-            #         calc_string += str(clusterDist[i][j])+';'
-            #     calc_string+='\n'
-
-            while True:
-                changes = False
-                #Шаг 3. Для каждого  di∈ D:
-
-                for doc in range(len(texts)):
-                    minDistance= 9999
-                    minCluster = -1
-                    currentDistance = 0
-                    for cluster in range(0, centroidCount):
-                        #for dist in range(len(texts)-1):
-                            currentDistance= abs(clusterDist[cluster][doc])
-                            #currentDistance/=len(t_all)
-                            if (currentDistance<minDistance):
-                                minDistance = currentDistance
-                                minCluster = cluster
-                    if(doc2cluster[doc] != minCluster):
-                        doc2cluster[doc] = minCluster
-                        changes = True
-
-                # запишем результаты
-                calc_string += '\n\nРаспределение документов по кластерам\n'
-                for cluster in range(centroidCount):
-                    calc_string += ';C' + str(cluster+1)
-                    for doc in range(len(texts)):
-                        if (doc2cluster[doc] == cluster):
-                            calc_string += '; ' + str(doc+1)
-                    calc_string += '\n'
-                calc_string += '\n'
-
-                docCount=0
-                newDistance = 0
-                for cluster in range(centroidCount):
-                    summ = 0
-                    for doc in range(len(texts)):
-                        if(doc2cluster[doc] == cluster):
-                            if(docCount==0):
-                                clusterCenteroids[cluster] = [0 for x in range(len(t_all))]
-                            docCount+=1
-                            for k in range(len(t_all)):
-                                clusterCenteroids[cluster][k] += W[doc][k]
-                    if(docCount!=0):
-                        for k in range(len(t_all)):
-                            clusterCenteroids[cluster][k] /= docCount
-                    docCount=0
-
-                #обновим центры кластеров
-                calc_string += '\n\nНовые центроиды кластеров\n;'
-                for key, value in t_all.items():
-                    calc_string += key + ';'
-                calc_string += '\n'
-                for i in range(centroidCount):
-                    calc_string += 'C' + str(i+1) + ';'
-                    for j in range(len(t_all)):
-                        calc_string += str(clusterCenteroids[i][j]).replace('.',',') + ';'
-                    calc_string += '\n'
-
-                # Обновляем таблицу Dist для центроидов
-                calc_string += '\n\nРасстояния между кластерами(row) и документами(col)\n'
-                for i in range(centroidCount):
-                    for j in range(len(texts)):
-                        summ = 0
-                        for k in range(len(t_all)):
-                            summ += math.pow(W[j][k] - clusterCenteroids[i][k], 2)
-                        clusterDist[i][j] = math.sqrt(summ)
-                        calc_string += str(clusterDist[i][j]).replace('.',',') + ';'
-                    calc_string += '\n'
-
-                if(changes==False):
-                    print("Найдены кластеры в количестве " + str(centroidCount))
-                    #запишем результаты
-                    clusters += 'Кластеров -'+ str(centroidCount) + '\n'
-                    for cluster in range (centroidCount):
-                        clusters += ';Кластер'+ str(cluster+1)
-                        for doc in range (len(texts)):
-                            if (doc2cluster[doc] == cluster):
-                                clusters += '; ' + str(doc+1)
-                        clusters += '\n'
-                    clusters += '\n'
-                    break
-
-        writeStringToFile(result.replace('\n ', '\n'), output_dir + 'steps.csv')
-        writeStringToFile(calc_string.replace('\n ', '\n').replace('.',','), output_dir + 'calc.csv')
-        writeStringToFile(clusters.replace('\n ', '\n'), output_dir + 'clusters.csv')
+        words = list(t_all.keys())
+        # Записывать в calc.csv центроиды и расстояния на каждой итерации
+        log_iterations = self.configurations.get("clasterization_kmeans_log_iterations", True)
+
+        with OutputFileWriter(output_dir + 'steps.csv') as steps_writer, \
+                OutputFileWriter(output_dir + 'calc.csv', decimal_comma=True) as calc_writer, \
+                OutputFileWriter(output_dir + 'clusters.csv') as clusters_writer:
+            #легенда в ответ
+            for doc in range(len(self.filenames)):
+                steps_writer.write(str(doc) + ' = ' + os.path.basename(self.filenames[doc]) + '\n')
+                clusters_writer.write(str(doc+1) + ' = ' + os.path.basename(self.filenames[doc]) + '\n')
+            steps_writer.write('\n')
+            clusters_writer.write('\n')
+
+            def writeCentroids(title, centroids):
+                calc_writer.write(title + ''.join([word + ';' for word in words]) + '\n')
+                for i, centroid in enumerate(centroids):
+                    calc_writer.write('C' + str(i+1) + ';' + ''.join([str(value) + ';' for value in centroid.tolist()]) + '\n')
+
+            def writeIteration(iteration, labels, centroids, distances):
+                if labels is None:
+                    writeCentroids('Изначальные кластеры\n;', centroids)
+                else:
+                    calc_writer.write('\n\nРаспределение документов по кластерам\n')
+                    writeAssignment(calc_writer, labels, len(centroids), ';C', '; ')
+                    calc_writer.write('\n')
+                    writeCentroids('\n\nНовые центроиды кластеров\n;', centroids)
+                calc_writer.write('\n\nРасстояния между кластерами(row) и документами(col)\n')
+                for row in distances.tolist():
+                    calc_writer.write(''.join([str(value) + ';' for value in row]) + '\n')
+
+            if(centroidCount>0):
+                steps_writer.write('Кол-во кластеров - ' + str(centroidCount) + '\n')
+                calc_writer.write('k=' + str(centroidCount) + '\n')
+
+                result = kMeans(term_matrix.W, centroidCount,
+                                n_init=self.configurations.get("clasterization_kmeans_n_init", 10),
+                                max_iter=self.configurations.get("clasterization_max_iterations", 300),
+                                seed=self.configurations.get("clasterization_random_seed", -1),
+                                batch_size=self.configurations.get("clasterization_kmeans_batch_size", 0),
+                                on_iteration=writeIteration if log_iterations else None)
+                self.kmeans_result = result
+                print("Найдены кластеры в количестве " + str(centroidCount))
+
+                #запишем результаты
+                clusters_writer.write('Кластеров -'+ str(centroidCount) + '\n')
+                writeAssignment(clusters_writer, result.labels, len(result.centroids), ';Кластер', '; ')
+                clusters_writer.write('\n')
+
         self.signals.UpdateProgressBar.emit(100)
         self.signals.PrintInfo.emit('Кластеризация к-средних завершена' + '\n')
 
@@ -761,201 +540,69 @@ class ClasterizationCalculator(QThread):
         eps = float(eps)
 
         # eps = 0.01
-        result = ''
-        clusters=''
-        # легенда в ответ
-        for doc in range(len(self.filenames)):
-            result += str(doc) + ' = ' + os.path.basename(self.filenames[doc]) + '\n'
-            clusters += str(doc) + ' = ' + os.path.basename(self.filenames[doc]) + '\n'
-        result += '\n'
-        clusters += '\n'
-
         # Нахождение матрицы весов
         self.signals.PrintInfo.emit('Нахождение матрицы весов' + '\n')
-        t_all = dict()
-
-        for text in texts:
-            for key, value in text.sorted_word_frequency:
-                t_all[key] = t_all.get(key, 0) + 1
+        term_matrix = self.getTermDocumentMatrix()
+        t_all = term_matrix.dfDict()
 
         self.signals.UpdateProgressBar.emit(15)
-        # Найти df
-        df_string = ''
-        df_string = df_string + "Слово;Используется в документах\n"
-        for key, value in t_all.items():
-            df_string = df_string + key + ';' + str(value) + '\n'
-        writeStringToFile(df_string.replace('\n ', '\n'), output_dir + 'df.csv')
-
-        W = [[0 for x in range(len(t_all))] for y in range(len(texts))]
         print('len(texts)=' + str(len(texts)))
         print('len(t_all)=' + str(len(t_all)))
-        W_norm = [0 for x in range(len(texts))]
-        i = 0
-        j = 0
-        for row in range(len(texts)):
-            j = 0
-            for key, value in t_all.items():
-                text = texts[row]
-                if (key in text.word_frequency):
-                    frequency_in_this_doc = text.word_frequency[key]
-                else:
-                    frequency_in_this_doc = 0
-                W[i][j] = frequency_in_this_doc * math.log10(len(texts) / value)
-                W_norm[i] += math.pow(W[i][j], 2)
-                # print('W[' + key + '][' + filenames[i] + '] = ' + str(frequency_in_this_doc) + '*Log(' + str(
-                #    len(texts)) + '/' + str(value) + ') = ' + str(W[i][j]))
-
-                j += 1
-            W_norm[i] = math.sqrt(W_norm[i])
-            # print('wnorm = ' + str(W_norm[i]))
-            i += 1
-
-        for i in range(len(texts)):
-            for j in range(len(t_all)):
-                W[i][j] /= W_norm[i]
-
-        W_string = ''
-        W_string = W_string + "Нормированные веса\n"
-        for key, value in t_all.items():
-            W_string = W_string + ';' + key
-        W_string += '\n'
-        i = 0
-        for row in W:
-            W_string += os.path.basename(self.filenames[i])
-            for item in row:
-                W_string = W_string + ';' + str(round(item, 10)).replace('.',',')
-            W_string += '\n'
-            i += 1
-        writeStringToFile(W_string.replace('\n ', '\n'), output_dir + 'W.csv')
+
+        # Найти df и веса
+        self.writeTermMatrixFiles(term_matrix, output_dir)
         self.signals.UpdateProgressBar.emit(25)
 
-        # Проверим для каждого уровня
-        # for centroidCount in range(len(texts), 0, -1):
-        #     print('Finding clusters - ' + str(centroidCount))
-        if(True):
+        with OutputFileWriter(output_dir + 'steps.csv') as steps_writer, \
+                OutputFileWriter(output_dir + 'clusters.csv') as clusters_writer:
+            # легенда в ответ
+            for doc in range(len(self.filenames)):
+                steps_writer.write(str(doc) + ' = ' + os.path.basename(self.filenames[doc]) + '\n')
+                clusters_writer.write(str(doc) + ' = ' + os.path.basename(self.filenames[doc]) + '\n')
+            steps_writer.write('\n')
+            clusters_writer.write('\n')
+
             centroidCount = ClusterCount
-            result += 'Кол-во кластеров - ' + str(centroidCount) + '\n'
-
-            #степень нечеткости 1<m< infinity
-            # m = 2
-
-            #номер итерации
-            t=0
-            result += 'm = ' + str(m) + ';' + 'k = ' + str(centroidCount) + '\n'
-
-            #заполним изначально случайными числами, в сумме по строке - 1
-            U0 = [[0 for x in range(centroidCount)] for y in range(len(texts))]
-            result += '\nU0\n'
-            for i in range(len(texts)):
-                remain = 1
-                for j in range(centroidCount):
-                    if (j != centroidCount - 1):
-                        current = random.uniform(0, remain)
-                        remain = remain - current
-                        U0[i][j] = current
-                    else:
-                        U0[i][j] = remain
-                    result += str(U0[i][j]).replace('.',',') + ';'
-                result += '\n'
-            changes = False
+            steps_writer.write('Кол-во кластеров - ' + str(centroidCount) + '\n')
+            steps_writer.write('m = ' + str(m) + ';' + 'k = ' + str(centroidCount) + '\n')
+
+            def writeRows(rows):
+                for row in rows.tolist():
+                    steps_writer.write(''.join([str(value).replace('.',',') + ';' for value in row]) + '\n')
+
+            def writeIteration(iteration, U, centroids):
+                if centroids is None:
+                    steps_writer.write('\nU0\n')
+                else:
+                    steps_writer.write('\nИтерация' + str(iteration) + '\n')
+                    steps_writer.write('\nЦентроиды\n')
+                    writeRows(centroids)
+                    steps_writer.write('U' + str(iteration) + '\n')
+                writeRows(U)
+
+            # Тёплый старт с матрицы принадлежности предыдущего запуска
+            initial_U = None
+            if self.configurations.get("clasterization_cmeans_warm_start", False) and self.fuzzy_result is not None:
+                initial_U = self.fuzzy_result.U
             self.signals.UpdateProgressBar.emit(50)
-            while True:
-                t = t+1
-                result += '\nИтерация' + str(t) + '\n'
-                # print('iteration ' + str(t))
-                centroids = [[0 for x in range(len(t_all))] for y in range(centroidCount)]
-                # Находим таблицу центроидов
-                result += '\nЦентроиды\n'
-                for j in range(centroidCount):
-                    for w_kl in range(len(t_all)):
-                        summU = 0
-                        summUD = 0
-                        for i in range(len(texts)):
-                           summU = summU + math.pow(U0[i][j],m)
-                        for i in range(len(texts)):
-                            #for k in range(len(t_all)):
-                            summUD += math.pow(U0[i][j],m) * W[i][w_kl]
-                        centroids[j][w_kl] = summUD/summU
-                        result += str(centroids[j][w_kl]).replace('.',',') + ';'
-                    result += '\n'
-                # print('centroids founded ')
-
-                # Находим новую таблицу разбиения U1
-                U1 = [[0 for x in range(centroidCount)] for y in range(len(texts))]
-                for i in range(len(texts)):
-                    for j in range(centroidCount):
-                        summ = 0
-                        for k in range(centroidCount):
-                            diff_ij = 0
-                            diff_ik = 0
-                            for p in range(len(t_all)):
-                                diff_ij += math.pow(W[i][p] - centroids[j][p],2)
-                                diff_ik += math.pow(W[i][p] - centroids[k][p], 2)
-                            diff_ik = math.sqrt(diff_ik)
-                            diff_ij = math.sqrt(diff_ij)
-                            summ+= math.pow(diff_ij/diff_ik,2/(m-1))
-                        U1[i][j] = 1/summ
-                # print('new u table founded')
-
-                #запишем в файл новую таблицу
-                result += 'U' + str(t) + '\n'
-                for i in range(len(texts)):
-                    for j in range(centroidCount):
-                        result += str(U1[i][j]).replace('.',',') + ';'
-                    result += '\n'
-
-                #проверим условие остановки
-                Udiff = 0
-                for i in range(len(texts)):
-                    for j in range(centroidCount):
-                        Udiff += math.pow(U0[i][j] - U1[i][j], 2)
-                Udiff = math.sqrt(Udiff)
-                if(Udiff<eps):
-                    # #Выберем самые ближайшие к документам кластеры
-                    doc2cluster = [-1 for x in range(len(texts))]
-                    # Находим таблицу Dist для центроидов
-                    clusterDist = [[0 for x in range(len(texts))] for y in range(centroidCount)]
-                    for x in range(centroidCount):
-                        for y in range(len(texts)):
-                            summ = 0
-                            for k in range(len(t_all)):
-                                summ += math.pow(W[y][k] - centroids[x][k], 2)
-                                clusterDist[x][y] = math.sqrt(summ)
-                    for doc in range(len(texts)):
-                        minDistance = 9999
-                        minCluster = -1
-                        currentDistance = 0
-                        for cluster in range(0, centroidCount):
-                            # for dist in range(len(texts)-1):
-                            currentDistance = abs(clusterDist[cluster][doc])
-                            # currentDistance/=len(t_all)
-                            if (currentDistance < minDistance):
-                                minDistance = currentDistance
-                                minCluster = cluster
-                        if (doc2cluster[doc] != minCluster):
-                            doc2cluster[doc] = minCluster
-                    clusters += '\nКластеры'
-                    print("Найдены кластеры в количестве " + str(centroidCount))
-                    # запишем результаты
-                    # result += 'Кластеров -'+ str(centroidCount) + '\n'
-                    for cluster in range(centroidCount):
-                        clusters += '\nКластер' + str(cluster+1)
-                        for doc in range(len(texts)):
-                            if (doc2cluster[doc] == cluster):
-                                clusters += '; ' + str(doc+1)
-                    break
-                U0 = U1
-                if(t>1000):
-                    self.signals.PrintInfo.emit('АЛГОРИТМ РАСХОДИТСЯ! ВЫБЕРИТЕ ДРУГИЕ ПАРАМЕТРЫ' + '\n')
-                    return
-                # print('continue iterations ')
+            result = fuzzyCMeans(term_matrix.W, centroidCount, m, eps,
+                                 max_iter=self.configurations.get("clasterization_max_iterations", 300),
+                                 seed=self.configurations.get("clasterization_random_seed", -1),
+                                 initial_U=initial_U,
+                                 on_iteration=writeIteration)
+            if not result.converged:
+                self.signals.PrintInfo.emit('АЛГОРИТМ РАСХОДИТСЯ! ВЫБЕРИТЕ ДРУГИЕ ПАРАМЕТРЫ' + '\n')
+                return
+            self.fuzzy_result = result
+
+            # Выберем самые ближайшие к документам кластеры
+            clusters_writer.write('\nКластеры')
+            print("Найдены кластеры в количестве " + str(centroidCount))
+            writeAssignment(clusters_writer, result.labels(), centroidCount, '\nКластер', '; ', '')
         self.signals.UpdateProgressBar.emit(100)
-        writeStringToFile(result, output_dir + 'steps.csv')
-        writeStringToFile(clusters.replace('\n ', '\n'), output_dir + 'clusters.csv')
         self.signals.PrintInfo.emit('Кластеризация Нечёткий алгоритм с-средних завершена' + '\n')
 
     def makeDBSCANClasterization(self,eps, minPts):
-        D = []
         self.signals.PrintInfo.emit('Алгоритм DBSCAN' + '\n')
 
         texts = self.texts
@@ -966,132 +613,57 @@ class ClasterizationCalculator(QThread):
         eps = float(eps)
 
         # eps = 0.01
-        result = 'Алгоритм DBSCAN\n'
-        clustersString = 'Кластеры\n'
+        clustersLines = ['Кластеры\n']
         # легенда в ответ
         for doc in range(len(self.filenames)):
-            result += str(doc+1) + ' = ' + os.path.basename(self.filenames[doc]) + '\n'
-            clustersString += str(doc+1) + ' = ' + os.path.basename(self.filenames[doc]) + '\n'
-        result += '\n'
-        clustersString += '\n'
+            clustersLines.append(str(doc+1) + ' = ' + os.path.basename(self.filenames[doc]) + '\n')
+        clustersLines.append('\n')
 
         # Нахождение матрицы весов
         self.signals.PrintInfo.emit('Нахождение матрицы весов' + '\n')
-        t_all = dict()
-
-        for text in texts:
-            for key, value in text.sorted_word_frequency:
-                t_all[key] = t_all.get(key, 0) + 1
+        term_matrix = self.getTermDocumentMatrix()
+        t_all = term_matrix.dfDict()
 
         self.signals.UpdateProgressBar.emit(15)
-        # Найти df
-        df_string = ''
-        df_string = df_string + "Слово;Используется в документах\n"
-        for key, value in t_all.items():
-            df_string = df_string + key + ';' + str(value) + '\n'
-        writeStringToFile(df_string.replace('\n ', '\n'), output_dir + 'df.csv')
-
-        W = [[0 for x in range(len(t_all))] for y in range(len(texts))]
         print('len(texts)=' + str(len(texts)))
         print('len(t_all)=' + str(len(t_all)))
-        W_norm = [0 for x in range(len(texts))]
-        i = 0
-        j = 0
-        for row in range(len(texts)):
-            j = 0
-            for key, value in t_all.items():
-                text = texts[row]
-                if (key in text.word_frequency):
-                    frequency_in_this_doc = text.word_frequency[key]
-                else:
-                    frequency_in_this_doc = 0
-                W[i][j] = frequency_in_this_doc * math.log10(len(texts) / value)
-                W_norm[i] += math.pow(W[i][j], 2)
-                # print('W[' + key + '][' + filenames[i] + '] = ' + str(frequency_in_this_doc) + '*Log(' + str(
-                #    len(texts)) + '/' + str(value) + ') = ' + str(W[i][j]))
-
-                j += 1
-            W_norm[i] = math.sqrt(W_norm[i])
-            # print('wnorm = ' + str(W_norm[i]))
-            i += 1
-
         self.signals.UpdateProgressBar.emit(25)
 
-        for i in range(len(texts)):
-            for j in range(len(t_all)):
-                W[i][j] /= W_norm[i]
-
-        W_string = ''
-        W_string = W_string + "Нормированные веса\n"
-        for key, value in t_all.items():
-            W_string = W_string + ';' + key
-        W_string += '\n'
-        i = 0
-        for row in W:
-            D.append([i+1,row])
-            W_string += os.path.basename(self.filenames[i])
-            for item in row:
-                W_string = W_string + ';' + str(round(item, 10)).replace('.',',')
-            W_string += '\n'
-            i += 1
-        writeStringToFile(W_string.replace('\n ', '\n'), output_dir + 'W.csv')
+        # Найти df и веса
+        self.writeTermMatrixFiles(term_matrix, output_dir)
         self.signals.UpdateProgressBar.emit(35)
 
-        pt = ()
-        stepsString=''
-        # lines = open(csv, 'r').read().splitlines()
-
-        # Remember to set a value for eps and minPts. Here
-        # they are set to 0.3 and 3.
-        stepsString += 'Steps\n'
-        stepsString+= 'eps =;' + str(eps).replace('.',',') + '\nminPts=;' +str(minPts).replace('.',',') + '\n\n\n\n'
+        # Индекс для поиска соседей документов
+        neighbour_index = makeNeighbourIndex(term_matrix.W, eps,
+                                             self.configurations.get("clasterization_dbscan_index", "blocked"),
+                                             self.configurations.get("clasterization_dbscan_metric", "euclidean"),
+                                             self.kernelBlockSize(),
+                                             self.configurations.get("clasterization_dbscan_components", 50),
+                                             self.kernelDtype())
         self.signals.UpdateProgressBar.emit(45)
-        myDBSCAN = DBSCAN(D, eps, minPts)
-        res = ''
-        results= myDBSCAN.run()
-        self.signals.UpdateProgressBar.emit(75)
-        clusters = results[0]
-        noise = results[1]
-        stepsString+=results[2]
-
-        noiseDocs =[]
-        for doc in range(len(texts)):
-            noiseDocs.append(doc+1)
-
-        # Teting printClusters()
-        #myDBSCAN.printClusters()
-        id=0
-        for doc in W:
-            for cluster in clusters:
-                for pts in cluster.pts:
-                    if(doc==pts[1]):
-                        cluster.addDoc(id+1)
-                        if(noiseDocs.count(id+1)!=0):
-                            noiseDocs.remove(id+1)
-            id = id + 1
-        # id = 0
-        # for doc in W:
-        #     for noisedoc in noise:
-        #             if (doc == noisedoc):
-        #                 noiseDocs.append(id + 1)
-
-            # id=id+1
-        # Manually printing
-        # print('Clusters')
-        self.signals.UpdateProgressBar.emit(90)
-        clustersString += 'Clusters\n'
-        for cluster in clusters:
-            clustersString+= 'C' + str(cluster.cid+1) + ':;'
-            for doc in cluster.docs:
-                clustersString+=str(doc)+';'
-            clustersString += '\n'
-
-        clustersString +='\nNoise\n'
-        for noiceDoc in noiseDocs:
-            clustersString += str(noiceDoc) + ';'
-        writeStringToFile(clustersString.replace('\n ', '\n'), output_dir + 'Clusters.csv')
-        stepsString+='\n\n' + clustersString
-        writeStringToFile(stepsString.replace('\n ', '\n'), output_dir + 'Steps.csv')
+
+        with OutputFileWriter(output_dir + 'Steps.csv') as steps_writer:
+            steps_writer.write('Steps\n')
+            steps_writer.write('eps =;' + str(eps).replace('.',',') + '\nminPts=;' +str(minPts).replace('.',',') + '\n\n\n\n')
+            # Журнал шагов может быть намного больше самих результатов
+            on_step = None
+            if self.configurations.get("clasterization_dbscan_log_steps", True):
+                on_step = steps_writer.write
+            result = DBSCAN(neighbour_index, len(texts), minPts, on_step).run()
+            self.dbscan_result = result
+            self.signals.UpdateProgressBar.emit(75)
+
+            clustersLines.append('Clusters\n')
+            for cluster, docs in enumerate(result.clusters()):
+                clustersLines.append('C' + str(cluster+1) + ':;' + ''.join([str(doc+1) + ';' for doc in docs]) + '\n')
+            clustersLines.append('\nNoise\n')
+            clustersLines.append(''.join([str(doc+1) + ';' for doc in result.noise()]))
+            self.signals.UpdateProgressBar.emit(90)
+
+            steps_writer.write('\n\n')
+            steps_writer.writeLines(clustersLines)
+        with OutputFileWriter(output_dir + 'Clusters.csv') as writer:
+            writer.writeLines(clustersLines)
         self.signals.UpdateProgressBar.emit(100)
 
     def C3M(self):
@@ -1103,98 +675,52 @@ class ClasterizationCalculator(QThread):
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         self.signals.PrintInfo.emit('Нахождение матрицы весов' + '\n')
-        t_all = dict()
-
-        for text in texts:
-            for key, value in text.sorted_word_frequency:
-                t_all[key] = t_all.get(key, 0) + 1
+        term_matrix = self.getTermDocumentMatrix()
+        t_all = term_matrix.dfDict()
 
         # Найти df
-        df_string = ''
-        df_string = df_string + "Слово;Используется в документах\n"
-        for key, value in t_all.items():
-            df_string = df_string + key + ';' + str(value) + '\n'
-        writeStringToFile(df_string.replace('\n ', '\n'), output_dir + 'df.csv')
+        if not self.comparing_methods:
+            writeDfToFile(t_all, output_dir + 'df.csv')
 
         # Вычисление бинарных весов терминов в документах
-        W = []
+        B = term_matrix.sparseBinaryMatrix()
         print('len(texts)=' + str(len(texts)))
         print('len(t_all)=' + str(len(t_all)))
-        for row in range(len(texts)):
-            W.append([])
-            for key, value in t_all.items():
-                text = texts[row]
-                W[-1].append(int(key in text.word_frequency))
 
         # Вывод матрицы бинарных весов
-        writeStringToFile('\n'.join([';'.join([str(w).replace('.','.') for w in wRow]) for wRow in W]), output_dir + 'W.csv')
+        with OutputFileWriter(output_dir + 'W.csv') as writer:
+            writer.writeLines(joinLines(';'.join(str(int(w)) for w in B[row].toarray().ravel())
+                                        for row in range(B.shape[0])))
 
         # Расчёт матрицы коэффициентов покрытия
-        C = []
-        # Список обратных сумм всех столбцов матрицы весов
-        beta = [1 / sum(x) for x in zip(*W)]
-        for i in range(len(W)):
-            alpha = 1 / sum(W[i])
-            sumK = 0
-            C.append([])
-            for j in range(len(W)):
-                sumK = 0
-                for k in range(len(W[i])):
-                    sumK += beta[k] * W[i][k] * W[j][k]
-                C[-1].append(alpha * sumK)
+        cover = CoverCoefficients(B)
+        block_size = self.kernelBlockSize()
 
         # Вывод матрицы коэффициентов покрытия
         # Первая строка - список номеров документов
         # Последующие строки предваряются номером документа,
         # для которого рассчитаны коэффициенты
-        writeStringToFile('\n'.join([';'.join([''] + ["d" + str(1 + num) for num in range(len(C))])] + [';'.join(["d" + str(d + 1)] + [str(cover).replace('.',',') for cover in dCovers]) for d,dCovers in enumerate(C)]), output_dir + 'CoverMatrix.csv')
+        with OutputFileWriter(output_dir + 'CoverMatrix.csv') as writer:
+            writer.write(';'.join([''] + ["d" + str(1 + num) for num in range(len(texts))]))
+            for start, block in cover.rowBlocks(block_size):
+                for offset, dCovers in enumerate(block.tolist()):
+                    writer.write('\n' + ';'.join(["d" + str(start + offset + 1)] + [str(value).replace('.',',') for value in dCovers]))
 
         # Количество кластеров
-        nc = 0
-        for i in range(len(C)):
-            nc += C[i][i]
-        nc = round(nc)
+        nc = clustersCount(cover)
         print('Количество кластеров: ' + str(nc) + '\n')
 
         # Затравочная сила
-        P = []
-        for i in range(len(C)):
-            P.append(C[i][i] * (1 - C[i][i]) * sum(W[i]))
-        writeStringToFile('\n'.join(';'.join([str(1 + index), str(k).replace('.',',')]) for index,k in enumerate(P)), output_dir + 'SeedPower.csv')
+        diagonal = cover.diagonal()
+        P = seedPowers(cover, diagonal)
+        with OutputFileWriter(output_dir + 'SeedPower.csv') as writer:
+            writer.writeLines(joinLines(';'.join([str(1 + index), str(k).replace('.',',')]) for index, k in enumerate(P.tolist())))
 
         # Выбрать nc документов с наибольшей затравочной силой - "затравки"
         # Все затравки должны различаться между собой
-        minDifference = 0.001
-        s = {}
-        for index, p in enumerate(P):
-            for key, value in s.items():
-                if abs(p - value) <= minDifference and (\
-                    abs(C[index][index] - C[key][key]) <= minDifference or \
-                    abs(C[index][key] - C[key][index]) <= minDifference or \
-                    abs(C[index][index] - C[index][key]) <= minDifference or \
-                    abs(C[key][key] - C[key][index]) <= minDifference):
-                    break
-            else:
-                s[index] = p
-                if len(s) >= nc:
-                    break
-        j = 0
-        minSeedPower = min(s, key = lambda key: s[key])
-        for index, p in enumerate(P):
-            if not index in s.keys():
-                if p > s[minSeedPower]:
-                    for key, value in s.items():
-                        if abs(p - value) <= minDifference and (\
-                            abs(C[index][index] - C[key][key]) <= minDifference or \
-                            abs(C[index][key] - C[key][index]) <= minDifference or \
-                            abs(C[index][index] - C[index][key]) <= minDifference or \
-                            abs(C[key][key] - C[key][index]) <= minDifference):
-                            break
-                    else:
-                        del(s[minSeedPower])
-                        s[index] = p
-                        minSeedPower = min(s, key = lambda key: s[key])
-        writeStringToFile('\n'.join(';'.join([str(1 + key), str(value).replace('.',',')]) for key, value in s.items()), output_dir + 'Seeds.csv')
+        seeds = selectSeeds(cover, P, nc, 0.001, diagonal)
+        with OutputFileWriter(output_dir + 'Seeds.csv') as writer:
+            writer.writeLines(joinLines(';'.join([str(1 + key), str(P[key]).replace('.',',')]) for key in seeds.tolist()))
 
         # Формирование кластеров
         # Каждый документ, не являющийся затравочным,
@@ -1202,24 +728,14 @@ class ClasterizationCalculator(QThread):
         # которая больше его покрывает
         # Если несколько затравок покрывают документ одинаково,
         # выбирается затравка с наибольшей затравочной силой
-        clusters = []
-        for k in s:
-            clusters.append([])
-            clusters[-1].append(k)
-        for d in range(len(C)):
-            if d not in s:
-                maxCover = 0
-                maxCoverIndex = 0
-                for k, seedPower in s.items():
-                    if maxCover < C[k][d] or (maxCover == C[k][d] and s[maxCoverIndex] < seedPower):
-                        maxCover = C[k][d]
-                        maxCoverIndex = k
-                for cluster in clusters:
-                    if (maxCoverIndex == cluster[0]):
-                        cluster.append(d)
+        labels = assignToSeeds(cover, seeds, block_size)
+        self.c3m_labels = labels
 
         # Вывод результирующего набора кластеров
-        writeStringToFile('\n'.join(';'.join(['Cluster' + str(1 + index)] + [str(1 + d) for d in cluster]) for index, cluster in enumerate(clusters)), output_dir + 'clusters.csv')
+        with OutputFileWriter(output_dir + 'clusters.csv') as writer:
+            writer.writeLines(joinLines(';'.join(['Cluster' + str(1 + index), str(1 + seed)] +
+                                                 [str(1 + d) for d in np.flatnonzero(labels == index) if d != seed])
+                                        for index, seed in enumerate(seeds.tolist())))
 
     @staticmethod
     def trainCoeff(t):
@@ -1248,317 +764,59 @@ class ClasterizationCalculator(QThread):
 
         # Нахождение матрицы весов
         self.signals.PrintInfo.emit('Нахождение матрицы весов' + '\n')
-        t_all = dict()
-
-        for text in texts:
-            for key, value in text.sorted_word_frequency:
-                t_all[key] = t_all.get(key, 0) + 1
+        term_matrix = self.getTermDocumentMatrix()
+        t_all = term_matrix.dfDict()
 
         self.signals.UpdateProgressBar.emit(15)
-        # Найти df
-        df_string = ''
-        df_string = df_string + "Слово;Используется в документах\n"
-        for key, value in t_all.items():
-            df_string = df_string + key + ';' + str(value) + '\n'
-        writeStringToFile(df_string.replace('\n ', '\n'), output_dir + 'df.csv')
-
-        W = [[0 for x in range(len(t_all))] for y in range(len(texts))]
+        X = term_matrix.denseW()
         print('len(texts)=' + str(len(texts)))
         print('len(t_all)=' + str(len(t_all)))
-        W_norm = [0 for x in range(len(texts))]
-        i = 0
-        j = 0
-        for row in range(len(texts)):
-            j = 0
-            for key, value in t_all.items():
-                text = texts[row]
-                if (key in text.word_frequency):
-                    frequency_in_this_doc = text.word_frequency[key]
-                else:
-                    frequency_in_this_doc = 0
-                W[i][j] = frequency_in_this_doc * math.log10(len(texts) / value)
-                W_norm[i] += math.pow(W[i][j], 2)
-                j += 1
-            W_norm[i] = math.sqrt(W_norm[i])
-            i += 1
-
-        for i in range(len(texts)):
-            for j in range(len(t_all)):
-                W[i][j] /= W_norm[i]
-        writeMatrixToFile(W, output_dir + "W.csv")
+        # Найти df и веса
+        if not self.comparing_methods:
+            writeDfToFile(t_all, output_dir + 'df.csv')
+            writeMatrixToFile(X.tolist(), output_dir + "W.csv")
 
-        t = 0                                       # Счётчик итераций обучения
-        M = [[random.random() for j in range(len(t_all))] \
-            for i in range(length * length)]             # Множество нейронов
+        rng = makeRandomGenerator(self.configurations.get("clasterization_random_seed", -1))
+        M = rng.random((length * length, len(t_all)))          # Множество нейронов
+        writeMatrixToFile(M.tolist(), output_dir + "MInitial.csv")
 
-        minError = 0.0000001
-
-        writeMatrixToFile(M, output_dir + "MInitial.csv")
         # Процесс обучения. Его цель - сгруппировать нейроны, непосредственно
         # соседствующие по карте, вокруг документов
         self.signals.PrintInfo.emit('Обучение нейронов')
-        while True:
-            winnerDistSum = 0
-            Dtr = [d for d in W]                    # Обучающая выборка
-            # Выбирается ближайший к случайно выбранному документу нейрон
-            # Все нейроны-соседи "победителя" по карте перемещаются ближе к нему
-            while Dtr:
-                dChosen = Dtr.pop(random.randint(0, len(Dtr) - 1))
-                winner = min(M, key=lambda m:dist(dChosen, m))
-                #print('indxW:' + str(M.index(winner)))
-                #print('distW:' + str(dist(dChosen, winner)))
-                rw = (M.index(winner) // length, M.index(winner) % length)
-                for i in range(len(M)):
-                    rm = (i // length, i % length)
-                    M[i] = [mi + self.trainCoeff(t) * math.exp(-(dist(rm, rw) ** 2) / \
-                        (2 * self.neighborCoeff(t, length) ** 2)) * (di - mi) \
-                        for mi,di in zip(M[i], dChosen)]
-                winnerDistSum = sum([dist(closest, d) for closest, d in zip([min(M, key=lambda m:dist(d, m)) for d in W], W)])
-            if minError > winnerDistSum / len(texts) or t > 10000:
-                break;
-            t += 1
-
-
-        writeMatrixToFile(M, output_dir + "MOrganized.csv")
-
-        self.signals.PrintInfo.emit('Число итераций - ' + str(t))
-
-        self.somDLocations = [(M.index(closest) % length, M.index(closest) // length) \
-            for closest in [min(M, key=lambda m:dist(d, m)) for d in W]]
+        result = trainSOM(X, length,
+                          learning_rate=self.trainCoeff,
+                          radius=lambda t: self.neighborCoeff(t, length),
+                          mode=self.configurations.get("clasterization_som_mode", "online"),
+                          max_epochs=self.configurations.get("clasterization_som_max_epochs", 10000),
+                          min_error=self.configurations.get("clasterization_som_min_error", 0.0000001),
+                          tolerance=self.configurations.get("clasterization_som_tolerance", 0.000001),
+                          seed=self.configurations.get("clasterization_random_seed", -1),
+                          initial_M=M)
+        M = result.M
+
+        writeMatrixToFile(M.tolist(), output_dir + "MOrganized.csv")
+
+        self.signals.PrintInfo.emit('Число итераций - ' + str(result.epochs))
+
+        self.somDLocations = documentLocations(X, M, length)
         self.signals.PrintInfo.emit('\n'.join(['d{0}:({1},{2})'.format( \
-            W.index(d), x, y) for d, (x, y) in zip(W, self.somDLocations)]))
+            d, x, y) for d, (x, y) in enumerate(self.somDLocations)]))
 
         self.signals.PrintInfo.emit('Построение U-матрицы')
 
-        # Для упрощения адресации нейроны организуются в двумерный массив
-        mapM = [[m for m in M[i * length:i * length + length]]
-            for i in range(length)]
-
         # Построение U-матрицы, хранящей расстояния между соседними нейронами
-        finalMap = [[0 for i in range(length)] for j in range(length)]
-        uMatrixSize = 2 * length - 1
-        uMatrix = [[0 for i in range(uMatrixSize)] for j in range(uMatrixSize)]
-        for mi, i in zip(range(length), range(0, uMatrixSize, 2)):
-            for mj, j in zip(range(length), range(0, uMatrixSize, 2)):
-                if mj < length - 1:
-                    uMatrix[i][j + 1] = dist(mapM[mi][mj],mapM[mi][mj + 1])
-                if mi < length - 1:
-                    uMatrix[i + 1][j] = dist(mapM[mi][mj], mapM[mi + 1][mj])
-                if mj < length - 1 and mi < length - 1:
-                    uMatrix[i + 1][j + 1] = \
-                        avg([dist(mapM[mi][mj], mapM[mi + 1][mj + 1]), \
-                             dist(mapM[mi][mj + 1], mapM[mi + 1][mj])])
-                uMatrix[i][j] = finalMap[mi][mj] = avg([uMatrix[n][m] \
-                    for m in range(j - 1, j + 2) \
-                    for n in range(i - 1, i + 2) \
-                    if 0 <= m < uMatrixSize \
-                    and 0 <= n < uMatrixSize \
-                    and not (m == j and n == i)])
-
-        writeMatrixToFile(uMatrix, output_dir + 'uMatrix.csv')
-        writeMatrixToFile(finalMap, output_dir + 'extractedDists.csv')
+        uMatrix, finalMap = buildUMatrix(M, length)
+
+        writeMatrixToFile(uMatrix.tolist(), output_dir + 'uMatrix.csv')
+        writeMatrixToFile(finalMap.tolist(), output_dir + 'extractedDists.csv')
 
         self.signals.PrintInfo.emit('Нормализация карты')
         # Поскольку итоговая карта должна быть отрисована оттенками серого,
         # нужно представить эту карту матрицей, содержащей дробные значения
         # от нуля до единицы. Минимальное расстояние в U-матрице
         # принимается за 1, максимальное - за 0.
-        maxDist = max([d for row in finalMap for d in row])
-        finalMap = [[d - maxDist for d in row] for row in finalMap]
-        minDist = min([d for row in finalMap for d in row])
-        finalMap = [[d / minDist for d in row] for row in finalMap]
-        writeMatrixToFile(finalMap, output_dir + 'greyScaleMap.csv')
-
-        self.somMap = finalMap
-
-class Cluster(object):
-    """ A Cluster is just a wrapper for a list of points.
-    Each Cluster object has a unique id. DBSCAN.run()
-    returns a list of Clusters.
-    """
-
-    cid = 0  # Keep track of cluster ids
-
-    def __init__(self):
-        self.cid = Cluster.cid
-        self.docs = []
-        self.pts = []
-
-        Cluster.cid += 1  # Increment the global id
-
-    def addPoint(self, p):
-        self.pts.append(p)
-    def addDoc(self, doc):
-        self.docs.append(doc)
-
-class DBSCAN(object):
-    """ Parameters
-        ----------
-        D: list of tuples
-            stores points as a list of tuples
-            of the form (<string id>, <float x>, <float y>)
-            E.g. D = [('001', 0.5, 2.1), ('002', 1.0, 2.4)]
-            Point ids don't have to be unique.
-        eps: float
-            maximum distance for two points to be
-            considered the same neighborhood
-            E.g. 0.001
-        minPts: int
-            Minimum number of points in a neighborhood for
-            a point to be considered a core point. This
-            includes the point itself.
-            E.g. 4
-        Returns
-        -------
-        A tuple of a list of Cluster objects and a list of
-        noise, e.i. ([<list clusters>, <list noise pts>])
-        Methods
-        -------
-        printClusters() - handy method for printing results
-        run()           - run DBSCAN
-        Example Usage
-        -------------
-        import dbscan
-        dbs = DBSCAN(D, 0.001, 4)
-        clusters = dbs.scan()
-        # Print with printClusters
-        dbs.printClusters()
-        # Print with iteration
-        for cluster in clusters:
-            print(cluster.cid, cluster.pts)
-    """
-
-    def __init__(self, D, eps, minPts):
-        self.D = D
-        self.minPts = minPts
-
-        # This implementation uses Manhattan distance
-        # so the eps is squared. This is because
-        # calculating sqrt for Euclidean distance is much
-        # slower than calculating squares.
-        self.eps = eps
-
-        self.Clusters = []  # Results stored here
-        self.NOISE = []  # Noise points
-        self.visited = []  # For keeping track of pts
-        self.stepsString = ''
-
-    def __regionQuery(self, pt):
-        eps = self.eps
-        D = self.D
-
-        # This implementation uses Manhattan distance
-        # to avoid doing an expensive sqrt calculation.
-        NeighborhoodPts = []
-
-        for p in D:
-            if(p!=pt):
-                res = 0
-                for k in range(len(pt[1])):
-                    res += math.pow(p[1][k] - pt[1][k], 2)
-                res = math.sqrt(res)
-                if (res<= eps):
-                    NeighborhoodPts.append(p)
-                    self.stepsString += 'Founded Neighborhood doc' + str(p[0]) + '\n'
-
-        return NeighborhoodPts
-
-    def __expandCluster(self, pt, NeighborhoodPts, C):
-        C.addPoint(pt)
-        self.stepsString+='Expand C'+str(C.cid+1)+'\n'
-        # Localize for some performance boost.
-        visited = self.visited
-        appendVisited = visited.append
-        regionQuery = self.__regionQuery
-        minPts = self.minPts
-        appendNeighborhoodPts = NeighborhoodPts.append
-        Clusters = self.Clusters
-
-        for p in NeighborhoodPts:
-            if p not in visited:
-                self.stepsString += 'Visit Neighborhood doc' + str(p[0]) + '\n'
-                appendVisited(p)
-                NewNeighborhoodPts = regionQuery(p)
-                if len(NewNeighborhoodPts) >= minPts:
-                    for n in NewNeighborhoodPts:
-                        if n not in NeighborhoodPts:
-                            self.stepsString += 'Add Neighborhood doc' +str(n[0]) + '\n'
-                            appendNeighborhoodPts(n)
-
-            # Check if p in any clusters
-            for cluster in Clusters:
-                if p not in cluster.pts:
-                    if p not in C.pts:
-                        C.addPoint(p)
-                        self.stepsString += 'Added doc' + str(p[0]) + ' to cluster C' + str(C.cid+1) + '\n'
-                        break
-
-    def printClusters(self):
-        for cluster in self.Clusters:
-            cid = cluster.cid
-            pts = cluster.pts
-            print("Cluster %d" % cid)
-            for p in pts:
-                print(
-                    "id = %s x = %f y = %f"
-                    % (p[0], p[1], p[2])
-                )
+        finalMap = finalMap - finalMap.max()
+        finalMap = finalMap / finalMap.min()
+        writeMatrixToFile(finalMap.tolist(), output_dir + 'greyScaleMap.csv')
 
-    def run(self):
-        index=0
-        for pt in self.D:
-            self.stepsString+='See doc'+str(index+1)+'\n'
-            if pt not in self.visited:
-                self.stepsString += 'Visit doc' + str(index + 1) + '\n'
-                self.visited.append(pt)
-                NeighborhoodPts = self.__regionQuery(pt)
-                if len(NeighborhoodPts) < self.minPts:
-                    self.stepsString += 'Add to Noise doc' + str(index + 1) + '\n'
-                    self.NOISE.append(pt)
-                else:
-                    C = Cluster()  # new cluster
-                    self.Clusters.append(C)
-                    self.stepsString += 'Create new cluster C' + str(C.cid + 1) + '\n'
-                    self.__expandCluster(
-                        pt, NeighborhoodPts, C
-                    )
-            index += 1
-        return (self.Clusters, self.NOISE, self.stepsString)
-
-# Test
-def IrisTest(csv):
-    D = []
-    pt = ()
-
-    lines = open(csv, 'r').read().splitlines()
-
-    # If using the sample iris.data included in the
-    # repository, each line is structured:
-    #
-    # <float sl>, <float sw>, <float pl>, <float pw>, <string id>
-    #
-    # For sepal length vs petal length comparison, use:
-    #
-    # pt = (cols[4], float(cols[2]), float(cols[0])
-    #
-    # Check for more information:
-    # https://en.wikipedia.org/wiki/Iris_flower_data_set
-    for line in lines:
-        cols = line.split(',')
-        pt = (cols[4], float(cols[2]), float(cols[0]))
-        D.append(pt)
-
-    # Remember to set a value for eps and minPts. Here
-    # they are set to 0.3 and 3.
-    myDBSCAN = DBSCAN(D, 0.3, 3)
-
-    results = myDBSCAN.run()
-    clusters = results[0]
-    noise = results[1]
-
-    # Teting printClusters()
-    myDBSCAN.printClusters()
-
-    # Manually printing
-    for cluster in clusters:
-        print(cluster.cid, cluster.pts)
+        self.somMap = finalMap.tolist()
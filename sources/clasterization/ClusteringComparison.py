@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Сравнение разбиений документов на кластеры, полученных разными методами.
+# Разбиение задаётся номерами кластеров документов; -1 - шум (DBSCAN)
+# или документ без кластера.
+
+import numpy as np
+
+
+def partitionClustersCount(labels):
+    labels = np.asarray(labels)
+    return len(np.unique(labels[labels >= 0]))
+
+
+def partitionNoiseCount(labels):
+    return int(np.count_nonzero(np.asarray(labels) < 0))
+
+
+def pairsCount(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values * (values - 1) / 2
+
+
+def adjustedRandIndex(first, second):
+    """Скорректированный индекс Рэнда (ARI) двух разбиений: 1 - разбиения совпадают,
+    около 0 - совпадение не лучше случайного. Шум считается отдельным кластером."""
+    _, first = np.unique(first, return_inverse=True)
+    _, second = np.unique(second, return_inverse=True)
+    contingency = np.zeros((first.max() + 1, second.max() + 1))
+    np.add.at(contingency, (first, second), 1)
+    index = pairsCount(contingency).sum()
+    first_pairs = pairsCount(contingency.sum(axis=1)).sum()
+    second_pairs = pairsCount(contingency.sum(axis=0)).sum()
+    total_pairs = pairsCount(len(first))
+    if total_pairs == 0:
+        return 1.0
+    expected = first_pairs * second_pairs / total_pairs
+    maximum = (first_pairs + second_pairs) / 2
+    if maximum == expected:
+        return 1.0
+    return float((index - expected) / (maximum - expected))
+
+
+def silhouetteScore(distances, labels):
+    """Средний силуэт документов по матрице расстояний (шум не учитывается).
+    None, если кластеров меньше двух."""
+    labels = np.asarray(labels)
+    clustered = np.flatnonzero(labels >= 0)
+    _, labels = np.unique(labels[clustered], return_inverse=True)
+    clusters = labels.max() + 1 if len(labels) else 0
+    if clusters < 2:
+        return None
+    distances = np.asarray(distances)[np.ix_(clustered, clustered)]
+    membership = np.zeros((len(labels), clusters))
+    membership[np.arange(len(labels)), labels] = 1
+    sizes = membership.sum(axis=0)
+    sums = distances @ membership
+
+    own_sizes = sizes[labels]
+    own = np.zeros(len(labels))
+    not_single = own_sizes > 1
+    own[not_single] = sums[not_single, labels[not_single]] / (own_sizes[not_single] - 1)
+    means = sums / sizes
+    means[np.arange(len(labels)), labels] = np.inf
+    other = means.min(axis=1)
+
+    scores = np.zeros(len(labels))
+    scale = np.maximum(own, other)
+    valid = not_single & (scale > 0)
+    scores[valid] = (other[valid] - own[valid]) / scale[valid]
+    return float(scores.mean())
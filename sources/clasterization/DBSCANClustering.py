@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Алгоритм DBSCAN над номерами документов.
+# Документ - номер строки матрицы весов; посещённые документы, очередь
+# расширения кластера и принадлежность кластерам хранятся в массивах-флагах,
+# поэтому проверки "уже посещён" / "уже в очереди" выполняются за O(1).
+# Поиск соседей вынесен в индекс соседей:
+#   precomputed - по готовой матрице расстояний (память O(N^2)),
+#   tree        - KD-дерево на координатах, сокращённых SVD (O(log N) на запрос),
+#   blocked     - перебор всех пар блоками строк (память O(блок x N)).
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+import scipy.spatial
+
+from sources.clasterization.DistanceKernels import DEFAULT_BLOCK_SIZE, asMatrix, cosineDistanceMatrix, \
+    euclideanDistanceMatrix, iterateMatrixBlocks
+
+NEIGHBOUR_INDEXES = ('precomputed', 'tree', 'blocked')
+
+
+DISTANCE_KERNELS = {'euclidean': euclideanDistanceMatrix, 'cosine': cosineDistanceMatrix}
+
+
+def neighboursFromDistances(distances, eps, first_row=0):
+    """Списки соседей (не дальше eps, без самого документа) для строк матрицы расстояний."""
+    result = []
+    for offset, row in enumerate(distances):
+        neighbours = np.flatnonzero(row <= eps)
+        result.append(neighbours[neighbours != first_row + offset])
+    return result
+
+
+class PrecomputedNeighbourIndex:
+    """Соседи по готовой матрице расстояний документов."""
+
+    def __init__(self, distances, eps):
+        self.neighbour_lists = neighboursFromDistances(np.asarray(distances), eps)
+
+    def neighbours(self, point):
+        return self.neighbour_lists[point]
+
+
+class BlockedNeighbourIndex:
+    """Соседи перебором всех пар: матрица расстояний считается блоками по block_size
+    строк, от каждого блока остаются только списки соседей."""
+
+    def __init__(self, X, eps, metric='euclidean', block_size=DEFAULT_BLOCK_SIZE, dtype=np.float64):
+        if block_size <= 0:
+            block_size = DEFAULT_BLOCK_SIZE
+        self.neighbour_lists = []
+        for start, stop, block in iterateMatrixBlocks(DISTANCE_KERNELS[metric], X, None, block_size, dtype):
+            self.neighbour_lists.extend(neighboursFromDistances(block, eps, start))
+
+    def neighbours(self, point):
+        return self.neighbour_lists[point]
+
+
+def reduceDimensions(X, components):
+    """Координаты строк X в базисе первых components правых сингулярных векторов.
+    Проекция на ортонормированный базис не увеличивает расстояний."""
+    components = max(1, min(components, min(X.shape)))
+    if scipy.sparse.issparse(X) and components < min(X.shape):
+        U, S, Vt = scipy.sparse.linalg.svds(X, k=components)
+    else:
+        dense = X.toarray() if scipy.sparse.issparse(X) else np.asarray(X)
+        U, S, Vt = np.linalg.svd(dense, full_matrices=False)
+        U, S = U[:, :components], S[:components]
+    return U * S
+
+
+class TreeNeighbourIndex:
+    """Соседи по евклидову расстоянию через KD-дерево на сокращённых координатах.
+    В сокращённом пространстве расстояния не больше настоящих, поэтому дерево
+    находит всех соседей (и, возможно, лишних), а лишние отсекаются точным расстоянием."""
+
+    def __init__(self, X, eps, components=50, dtype=np.float64):
+        self.X = asMatrix(X, dtype)
+        self.eps = eps
+        self.dtype = dtype
+        self.reduced = reduceDimensions(self.X, components)
+        self.tree = scipy.spatial.cKDTree(self.reduced)
+
+    def neighbours(self, point):
+        candidates = np.array(sorted(self.tree.query_ball_point(self.reduced[point], self.eps)), dtype=np.int64)
+        candidates = candidates[candidates != point]
+        if len(candidates) == 0:
+            return candidates
+        distances = euclideanDistanceMatrix(self.X[point:point + 1], self.X[candidates], self.dtype).ravel()
+        return candidates[distances <= self.eps]
+
+
+def makeNeighbourIndex(X, eps, index='blocked', metric='euclidean', block_size=0, components=50,
+                       dtype=np.float64):
+    """Создать индекс соседей по названию (см. NEIGHBOUR_INDEXES).
+    KD-дерево работает только с евклидовым расстоянием."""
+    if index not in NEIGHBOUR_INDEXES:
+        raise ValueError('Неизвестный индекс соседей: ' + str(index))
+    if index == 'tree' and metric == 'euclidean':
+        return TreeNeighbourIndex(X, eps, components, dtype)
+    if index == 'precomputed':
+        distances = np.empty((X.shape[0], X.shape[0]), dtype=dtype)
+        for start, stop, block in iterateMatrixBlocks(DISTANCE_KERNELS[metric], X, None, block_size, dtype):
+            distances[start:stop] = block
+        return PrecomputedNeighbourIndex(distances, eps)
+    return BlockedNeighbourIndex(X, eps, metric, block_size, dtype)
+
+
+class DBSCANResult:
+
+    def __init__(self, labels, clusters_count):
+        self.labels = labels                    # Номер кластера документа, -1 - шум
+        self.clusters_count = clusters_count
+
+    def clusters(self):
+        """Списки документов кластеров."""
+        return [np.flatnonzero(self.labels == cluster).tolist() for cluster in range(self.clusters_count)]
+
+    def noise(self):
+        return np.flatnonzero(self.labels < 0).tolist()
+
+
+class DBSCAN:
+    """DBSCAN над индексом соседей: документ - основной, если у него не меньше
+    minPts соседей (не считая его самого) на расстоянии не больше eps.
+    on_step(строка) - необязательный журнал шагов (номера документов с 1)."""
+
+    def __init__(self, neighbour_index, documents_count, minPts, on_step=None):
+        self.index = neighbour_index
+        self.n = documents_count
+        self.minPts = minPts
+        self.on_step = on_step
+        self.visited = np.zeros(self.n, dtype=bool)
+        self.labels = np.full(self.n, -1, dtype=np.int64)
+        self.clusters_count = 0
+
+    def log(self, line):
+        if self.on_step is not None:
+            self.on_step(line)
+
+    def regionQuery(self, point):
+        neighbours = self.index.neighbours(point)
+        if self.on_step is not None:
+            for neighbour in neighbours:
+                self.log('Founded Neighborhood doc' + str(neighbour + 1) + '\n')
+        return neighbours
+
+    def expandCluster(self, point, neighbours, cluster):
+        self.labels[point] = cluster
+        self.log('Expand C' + str(cluster + 1) + '\n')
+        queue = list(neighbours)
+        queued = np.zeros(self.n, dtype=bool)
+        queued[point] = True
+        queued[neighbours] = True
+        position = 0
+        while position < len(queue):
+            current = queue[position]
+            position += 1
+            if not self.visited[current]:
+                self.log('Visit Neighborhood doc' + str(current + 1) + '\n')
+                self.visited[current] = True
+                new_neighbours = self.regionQuery(current)
+                if len(new_neighbours) >= self.minPts:
+                    added = new_neighbours[~queued[new_neighbours]]
+                    queued[added] = True
+                    queue.extend(added.tolist())
+                    if self.on_step is not None:
+                        for neighbour in added:
+                            self.log('Add Neighborhood doc' + str(neighbour + 1) + '\n')
+            if self.labels[current] < 0:
+                self.labels[current] = cluster
+                self.log('Added doc' + str(current + 1) + ' to cluster C' + str(cluster + 1) + '\n')
+
+    def run(self):
+        for point in range(self.n):
+            self.log('See doc' + str(point + 1) + '\n')
+            if self.visited[point]:
+                continue
+            self.log('Visit doc' + str(point + 1) + '\n')
+            self.visited[point] = True
+            neighbours = self.regionQuery(point)
+            if len(neighbours) < self.minPts:
+                self.log('Add to Noise doc' + str(point + 1) + '\n')
+            else:
+                cluster = self.clusters_count
+                self.clusters_count += 1
+                self.log('Create new cluster C' + str(cluster + 1) + '\n')
+                self.expandCluster(point, neighbours, cluster)
+        return DBSCANResult(self.labels, self.clusters_count)
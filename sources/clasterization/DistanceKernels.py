@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Матричные ядра сходства и расстояния между документами.
+# Вся матрица (или её блок строк) считается одним матричным умножением (BLAS)
+# вместо попарных циклов по документам и словам.
+# Матрицы документов могут быть numpy.ndarray или scipy.sparse.
+
+import numpy as np
+import scipy.sparse
+
+DEFAULT_BLOCK_SIZE = 1024
+
+
+def parseDtype(dtype_name):
+    """Тип чисел для ядер: 'float32' (в 2 раза меньше памяти) или 'float64'."""
+    if dtype_name in ('float32', np.float32):
+        return np.float32
+    return np.float64
+
+
+def asMatrix(X, dtype=np.float64):
+    if scipy.sparse.issparse(X):
+        return X.astype(dtype, copy=False).tocsr()
+    return np.asarray(X, dtype=dtype)
+
+
+def squaredRowNorms(X):
+    if scipy.sparse.issparse(X):
+        return np.asarray(X.multiply(X).sum(axis=1)).ravel()
+    return np.einsum('ij,ij->i', X, X)
+
+
+def dotProducts(X, Y):
+    product = X @ Y.T
+    if scipy.sparse.issparse(product):
+        return product.toarray()
+    return np.asarray(product)
+
+
+def normalizeRows(X):
+    """Нормировать строки по L2 (нулевые строки остаются нулевыми)."""
+    norms = np.sqrt(squaredRowNorms(X))
+    norms[norms == 0] = 1
+    if scipy.sparse.issparse(X):
+        return scipy.sparse.csr_matrix(X.multiply(1 / norms[:, np.newaxis]))
+    return X / norms[:, np.newaxis]
+
+
+# Ядро задаётся парой функций: prepare(X, dtype) один раз приводит матрицу к типу
+# и считает то, что не зависит от другой матрицы (нормировка, квадраты норм), а
+# block(prepared_X, prepared_Y) считает значения по подготовленным матрицам.
+# Подготовленная матрица - пара (строки, квадраты норм строк или None).
+
+def prepareCosine(X, dtype=np.float64):
+    """Строки X, нормированные по L2."""
+    return normalizeRows(asMatrix(X, dtype)), None
+
+
+def cosineBlock(prepared_X, prepared_Y):
+    return dotProducts(prepared_X[0], prepared_Y[0])
+
+
+def cosineDistanceBlock(prepared_X, prepared_Y):
+    return 1 - cosineBlock(prepared_X, prepared_Y)
+
+
+def prepareEuclidean(X, dtype=np.float64):
+    """Строки X и квадраты их норм."""
+    X = asMatrix(X, dtype)
+    return X, squaredRowNorms(X)
+
+
+def euclideanBlock(prepared_X, prepared_Y):
+    """|x - y|^2 = |x|^2 + |y|^2 - 2(x, y)"""
+    X, X_norms = prepared_X
+    Y, Y_norms = prepared_Y
+    distances = X_norms[:, np.newaxis] + Y_norms[np.newaxis, :] - 2 * dotProducts(X, Y)
+    # Отрицательные значения - погрешность округления для совпадающих векторов
+    np.maximum(distances, 0, out=distances)
+    np.sqrt(distances, out=distances)
+    return distances
+
+
+def preparedRows(prepared, start, stop):
+    """Строки start..stop-1 подготовленной матрицы."""
+    rows, norms = prepared
+    return rows[start:stop], None if norms is None else norms[start:stop]
+
+
+def applyKernel(prepare, block, X, Y, dtype):
+    prepared_X = prepare(X, dtype)
+    prepared_Y = prepared_X if Y is None else prepare(Y, dtype)
+    return block(prepared_X, prepared_Y)
+
+
+def cosineSimilarityMatrix(X, Y=None, dtype=np.float64):
+    """Косинусное сходство строк X со строками Y (по умолчанию Y = X)."""
+    return applyKernel(prepareCosine, cosineBlock, X, Y, dtype)
+
+
+def cosineDistanceMatrix(X, Y=None, dtype=np.float64):
+    """Косинусное расстояние 1 - cos между строками X и Y."""
+    return applyKernel(prepareCosine, cosineDistanceBlock, X, Y, dtype)
+
+
+def euclideanDistanceMatrix(X, Y=None, dtype=np.float64):
+    """Евклидовы расстояния между строками X и строками Y (по умолчанию Y = X)."""
+    return applyKernel(prepareEuclidean, euclideanBlock, X, Y, dtype)
+
+
+KERNELS = {'cosine': cosineSimilarityMatrix, 'euclidean': euclideanDistanceMatrix}
+
+# Подготовка и расчёт блока для ядер
+BLOCK_KERNELS = {
+    cosineSimilarityMatrix: (prepareCosine, cosineBlock),
+    cosineDistanceMatrix: (prepareCosine, cosineDistanceBlock),
+    euclideanDistanceMatrix: (prepareEuclidean, euclideanBlock),
+}
+
+
+def iterateMatrixBlocks(kernel, X, Y=None, block_size=DEFAULT_BLOCK_SIZE, dtype=np.float64):
+    """Считать матрицу kernel(X, Y) блоками по block_size строк.
+    Выдаёт (первая строка, последняя строка + 1, блок), так что в памяти
+    одновременно находится только block_size x len(Y) значений, если
+    потребитель не собирает блоки в одну матрицу.
+    X и Y приводятся к типу и нормируются один раз до расчёта блоков;
+    при Y = None подготовленная X используется и как Y.
+    kernel - функция ядра или его название ('cosine', 'euclidean')."""
+    if isinstance(kernel, str):
+        kernel = KERNELS[kernel]
+    if block_size <= 0:
+        block_size = X.shape[0]
+    if kernel not in BLOCK_KERNELS:
+        if Y is None:
+            Y = X
+        for start in range(0, X.shape[0], block_size):
+            stop = min(start + block_size, X.shape[0])
+            yield start, stop, kernel(X[start:stop], Y, dtype)
+        return
+    prepare, block = BLOCK_KERNELS[kernel]
+    prepared_X = prepare(X, dtype)
+    prepared_Y = prepared_X if Y is None else prepare(Y, dtype)
+    for start in range(0, X.shape[0], block_size):
+        stop = min(start + block_size, X.shape[0])
+        yield start, stop, block(preparedRows(prepared_X, start, stop), prepared_Y)
+
+
+def pairwiseMatrix(kernel, X, dtype=np.float64, block_size=0):
+    """Полная матрица kernel(X, X) размером N x N; block_size > 0 ограничивает
+    только промежуточные массивы, сама матрица всегда целиком в памяти.
+    Для расстояния диагональ точно равна нулю."""
+    if isinstance(kernel, str):
+        kernel = KERNELS[kernel]
+    result = np.empty((X.shape[0], X.shape[0]), dtype=dtype)
+    for start, stop, block in iterateMatrixBlocks(kernel, X, None, block_size, dtype):
+        result[start:stop] = block
+    if kernel is euclideanDistanceMatrix or kernel is cosineDistanceMatrix:
+        np.fill_diagonal(result, 0)
+    return result
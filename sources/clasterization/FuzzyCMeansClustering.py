@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Нечёткий алгоритм с-средних (fuzzy C-means) на NumPy.
+# На каждой итерации расстояния документов до центроидов считаются один раз
+# матричным ядром, а степени принадлежности пересчитываются целиком:
+#   U[i,j] = 1 / sum_k (d(i,j) / d(i,k)) ^ (2 / (m - 1))
+# Алгоритм можно продолжить с матрицы U предыдущего запуска (тёплый старт).
+
+import numpy as np
+import scipy.sparse
+
+from sources.clasterization.DistanceKernels import euclideanDistanceMatrix
+from sources.clasterization.KMeansClustering import makeRandomGenerator
+
+
+class FuzzyCMeansResult:
+
+    def __init__(self, U, centroids, distances, iterations, converged):
+        self.U = U                      # Степени принадлежности (документы x кластеры)
+        self.centroids = centroids      # Центроиды (кластеры x слова)
+        self.distances = distances      # Расстояния документов до центроидов
+        self.iterations = iterations
+        self.converged = converged      # Достигнута ли точность eps за max_iter итераций
+
+    def labels(self):
+        """Ближайший к каждому документу кластер."""
+        return np.argmin(self.distances, axis=1)
+
+
+def randomMembership(documents_count, clusters_count, rng):
+    """Случайная матрица принадлежности, сумма по строке - 1."""
+    return rng.dirichlet(np.ones(clusters_count), size=documents_count)
+
+
+def fuzzyCentroids(X, U, m):
+    """Центроиды - средние документов с весами U^m."""
+    Um = U ** m
+    sums = Um.T @ X
+    if scipy.sparse.issparse(sums):
+        sums = sums.toarray()
+    weights = Um.sum(axis=0)
+    weights[weights == 0] = 1
+    return np.asarray(sums) / weights[:, np.newaxis]
+
+
+def fuzzyMembership(distances, m):
+    """Степени принадлежности по расстояниям до центроидов (документы x кластеры).
+    Документ, совпадающий с центроидами, целиком (поровну) принадлежит этим кластерам."""
+    zero = distances == 0
+    with np.errstate(divide='ignore'):
+        inverse = distances ** (-2.0 / (m - 1))
+    hits = zero.any(axis=1)
+    inverse[hits] = zero[hits]
+    return inverse / inverse.sum(axis=1, keepdims=True)
+
+
+def fuzzyCMeans(X, clusters_count, m=2, eps=0.01, max_iter=300, seed=None, initial_U=None, on_iteration=None):
+    """Нечёткая кластеризация строк X на clusters_count кластеров, m > 1 - степень нечёткости.
+    Останавливается, когда норма изменения U меньше eps, или через max_iter итераций.
+    initial_U - начальная матрица принадлежности (например, U предыдущего запуска);
+    если не задана или не подходит по размеру, берётся случайная.
+    on_iteration(итерация, U, центроиды) вызывается для начальной матрицы
+    (итерация 0, центроиды None) и после каждой итерации."""
+    if m <= 1:
+        raise ValueError('Степень нечёткости m должна быть больше 1')
+    documents_count = X.shape[0]
+    if initial_U is not None and np.shape(initial_U) == (documents_count, clusters_count):
+        U = np.array(initial_U, dtype=np.float64)
+    else:
+        U = randomMembership(documents_count, clusters_count, makeRandomGenerator(seed))
+    if on_iteration is not None:
+        on_iteration(0, U, None)
+
+    converged = False
+    iteration = 0
+    centroids = None
+    distances = None
+    while iteration < max_iter:
+        iteration += 1
+        centroids = fuzzyCentroids(X, U, m)
+        distances = euclideanDistanceMatrix(X, centroids)
+        new_U = fuzzyMembership(distances, m)
+        if on_iteration is not None:
+            on_iteration(iteration, new_U, centroids)
+        change = np.sqrt(np.sum((new_U - U) ** 2))
+        U = new_U
+        if change < eps:
+            converged = True
+            break
+    return FuzzyCMeansResult(U, centroids, distances, iteration, converged)
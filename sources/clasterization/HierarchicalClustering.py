@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Агломеративная иерархическая кластеризация.
+# Матрица расстояний между кластерами обновляется на месте по формуле
+# Ланса-Уильямса:
+#   d(i+j, k) = ai*d(i,k) + aj*d(j,k) + b*d(i,j) + g*|d(i,k) - d(j,k)|
+# Пары для объединения ищутся цепочкой ближайших соседей (nearest-neighbor chain),
+# что даёт O(N^2) времени и O(N^2) памяти вместо O(N^3).
+# Результат - дендрограмма, которую можно разрезать на любое число кластеров
+# без повторной кластеризации. Журнал шагов с матрицами расстояний строится
+# повторением объединений дендрограммы по возрастанию расстояния.
+
+import numpy as np
+
+# single - ближайший сосед, complete - дальний сосед, average - среднее (UPGMA),
+# weighted - взвешенное среднее (WPGMA, коэффициенты 1/2), ward - метод Уорда
+LINKAGE_METHODS = ('single', 'complete', 'average', 'weighted', 'ward')
+
+
+def lanceWilliamsCoefficients(linkage, size_i, size_j, size_k):
+    """Коэффициенты (ai, aj, b, g) формулы Ланса-Уильямса.
+    size_k может быть массивом размеров кластеров k."""
+    size_k = np.asarray(size_k, dtype=np.float64)
+    if linkage == 'single':
+        return 0.5, 0.5, 0.0, -0.5
+    if linkage == 'complete':
+        return 0.5, 0.5, 0.0, 0.5
+    if linkage == 'average':
+        return size_i / (size_i + size_j), size_j / (size_i + size_j), 0.0, 0.0
+    if linkage == 'weighted':
+        return 0.5, 0.5, 0.0, 0.0
+    if linkage == 'ward':
+        # Для метода Уорда формула применяется к квадратам расстояний
+        total = size_i + size_j + size_k
+        return (size_i + size_k) / total, (size_j + size_k) / total, -size_k / total, 0.0
+    raise ValueError('Неизвестный метод связи: ' + str(linkage))
+
+
+class AgglomerativeClustering:
+    """Состояние агломеративной кластеризации: матрица расстояний между
+    кластерами (по слотам - номеру первого документа кластера), размеры кластеров
+    и их документы."""
+
+    def __init__(self, distances, linkage='weighted'):
+        if linkage not in LINKAGE_METHODS:
+            raise ValueError('Неизвестный метод связи: ' + str(linkage))
+        self.linkage = linkage
+        self.D = np.array(distances, dtype=np.float64)
+        if linkage == 'ward':
+            self.D = self.D * self.D
+        self.n = self.D.shape[0]
+        self.active = np.ones(self.n, dtype=bool)
+        self.sizes = np.ones(self.n, dtype=np.int64)
+        self.members = [[doc] for doc in range(self.n)]
+        # Слот кластера, в котором находится каждый документ
+        self.slot_of_doc = np.arange(self.n)
+
+    def distance(self, x, y):
+        if self.linkage == 'ward':
+            return float(np.sqrt(max(self.D[x, y], 0)))
+        return float(self.D[x, y])
+
+    def merge(self, x, y):
+        """Объединить кластеры в слотах x и y (результат остаётся в слоте x).
+        Возвращает (документы x, документы y, расстояние)."""
+        distance = self.distance(x, y)
+        first_members = self.members[x]
+        second_members = self.members[y]
+
+        self.active[y] = False
+        targets = np.flatnonzero(self.active)
+        targets = targets[targets != x]
+        ai, aj, b, g = lanceWilliamsCoefficients(self.linkage, self.sizes[x], self.sizes[y], self.sizes[targets])
+        d_xk = self.D[x, targets]
+        d_yk = self.D[y, targets]
+        updated = ai * d_xk + aj * d_yk + b * self.D[x, y] + g * np.abs(d_xk - d_yk)
+        self.D[x, targets] = updated
+        self.D[targets, x] = updated
+
+        self.sizes[x] += self.sizes[y]
+        self.members[x] = sorted(first_members + second_members)
+        self.members[y] = None
+        self.slot_of_doc[second_members] = x
+        return first_members, second_members, distance
+
+    def nearestActive(self, x):
+        row = self.D[x].copy()
+        row[~self.active] = np.inf
+        row[x] = np.inf
+        return int(np.argmin(row)), row
+
+    def documentDistances(self):
+        """Текущие расстояния между кластерами документов (документы x документы);
+        у документов одного кластера расстояние 0."""
+        matrix = self.D[np.ix_(self.slot_of_doc, self.slot_of_doc)]
+        if self.linkage == 'ward':
+            matrix = np.sqrt(np.maximum(matrix, 0))
+        return matrix
+
+    def runNNChain(self):
+        """Объединения цепочкой ближайших соседей (в порядке выполнения)."""
+        merges = []
+        chain = []
+        while len(merges) < self.n - 1:
+            if not chain:
+                chain.append(int(np.flatnonzero(self.active)[0]))
+            while True:
+                x = chain[-1]
+                y, row = self.nearestActive(x)
+                # При равенстве расстояний предпочитаем предыдущий элемент цепочки
+                if len(chain) > 1 and row[chain[-2]] <= row[y]:
+                    y = chain[-2]
+                if len(chain) > 1 and y == chain[-2]:
+                    break
+                chain.append(y)
+            chain.pop()
+            chain.pop()
+            merges.append(self.merge(min(x, y), max(x, y)))
+        return merges
+
+
+class Dendrogram:
+    """Дендрограмма в формате матрицы связей: строка k - объединение
+    кластеров Z[k,0] и Z[k,1] на расстоянии Z[k,2] в кластер n+k размера Z[k,3]
+    (кластеры 0..n-1 - отдельные документы)."""
+
+    def __init__(self, Z, documents_count):
+        self.Z = Z
+        self.n = documents_count
+
+    def members(self, cluster_id):
+        """Документы кластера cluster_id (по возрастанию)."""
+        stack = [cluster_id]
+        result = []
+        while stack:
+            current = stack.pop()
+            if current < self.n:
+                result.append(current)
+            else:
+                row = self.Z[current - self.n]
+                stack.append(int(row[0]))
+                stack.append(int(row[1]))
+        return sorted(result)
+
+    def steps(self):
+        """Шаги объединения: (документы первого, документы второго, расстояние)."""
+        for row in self.Z:
+            yield self.members(int(row[0])), self.members(int(row[1])), float(row[2])
+
+    def labelsAfterMerges(self, merges_count):
+        parent = list(range(2 * self.n - 1))
+        for k in range(merges_count):
+            parent[int(self.Z[k, 0])] = self.n + k
+            parent[int(self.Z[k, 1])] = self.n + k
+
+        def root(x):
+            while parent[x] != x:
+                x = parent[x]
+            return x
+
+        roots = [root(doc) for doc in range(self.n)]
+        numbers = dict()
+        return np.array([numbers.setdefault(r, len(numbers)) for r in roots])
+
+    def cut(self, clusters_count):
+        """Номера кластеров документов при разрезе на clusters_count кластеров."""
+        clusters_count = min(max(clusters_count, 1), self.n)
+        return self.labelsAfterMerges(self.n - clusters_count)
+
+    def cutByDistance(self, threshold):
+        """Номера кластеров документов, если объединять кластеры не дальше threshold."""
+        return self.labelsAfterMerges(int(np.count_nonzero(self.Z[:, 2] <= threshold)))
+
+    def clusters(self, clusters_count):
+        """Списки документов кластеров при разрезе на clusters_count кластеров."""
+        labels = self.cut(clusters_count)
+        return [np.flatnonzero(labels == label).tolist() for label in range(labels.max() + 1)]
+
+
+def buildDendrogram(merges, documents_count):
+    """Собрать дендрограмму из объединений (документы первого, второго, расстояние).
+    Объединения сортируются по расстоянию (устойчиво), так как цепочка ближайших
+    соседей находит их не по порядку."""
+    order = sorted(range(len(merges)), key=lambda k: merges[k][2])
+    Z = np.zeros((len(merges), 4))
+    cluster_of_doc = list(range(documents_count))
+    for k, index in enumerate(order):
+        first, second, distance = merges[index]
+        first_id = cluster_of_doc[first[0]]
+        second_id = cluster_of_doc[second[0]]
+        Z[k] = [min(first_id, second_id), max(first_id, second_id), distance, len(first) + len(second)]
+        for doc in first + second:
+            cluster_of_doc[doc] = documents_count + k
+    return Dendrogram(Z, documents_count)
+
+
+def replayDendrogram(distances, dendrogram, linkage='weighted', on_step=None):
+    """Повторить объединения дендрограммы по возрастанию расстояния.
+    on_step(номер шага, состояние, x, y) вызывается перед объединением слотов x и y;
+    ближайшие пары не ищутся, так что шаг стоит O(N) без учёта on_step."""
+    engine = AgglomerativeClustering(distances, linkage)
+    for step, (first, second, distance) in enumerate(dendrogram.steps()):
+        x = int(engine.slot_of_doc[first[0]])
+        y = int(engine.slot_of_doc[second[0]])
+        x, y = min(x, y), max(x, y)
+        if on_step is not None:
+            on_step(step, engine, x, y)
+        engine.merge(x, y)
+    return engine
+
+
+def agglomerativeClustering(distances, linkage='weighted', on_step=None):
+    """Построить дендрограмму по матрице расстояний между документами.
+    on_step(номер шага, состояние, x, y) - журнал шагов: после построения
+    дендрограммы объединения повторяются по порядку (см. replayDendrogram)."""
+    engine = AgglomerativeClustering(distances, linkage)
+    dendrogram = buildDendrogram(engine.runNNChain(), engine.n)
+    if on_step is not None:
+        replayDendrogram(distances, dendrogram, linkage, on_step)
+    return dendrogram
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Кластеризация методом к-средних на NumPy.
+# Начальные центроиды выбираются методом k-means++, алгоритм запускается
+# n_init раз с разными начальными центроидами и выбирается разбиение
+# с наименьшей суммой квадратов расстояний до центроидов (inertia).
+# Для больших корпусов есть режим мини-пакетов (mini-batch k-means).
+# Матрица документов - numpy.ndarray или scipy.sparse (строки - документы).
+
+import numpy as np
+import scipy.sparse
+
+from sources.clasterization.DistanceKernels import euclideanDistanceMatrix
+
+
+class KMeansResult:
+
+    def __init__(self, labels, centroids, inertia, iterations, initial_centroids):
+        self.labels = labels                        # Номер кластера каждого документа
+        self.centroids = centroids                  # Центроиды (кластеры x слова)
+        self.inertia = inertia                      # Сумма квадратов расстояний до центроидов
+        self.iterations = iterations
+        self.initial_centroids = initial_centroids
+
+    def clusters(self):
+        """Списки документов каждого кластера."""
+        return [np.flatnonzero(self.labels == cluster).tolist() for cluster in range(len(self.centroids))]
+
+
+def makeRandomGenerator(seed=None):
+    """Генератор случайных чисел; seed < 0 или None - без фиксированного зерна."""
+    if seed is None or seed < 0:
+        return np.random.default_rng()
+    return np.random.default_rng(seed)
+
+
+def denseRows(X, rows):
+    if scipy.sparse.issparse(X):
+        return X[rows].toarray()
+    return np.asarray(X[rows], dtype=np.float64)
+
+
+def kMeansPlusPlusCentroids(X, clusters_count, rng):
+    """Начальные центроиды k-means++: каждый следующий центр выбирается среди документов
+    с вероятностью, пропорциональной квадрату расстояния до ближайшего уже выбранного центра."""
+    documents_count = X.shape[0]
+    chosen = [int(rng.integers(documents_count))]
+    closest = euclideanDistanceMatrix(X, denseRows(X, chosen)).ravel() ** 2
+    for _ in range(1, clusters_count):
+        total = closest.sum()
+        if total <= 0:
+            # Все документы совпадают с выбранными центрами
+            candidate = int(rng.integers(documents_count))
+        else:
+            candidate = int(rng.choice(documents_count, p=closest / total))
+        chosen.append(candidate)
+        closest = np.minimum(closest, euclideanDistanceMatrix(X, denseRows(X, [candidate])).ravel() ** 2)
+    return denseRows(X, chosen)
+
+
+def clusterSums(X, labels, clusters_count):
+    """Суммы документов по кластерам и число документов в кластерах."""
+    documents_count = X.shape[0]
+    assignment = scipy.sparse.csr_matrix((np.ones(documents_count), (labels, np.arange(documents_count))),
+                                         shape=(clusters_count, documents_count))
+    sums = assignment @ X
+    if scipy.sparse.issparse(sums):
+        sums = sums.toarray()
+    return np.asarray(sums), np.bincount(labels, minlength=clusters_count)
+
+
+def updateCentroids(X, labels, centroids):
+    """Центроиды - средние документов кластеров; центроид пустого кластера не меняется."""
+    sums, counts = clusterSums(X, labels, len(centroids))
+    updated = centroids.copy()
+    not_empty = counts > 0
+    updated[not_empty] = sums[not_empty] / counts[not_empty, np.newaxis]
+    return updated
+
+
+def kMeansSingleRun(X, initial_centroids, max_iter=300, on_iteration=None):
+    """Один запуск к-средних (алгоритм Ллойда) до стабилизации разбиения.
+    on_iteration(итерация, номера кластеров, центроиды, расстояния кластеры x документы)
+    вызывается для начального состояния (итерация 0, номера None) и после каждой итерации."""
+    centroids = np.array(initial_centroids, dtype=np.float64)
+    distances = euclideanDistanceMatrix(centroids, X)
+    if on_iteration is not None:
+        on_iteration(0, None, centroids, distances)
+    labels = None
+    iteration = 0
+    while iteration < max_iter:
+        iteration += 1
+        new_labels = np.argmin(distances, axis=0)
+        changes = labels is None or np.any(new_labels != labels)
+        labels = new_labels
+        centroids = updateCentroids(X, labels, centroids)
+        distances = euclideanDistanceMatrix(centroids, X)
+        if on_iteration is not None:
+            on_iteration(iteration, labels, centroids, distances)
+        if not changes:
+            break
+    inertia = float(np.sum(distances[labels, np.arange(X.shape[0])] ** 2))
+    return KMeansResult(labels, centroids, inertia, iteration, np.array(initial_centroids))
+
+
+def miniBatchKMeans(X, initial_centroids, batch_size, max_iter=300, rng=None, tolerance=1e-6):
+    """Мини-пакетный к-средних (Sculley, 2010): центроиды сдвигаются по случайным
+    пакетам документов с убывающим шагом 1 / (число документов, попавших в кластер)."""
+    if rng is None:
+        rng = makeRandomGenerator()
+    centroids = np.array(initial_centroids, dtype=np.float64)
+    seen = np.zeros(len(centroids))
+    documents_count = X.shape[0]
+    batch_size = min(batch_size, documents_count)
+    iteration = 0
+    while iteration < max_iter:
+        iteration += 1
+        batch = rng.choice(documents_count, size=batch_size, replace=False)
+        batch_rows = denseRows(X, batch)
+        batch_labels = np.argmin(euclideanDistanceMatrix(centroids, batch_rows), axis=0)
+        previous = centroids.copy()
+        for cluster in np.unique(batch_labels):
+            members = batch_rows[batch_labels == cluster]
+            seen[cluster] += len(members)
+            step = len(members) / seen[cluster]
+            centroids[cluster] += step * (members.mean(axis=0) - centroids[cluster])
+        if np.sqrt(np.sum((centroids - previous) ** 2)) < tolerance:
+            break
+    distances = euclideanDistanceMatrix(centroids, X)
+    labels = np.argmin(distances, axis=0)
+    inertia = float(np.sum(distances[labels, np.arange(documents_count)] ** 2))
+    return KMeansResult(labels, centroids, inertia, iteration, np.array(initial_centroids))
+
+
+def kMeans(X, clusters_count, n_init=10, max_iter=300, seed=None, batch_size=0, on_iteration=None):
+    """К-средних с n_init запусками от центроидов k-means++; возвращает лучший запуск.
+    batch_size > 0 - мини-пакетный режим.
+    on_iteration - журнал итераций лучшего запуска (он повторяется с теми же
+    начальными центроидами, поэтому остальные запуски не журналируются)."""
+    rng = makeRandomGenerator(seed)
+    clusters_count = min(clusters_count, X.shape[0])
+    best = None
+    for attempt in range(max(n_init, 1)):
+        initial_centroids = kMeansPlusPlusCentroids(X, clusters_count, rng)
+        if batch_size > 0:
+            result = miniBatchKMeans(X, initial_centroids, batch_size, max_iter, rng)
+        else:
+            result = kMeansSingleRun(X, initial_centroids, max_iter)
+        if best is None or result.inertia < best.inertia:
+            best = result
+    if on_iteration is not None:
+        if batch_size <= 0:
+            best = kMeansSingleRun(X, best.initial_centroids, max_iter, on_iteration)
+        else:
+            # В мини-пакетном режиме журналируются только начальное и итоговое состояния
+            on_iteration(0, None, best.initial_centroids, euclideanDistanceMatrix(best.initial_centroids, X))
+            on_iteration(best.iterations, best.labels, best.centroids, euclideanDistanceMatrix(best.centroids, X))
+    return best
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Самоорганизующаяся карта Кохонена (SOM) на NumPy.
+# Нейроны - строки матрицы (length*length x слова), нейрон i находится в узле
+# (i // length, i % length) квадратной решётки.
+# Поиск нейрона-победителя (BMU) и сдвиг всех нейронов к документу выполняются
+# над всей матрицей нейронов сразу. Кроме обучения по одному документу есть
+# пакетный режим: за эпоху нейроны заменяются взвешенными средними документов.
+
+import numpy as np
+
+from sources.clasterization.DistanceKernels import euclideanDistanceMatrix
+from sources.clasterization.KMeansClustering import denseRows, makeRandomGenerator
+
+SOM_MODES = ('online', 'batch')
+
+
+def gridCoordinates(length):
+    """Координаты (строка, столбец) нейронов на решётке."""
+    indexes = np.arange(length * length)
+    return np.stack([indexes // length, indexes % length], axis=1).astype(np.float64)
+
+
+def gridSquaredDistances(grid, winners):
+    """Квадраты расстояний по решётке от всех нейронов до нейронов winners (нейроны x winners)."""
+    difference = grid[:, np.newaxis, :] - grid[np.newaxis, winners, :]
+    return np.einsum('ijk,ijk->ij', difference, difference)
+
+
+def bestMatchingUnits(X, M):
+    """Номера ближайших нейронов для документов и расстояния до них."""
+    distances = euclideanDistanceMatrix(X, M)
+    winners = np.argmin(distances, axis=1)
+    return winners, distances[np.arange(len(winners)), winners]
+
+
+class SOMResult:
+
+    def __init__(self, M, length, epochs, error):
+        self.M = M                  # Нейроны после обучения
+        self.length = length
+        self.epochs = epochs        # Номер последней эпохи обучения
+        self.error = error          # Среднее расстояние документов до победителей
+
+
+def trainOnlineEpoch(X, M, grid, order, learning_rate, radius):
+    """Эпоха обучения по одному документу в порядке order."""
+    for doc in order:
+        x = denseRows(X, [doc]).ravel()
+        difference = x - M
+        winner = int(np.argmin(np.einsum('ij,ij->i', difference, difference)))
+        influence = learning_rate * np.exp(-gridSquaredDistances(grid, [winner]).ravel() / (2 * radius ** 2))
+        M += influence[:, np.newaxis] * difference
+
+
+def trainBatchEpoch(X, M, grid, radius):
+    """Эпоха пакетного обучения: нейрон - среднее документов с весами соседства
+    их победителей."""
+    winners, _ = bestMatchingUnits(X, M)
+    influence = np.exp(-gridSquaredDistances(grid, winners) / (2 * radius ** 2))
+    weights = influence.sum(axis=1)
+    sums = np.asarray(influence @ X)
+    updated = weights > 0
+    M[updated] = sums[updated] / weights[updated, np.newaxis]
+
+
+def trainSOM(X, length, learning_rate, radius, mode='online', max_epochs=10000, min_error=0.0000001,
+             tolerance=0, seed=None, initial_M=None, on_epoch=None):
+    """Обучить карту length x length на строках X.
+    learning_rate(t), radius(t) - коэффициенты обучения и соседства для эпохи t.
+    Обучение останавливается, когда среднее расстояние документов до победителей
+    меньше min_error, когда оно изменилось за эпоху меньше чем на tolerance
+    (относительно), или после эпохи max_epochs.
+    initial_M - начальные нейроны (по умолчанию случайные из [0, 1)).
+    on_epoch(t, ошибка) вызывается после каждой эпохи."""
+    if mode not in SOM_MODES:
+        raise ValueError('Неизвестный режим SOM: ' + str(mode))
+    rng = makeRandomGenerator(seed)
+    if initial_M is None:
+        M = rng.random((length * length, X.shape[1]))
+    else:
+        M = np.array(initial_M, dtype=np.float64)
+    grid = gridCoordinates(length)
+
+    t = 0
+    previous_error = None
+    while True:
+        if mode == 'batch':
+            trainBatchEpoch(X, M, grid, radius(t))
+        else:
+            trainOnlineEpoch(X, M, grid, rng.permutation(X.shape[0]), learning_rate(t), radius(t))
+        _, winner_distances = bestMatchingUnits(X, M)
+        error = float(winner_distances.mean())
+        if on_epoch is not None:
+            on_epoch(t, error)
+        if error < min_error or t >= max_epochs:
+            break
+        if tolerance > 0 and previous_error is not None and \
+                abs(previous_error - error) <= tolerance * max(previous_error, min_error):
+            break
+        previous_error = error
+        t += 1
+    return SOMResult(M, length, t, error)
+
+
+def documentLocations(X, M, length):
+    """Положение документов на карте: (столбец, строка) нейрона-победителя."""
+    winners, _ = bestMatchingUnits(X, M)
+    return [(int(winner % length), int(winner // length)) for winner in winners]
+
+
+def buildUMatrix(M, length):
+    """U-матрица (2*length-1 x 2*length-1): между соседними нейронами - расстояние между ними,
+    в диагональных ячейках - среднее двух диагональных расстояний, в ячейках нейронов -
+    среднее соседних ячеек. Возвращает (U-матрица, значения в ячейках нейронов)."""
+    mapM = M.reshape(length, length, -1)
+    size = 2 * length - 1
+    uMatrix = np.zeros((size, size))
+    uMatrix[0::2, 1::2] = np.linalg.norm(mapM[:, :-1] - mapM[:, 1:], axis=2)
+    uMatrix[1::2, 0::2] = np.linalg.norm(mapM[:-1, :] - mapM[1:, :], axis=2)
+    uMatrix[1::2, 1::2] = (np.linalg.norm(mapM[:-1, :-1] - mapM[1:, 1:], axis=2) +
+                           np.linalg.norm(mapM[:-1, 1:] - mapM[1:, :-1], axis=2)) / 2
+
+    # Сумма и число соседних ячеек (окно 3x3 без центра) для ячеек нейронов
+    padded = np.pad(uMatrix, 1)
+    inside = np.pad(np.ones((size, size)), 1)
+    sums = np.zeros((size, size))
+    counts = np.zeros((size, size))
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            if di == 0 and dj == 0:
+                continue
+            sums += padded[1 + di:1 + di + size, 1 + dj:1 + dj + size]
+            counts += inside[1 + di:1 + di + size, 1 + dj:1 + dj + size]
+    finalMap = sums[0::2, 0::2] / counts[0::2, 0::2]
+    uMatrix[0::2, 0::2] = finalMap
+    return uMatrix, finalMap
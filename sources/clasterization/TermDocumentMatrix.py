@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Матрица весов термов в документах (TF-IDF), общая для всех методов кластеризации.
+# Строится один раз по результатам препроцессинга и переиспользуется
+# иерархическим алгоритмом, к-средними, с-средними, DBSCAN и SOM.
+
+import numpy as np
+import scipy.sparse
+
+
+class TermDocumentMatrix:
+    """Представление корпуса для кластеризации.
+    words - слова в порядке первого появления (порядок столбцов),
+    vocabulary - словарь слово -> номер столбца,
+    counts - частоты слов в документах (документы x слова),
+    df - число документов, содержащих слово,
+    idf - log10(N / df),
+    W - TF-IDF, нормированный по строкам (L2)."""
+
+    def __init__(self, words, counts, sparse=False):
+        self.words = words
+        self.vocabulary = {word: index for index, word in enumerate(words)}
+        self.sparse = sparse
+        self.counts = counts
+
+        documents_count = counts.shape[0]
+        if sparse:
+            self.df = np.asarray((counts > 0).sum(axis=0)).ravel()
+        else:
+            self.df = np.count_nonzero(counts, axis=0)
+        self.idf = np.log10(documents_count / np.maximum(self.df, 1))
+
+        if sparse:
+            weights = counts.multiply(self.idf).tocsr()
+            norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+        else:
+            weights = counts * self.idf
+            norms = np.sqrt(np.einsum('ij,ij->i', weights, weights))
+        # Документ без значимых слов (все слова встречаются во всех документах)
+        # остаётся нулевым вектором вместо деления на ноль
+        norms[norms == 0] = 1.0
+        if sparse:
+            self.W = scipy.sparse.csr_matrix(weights.multiply(1.0 / norms[:, np.newaxis]))
+        else:
+            self.W = weights / norms[:, np.newaxis]
+
+    def documentsCount(self):
+        return self.counts.shape[0]
+
+    def wordsCount(self):
+        return len(self.words)
+
+    def dfDict(self):
+        """Таблица df в виде словаря слово -> число документов (порядок слов сохраняется)."""
+        return dict(zip(self.words, self.df.tolist()))
+
+    def denseW(self):
+        if self.sparse:
+            return self.W.toarray()
+        return self.W
+
+    def binaryMatrix(self):
+        """Бинарные веса: 1, если слово встречается в документе."""
+        if self.sparse:
+            return (self.counts > 0).astype(np.int64).toarray()
+        return (self.counts > 0).astype(np.int64)
+
+    def sparseBinaryMatrix(self):
+        """Бинарные веса в формате scipy.sparse.csr_matrix."""
+        return scipy.sparse.csr_matrix(self.counts > 0, dtype=np.float64)
+
+
+def buildTermDocumentMatrix(texts, sparse=False):
+    """Построить матрицу весов по частотным таблицам текстов (text.word_frequency).
+    sparse - хранить counts и W в формате scipy.sparse.csr_matrix."""
+    vocabulary = dict()
+    for text in texts:
+        for key, value in text.sorted_word_frequency:
+            if key not in vocabulary:
+                vocabulary[key] = len(vocabulary)
+    words = list(vocabulary.keys())
+
+    rows = []
+    cols = []
+    values = []
+    for row, text in enumerate(texts):
+        for key, frequency in text.word_frequency.items():
+            rows.append(row)
+            cols.append(vocabulary[key])
+            values.append(frequency)
+
+    shape = (len(texts), len(words))
+    counts = scipy.sparse.csr_matrix((np.array(values, dtype=np.float64), (rows, cols)), shape=shape)
+    if not sparse:
+        counts = counts.toarray()
+    return TermDocumentMatrix(words, counts, sparse)
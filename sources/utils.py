@@ -1,26 +1,12 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import codecs
 import os
 import shutil
 import time
 from PyQt5.QtWidgets import QFileDialog
 
-from sources.TextPreprocessing import loadInputFilesFromList, tokenizeTextData, removeStopWordsInTexts, \
-    calculateWordsFrequencyInTexts, fixRegisterInTexts, normalizeTexts, writeStringToFile
-
-def readConfigurationFile(filename):
-    with codecs.open(filename, 'r', "utf-8") as text_file:
-        data = text_file.read()
-        lines = data.split("\n")
-        result = dict()
-        for line in lines:
-            line = line.strip()
-            if(line.startswith("#") == False):
-                keyvalue = line.split("=")
-                if(len(keyvalue) == 2):
-                    result[keyvalue[0]]=keyvalue[1]
-        return result
+from sources.ConfigurationFile import parseConfigurationValue, readConfigurationFile
+from sources.TextPreprocessing import loadInputFilesFromList, preprocessLoadedTexts
 
 def getFilenameFromUserSelection(file_types="Any Files (*.*)", path = ''):
     filenames, _ = QFileDialog.getOpenFileName(None, "Выбрать файл", path, file_types, None)
@@ -83,30 +69,7 @@ def makePreprocessingForAllFilesInFolder(configurations,
     for text in texts:
         text.short_filename = make_relative_files_path(text.full_filename, input_dir_name)
 
-    # Разделяем предложения на слова
-    texts = tokenizeTextData(texts)
-
-    print('Этап препроцессинга:')
-
-    print('1) Удаление стоп-слов.')
-
-    texts, log_string = removeStopWordsInTexts(texts, morph, configurations)
-    writeStringToFile(log_string.replace('\n ', '\n'), output_log_dir + '/output_stage_1.txt')
-
-    # Переводим обычное предложение в нормализованное (каждое слово)
-    print('2) Нормализация.')
-    texts, log_string = normalizeTexts(texts, morph)
-    writeStringToFile(log_string.replace('\n ', '\n'), output_log_dir + '/output_stage_2.txt')
-
-    # Приведение регистра (все слова с маленькой буквы за исключением ФИО)
-    print('3) Приведение регистра.')
-    texts, log_string = fixRegisterInTexts(texts, morph)
-    writeStringToFile(log_string.replace('\n ', '\n'), output_log_dir + '/output_stage_3.txt')
-
-    # Подсчет частоты слов в тексте
-    print('4) Расчет частотной таблицы слов.')
-    texts, log_string = calculateWordsFrequencyInTexts(texts)
-    writeStringToFile(log_string.replace('\n ', '\n'), output_log_dir + '/output_stage_4.csv')
+    texts = preprocessLoadedTexts(texts, morph, configurations, output_log_dir + '/')
 
     for text in texts:
         text_filename = output_files_dir + text.short_filename
@@ -2,9 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import sys
-import pymorphy2
 from matplotlib import rc
 
+from sources.MorphAnalyzerCache import getSharedMorphAnalyzer, DEFAULT_MORPH_CACHE_SIZE
 from sources.TextClassificationLib import DialogClassificationLib
 from sources.utils import *
 
@@ -37,8 +37,8 @@ if not os.path.exists(input_dir):
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
-# Получаем экземпляр анализатора (10-20мб)
-morph = pymorphy2.MorphAnalyzer()
+# Получаем экземпляр анализатора (10-20мб) с общим для всех диалогов кэшем разбора слов
+morph = getSharedMorphAnalyzer(configurations.get("morph_cache_size", DEFAULT_MORPH_CACHE_SIZE))
 
 # Класс главного окна
 class MainWindow(QMainWindow):